@@ -0,0 +1,221 @@
+"""
+Headless ingestion and matching API for partner agencies.
+
+Runs next to the Streamlit UI and uses the same service layer in ``app``
+(``submit_report`` and ``rematch_report``), so reports filed through the API
+are stored, indexed, matched and announced to admins exactly like form
+submissions. Age/gender estimation, face encoding and matching are CPU
+bound; they run in a process pool so the event loop keeps accepting
+requests, and batch endpoints fan their reports out across the pool.
+
+Requests carry an ``X-API-Key`` header listed under ``[api] keys`` in
+config.ini. Exports include reporter contact details, so they need one of the
+separate ``[api] admin_keys`` instead. Photos are sent base64-encoded as
+``image_base64``.
+
+    POST /reports               one missing-person report
+    POST /reports/batch         {"reports": [...]}
+    POST /sightings             one sighting
+    POST /sightings/batch       {"sightings": [...]}
+    POST /reports/{id}/match    run matching again for a stored report
+    GET  /export/{dataset}.csv  stream all reports or matches as CSV (no photos; admin key)
+    GET  /health
+
+Usage:
+    python api_server.py --port 8600 --workers 4
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import configparser
+import io
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import uvicorn
+from PIL import Image, UnidentifiedImageError
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import app
+import export_data
+
+API_SOURCE = "API"
+MAX_BATCH_SIZE = 100
+REPORT_FIELDS = (
+    "name", "last_seen_location", "description", "reporter_phone", "reporter_email", "reporter_consent",
+    "location_lat", "location_lng", "location_accuracy",
+)
+REQUIRED_FIELDS = {
+    "report": ("name", "last_seen_location", "image_base64"),
+    "sighting": ("reporter_phone", "last_seen_location", "image_base64"),
+}
+COORDINATE_RANGES = {
+    "location_lat": (-90.0, 90.0),
+    "location_lng": (-180.0, 180.0),
+    "location_accuracy": (0.0, math.inf),
+}
+
+
+def load_api_keys(path: str = "config.ini", option: str = "keys") -> set[str]:
+    config = configparser.ConfigParser()
+    config.read(path)
+    return {key.strip() for key in config.get("api", option, fallback="").split(",") if key.strip()}
+
+
+def parse_submission(item, kind: str) -> tuple[dict, bytes]:
+    """Validate one JSON report or sighting; returns (fields, image bytes) or raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError(f"Each {kind} must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS[kind] if not item.get(field)]
+    if missing:
+        raise ValueError("Missing required fields: " + ", ".join(missing))
+    if item.get("reporter_phone") and not app.is_valid_phone(str(item["reporter_phone"])):
+        raise ValueError("Enter a valid phone number with at least 7 digits.")
+    try:
+        image_bytes = base64.b64decode(item["image_base64"], validate=True)
+    except (binascii.Error, TypeError) as error:
+        raise ValueError("image_base64 is not valid base64") from error
+    try:
+        Image.open(io.BytesIO(image_bytes)).verify()
+    except (UnidentifiedImageError, OSError, SyntaxError) as error:
+        raise ValueError("image_base64 is not a readable image") from error
+    fields = {field: item[field] for field in REPORT_FIELDS if item.get(field) is not None}
+    for field, (low, high) in COORDINATE_RANGES.items():
+        value = fields.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{field} must be a number")
+        if not low <= value <= high:
+            raise ValueError(f"{field} must be at least {low:g}" if high == math.inf else f"{field} must be between {low:g} and {high:g}")
+        fields[field] = float(value)
+    if "reporter_consent" in fields:
+        fields["reporter_consent"] = int(bool(fields["reporter_consent"]))
+    return fields, image_bytes
+
+
+# --- Worker-side entry points (run in the process pool) ---
+def _submit_in_worker(db_path: str, fields: dict, image_bytes: bytes, sighting: bool) -> dict:
+    app.DB_PATH = db_path
+    return app.submit_report(fields, image_bytes, source=API_SOURCE, sighting=sighting)
+
+
+def _rematch_in_worker(db_path: str, report_id: int):
+    app.DB_PATH = db_path
+    return app.rematch_report(report_id)
+
+
+# --- HTTP layer ---
+def create_app(executor: Executor | None = None, api_keys: set[str] | None = None,
+               workers: int | None = None, admin_keys: set[str] | None = None) -> Starlette:
+    """Build the ASGI app. Tests can pass an in-process executor and their own keys."""
+    executor = executor or ProcessPoolExecutor(max_workers=workers)
+    api_keys = load_api_keys() if api_keys is None else api_keys
+    admin_keys = load_api_keys(option="admin_keys") if admin_keys is None else admin_keys
+
+    async def run(func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, app.DB_PATH, *args)
+
+    def authorized(request) -> bool:
+        return request.headers.get("x-api-key") in api_keys
+
+    async def read_json(request):
+        try:
+            return await request.json()
+        except ValueError:
+            return None
+
+    async def submit_one(item, kind: str) -> dict:
+        try:
+            fields, image_bytes = parse_submission(item, kind)
+        except ValueError as error:
+            return {"error": str(error)}
+        try:
+            return await run(_submit_in_worker, fields, image_bytes, kind == "sighting")
+        except Exception as error:
+            # One failing item must not hide the ids of the items stored alongside it
+            return {"error": f"Could not store the {kind}: {error}"}
+
+    def single(kind: str):
+        async def endpoint(request):
+            if not authorized(request):
+                return JSONResponse({"error": "Invalid API key"}, status_code=401)
+            result = await submit_one(await read_json(request), kind)
+            return JSONResponse(result, status_code=400 if "error" in result else 201)
+        return endpoint
+
+    def batch(kind: str, key: str):
+        async def endpoint(request):
+            if not authorized(request):
+                return JSONResponse({"error": "Invalid API key"}, status_code=401)
+            body = await read_json(request)
+            items = body.get(key) if isinstance(body, dict) else None
+            if not isinstance(items, list) or not items:
+                return JSONResponse({"error": f"Expected a non-empty '{key}' list"}, status_code=400)
+            if len(items) > MAX_BATCH_SIZE:
+                return JSONResponse({"error": f"At most {MAX_BATCH_SIZE} {key} per request"}, status_code=413)
+            # Invalid items fail on their own; the rest of the batch is still stored
+            results = await asyncio.gather(*(submit_one(item, kind) for item in items))
+            return JSONResponse({"results": results}, status_code=207 if any("error" in r for r in results) else 201)
+        return endpoint
+
+    async def rematch(request):
+        if not authorized(request):
+            return JSONResponse({"error": "Invalid API key"}, status_code=401)
+        report_id = request.path_params["report_id"]
+        matches = await run(_rematch_in_worker, report_id)
+        if matches is None:
+            return JSONResponse({"error": f"Report #{report_id} not found"}, status_code=404)
+        return JSONResponse({"report_id": report_id, "matches": matches})
+
+    async def export(request):
+        if request.headers.get("x-api-key") not in admin_keys:
+            return JSONResponse({"error": "Exports need an admin API key"}, status_code=403)
+        dataset = request.path_params["dataset"]
+        if dataset not in export_data.DATASETS:
+            return JSONResponse({"error": f"Unknown dataset '{dataset}'"}, status_code=404)
+        # A sync generator: Starlette iterates it in a worker thread, one chunk at a time
+        return StreamingResponse(
+            export_data.iter_csv(dataset, chunk_size=export_data.EXPORT_CHUNK_SIZE), media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{dataset}.csv"'}
+        )
+
+    async def health(_request):
+        return JSONResponse({"status": "ok"})
+
+    @asynccontextmanager
+    async def lifespan(_api):
+        app.init_db()
+        yield
+        executor.shutdown()
+
+    return Starlette(
+        routes=[
+            Route("/reports", single("report"), methods=["POST"]),
+            Route("/reports/batch", batch("report", "reports"), methods=["POST"]),
+            Route("/sightings", single("sighting"), methods=["POST"]),
+            Route("/sightings/batch", batch("sighting", "sightings"), methods=["POST"]),
+            Route("/reports/{report_id:int}/match", rematch, methods=["POST"]),
+            Route("/export/{dataset}.csv", export),
+            Route("/health", health),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the report ingestion and matching API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes for CPU work")
+    args = parser.parse_args()
+    uvicorn.run(create_app(workers=args.workers), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,12 +13,22 @@ import datetime
 import configparser
 import os
 import json
+import glob
+import hashlib
 import secrets
 import string
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from difflib import SequenceMatcher
 import numpy as np
+import cv2
 import face_recognition  # New import for facial recognition
 from streamlit_js_eval import streamlit_js_eval
+from db_writer import DatabaseWriter
+from embedding_store import EmbeddingStore, META_DTYPE
+from rate_limit import TokenBucket
 try:
     from deepface import DeepFace
     DEEPFACE_AVAILABLE = True
@@ -29,6 +39,75 @@ DB_PATH = 'missing_persons.db'
 MATCH_TOLERANCE = 0.6
 MIN_TEXT_SIMILARITY = 0.72
 TRACKING_CODE_LENGTH = 8
+TRACKING_CODE_RETRIES = 5  # fresh codes tried when a generated code is already taken
+TRACKING_LOOKUP_RATE = 0.2  # status lookups per second allowed per session, on average
+TRACKING_LOOKUP_BURST = 5
+MIN_FACE_SIZE = 40
+IDEAL_FACE_SIZE = 120
+MIN_BLUR_VARIANCE = 40.0
+IDEAL_BLUR_VARIANCE = 250.0
+MAX_POSE_YAW = 0.45
+MIN_FACE_QUALITY = 0.3
+DUPLICATE_HASH_DISTANCE = 7
+DHASH_BANDS = 4
+RERANK_ENABLED = False
+RERANK_TOP_K = 5
+RERANK_MARGIN = 0.08
+RERANK_JITTERS = 10
+RERANK_LANDMARK_MODEL = "large"
+EMBEDDING_STORE_DTYPE = "int8"
+EMBEDDING_COMPACT_THRESHOLD = 0.25
+GEO_SEARCH_RADIUS_KM = 25.0
+GEO_MAX_RADIUS_KM = 400.0
+GEO_MIN_CANDIDATES = 25
+EARTH_RADIUS_KM = 6371.0
+AGE_BAND_WIDTH = 10  # stored in missing_persons.age_band; changing it requires recomputing the column
+AGE_BAND_OVERLAP = 8
+GENDER_KEYS = {'man': 'M', 'male': 'M', 'm': 'M', 'woman': 'F', 'female': 'F', 'f': 'F'}
+SEARCH_TOP_K = 10
+SEARCH_CONFIDENT_DISTANCE = 0.45
+SEARCH_LOOKBACK_MONTHS = 0  # default for the admin setting; 0 searches all history
+COLD_SEGMENT_MONTHS = 12
+COLD_SHARD = "cold"
+# Reports are matched only against the opposite partition: new missing reports against open
+# sightings, and new sightings (including CCTV footage) against open missing cases.
+OPEN_STATUSES = {
+    'missing': ('Missing',),
+    'sighting': ('Sighting Reported', 'Footage Ingested'),
+}
+OPPOSITE_KIND = {'missing': 'sighting', 'sighting': 'missing'}
+SIGHTING_CLUSTER_DISTANCE = 0.4
+SIGHTING_REMATCH_DISTANCE = 0.05  # centroid drift since a cluster's last search after which joining sightings search again
+# Weighted evidence fused into one match score; admins can override the weights in Search Settings
+FUSION_WEIGHTS = {'face': 0.5, 'name': 0.15, 'location': 0.1, 'geo': 0.1, 'age': 0.1, 'time': 0.05}
+FUSION_MIN_SCORE = MIN_TEXT_SIMILARITY
+FUSION_MIN_EVIDENCE = 0.25  # share of total weight that must be available for a face-less match
+GEO_SCORE_SCALE_KM = 10.0
+AGE_SCORE_RANGE = 15.0
+TIME_SCORE_SCALE_DAYS = 30.0
+PROBE_CACHE_SIZE = 32
+PHOTO_SEARCH_TOP_K = 10
+ALERT_POLL_SECONDS = 15
+NOTIFICATION_RETENTION_DAYS = 30  # read notifications older than this move to notifications_archive
+NOTIFICATION_ARCHIVE_DAYS = 365
+NOTIFICATION_ARCHIVE_INTERVAL_HOURS = 6
+RESOLVED_STATUSES = ('Found',)  # entering one of these stamps missing_persons.resolved_at
+ARCHIVE_STATUSES = RESOLVED_STATUSES
+CONFIRMED_MATCH_STATUSES = ('Escalated', 'Resolved')  # admin-confirmed matches; only these link reports into cases
+ARCHIVE_AFTER_DAYS = 30  # days since resolution before a case moves to the archive
+ARCHIVE_BATCH_SIZE = 100
+ARCHIVED_TABLES = ('missing_persons', 'match_results', 'face_embeddings')
+REPORTER_MESSAGES = {
+    'report': ("Report received", "Your missing person report #{report_id} was received. Tracking ID: {tracking_code}."),
+    'sighting': ("Sighting received", "Thank you for reporting sighting #{report_id}. Police will follow up with you shortly."),
+    'match': ("Update on your report", "There is an update on report #{report_id}. Authorities will contact you shortly."),
+}
+HEATMAP_MAX_POINTS = 2000  # aggregated cells shipped to the dashboard map
+HEATMAP_MIN_CELL_DEGREES = 0.001  # finest grid (~110 m) used while the case count allows it
+READ_CACHE_SIZE = 64  # page query results kept per process until the data version changes
+WRITE_QUEUE_SIZE = 1024  # queued writes per database file before submitters block
+WRITE_BATCH_SIZE = 64  # writes applied per group commit
+WRITE_BUSY_TIMEOUT = 30.0  # seconds a writer waits for other processes holding the file lock
 
 
 def generate_tracking_code(length: int = TRACKING_CODE_LENGTH) -> str:
@@ -122,38 +201,67 @@ alert("🔔 New critical alert received in the Missing Person Finder dashboard."
 
 
 def fetch_person_summary(person_id: int):
+    return fetch_person_summaries([person_id]).get(person_id)
+
+
+def fetch_person_summaries(person_ids) -> dict[int, dict]:
+    """Summaries of several reports in one query, keyed by report id; missing reports are left out."""
+    person_ids = [int(person_id) for person_id in person_ids]
+    summaries = {}
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("""
-        SELECT id, name, status, last_seen_location, reporter_phone, reporter_email, reporter_tracking_code, report_source
-        FROM missing_persons
-        WHERE id = ?
-    """, (person_id,))
-    row = c.fetchone()
+    for start in range(0, len(person_ids), 900):
+        chunk = person_ids[start:start + 900]
+        c.execute(f"""
+            SELECT id, name, status, last_seen_location, reporter_phone, reporter_email, reporter_tracking_code, report_source
+            FROM missing_persons
+            WHERE id IN ({','.join('?' for _ in chunk)})
+        """, chunk)
+        for row in c.fetchall():
+            summaries[row[0]] = {
+                "id": row[0],
+                "name": row[1],
+                "status": row[2],
+                "last_seen_location": row[3],
+                "phone": row[4],
+                "email": row[5],
+                "tracking": row[6],
+                "source": row[7]
+            }
     conn.close()
-    if not row:
-        return None
-    return {
-        "id": row[0],
-        "name": row[1],
-        "status": row[2],
-        "last_seen_location": row[3],
-        "phone": row[4],
-        "email": row[5],
-        "tracking": row[6],
-        "source": row[7]
-    }
+    return summaries
 
 
 def emit_admin_toasts():
-    pending = get_notifications(include_read=False, limit=5)
+    """Toast alerts created since the last poll; the first poll shows the latest unread ones."""
+    last_seen = st.session_state.get("last_notification_id")
+    if last_seen is None:
+        pending = list(reversed(get_notifications(include_read=False, limit=5)))
+        conn = connect_split("events")
+        last_seen = conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+        conn.close()
+    else:
+        pending = get_notifications_since(last_seen)
     displayed = st.session_state.setdefault("toast_ids", set())
     for note in pending:
+        last_seen = max(last_seen, note['id'])
         if note['id'] in displayed:
             continue
         trigger_alert_effect(note['id'])
         st.toast(f"{note['title']}: {note['message']}")
         displayed.add(note['id'])
+    st.session_state["last_notification_id"] = last_seen
+
+
+@st.fragment(run_every=ALERT_POLL_SECONDS)
+def admin_alerts_poller():
+    """Re-runs on its own every ALERT_POLL_SECONDS, fetching only alerts newer than the last one seen."""
+    emit_admin_toasts()
+    unread = count_unread_notifications()
+    if unread:
+        st.warning(f"🔔 {unread} unread alert(s)")
+    else:
+        st.caption("No unread alerts.")
 
 # --- AI Model Integration (Age/Gender) ---
 def detect_age_gender(image_bytes):
@@ -175,9 +283,112 @@ def detect_age_gender(image_bytes):
         return "Error", "Error"
 
 # --- Database Setup and Functions ---
+# Write-heavy tables live in their own SQLite files so that each file has its own writer lock:
+# a matching burst or an alert storm no longer blocks report submissions in the main database.
+SPLIT_DATABASES = {
+    'events': ('notifications', 'notifications_archive', 'outbox'),
+    'matches': ('match_results', 'case_links'),
+}
+
+
+def split_db_path(schema: str) -> str:
+    return f"{os.path.splitext(DB_PATH)[0]}_{schema}.db"
+
+
+def table_schema(table: str) -> str:
+    """Schema name a table lives under on a connect_db() connection."""
+    return next((schema for schema, tables in SPLIT_DATABASES.items() if table in tables), 'main')
+
+
+def connect_split(schema: str) -> sqlite3.Connection:
+    """Connection to one split database only, for queries that touch nothing else."""
+    return sqlite3.connect(split_db_path(schema))
+
+
+def connect_db(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Connection to the main database with every split database attached under its schema name.
+
+    Unqualified table names resolve across all attached files, so cross-database joins read as usual.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
+    for schema in SPLIT_DATABASES:
+        conn.execute("ATTACH DATABASE ? AS " + schema, (split_db_path(schema),))
+    return conn
+
+
+def _migrate_split_tables(c: sqlite3.Cursor):
+    """Move rows of split tables left in the main database by older versions, then drop the old tables."""
+    for schema, tables in SPLIT_DATABASES.items():
+        for table in tables:
+            if not c.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                continue
+            columns = ", ".join(info[1] for info in c.execute(f"PRAGMA main.table_info({table})").fetchall())
+            c.execute(f"INSERT OR IGNORE INTO {schema}.{table} ({columns}) SELECT {columns} FROM main.{table}")
+            c.execute(f"DROP TABLE main.{table}")
+
+
+def _dedupe_tracking_codes(c: sqlite3.Cursor):
+    """Give fresh codes to all but the first report sharing a tracking code, so the unique index can be built."""
+    if c.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'idx_missing_tracking_code'").fetchone():
+        return
+    c.execute("UPDATE missing_persons SET reporter_tracking_code = NULL WHERE trim(reporter_tracking_code) = ''")
+    duplicates = c.execute('''
+        SELECT id, reporter_tracking_code FROM missing_persons
+        WHERE reporter_tracking_code IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM missing_persons GROUP BY reporter_tracking_code)
+        ORDER BY id
+    ''').fetchall()
+    for report_id, old_code in duplicates:
+        new_code = generate_tracking_code()
+        while c.execute("SELECT 1 FROM missing_persons WHERE reporter_tracking_code = ?", (new_code,)).fetchone():
+            new_code = generate_tracking_code()
+        c.execute("UPDATE missing_persons SET reporter_tracking_code = ? WHERE id = ?", (new_code, report_id))
+        insert_notification(
+            c, "Tracking ID reassigned",
+            f"Report #{report_id} shared tracking ID {old_code} with an earlier report and now uses {new_code}.",
+            "warning", {"report_id": report_id, "old_code": old_code, "new_code": new_code}
+        )
+
+
+# Every Streamlit session writes through one writer thread per database file, which applies
+# queued jobs in group commits instead of letting sessions race for SQLite's lock.
+@st.cache_resource
+def _db_writer_registry() -> tuple[dict[str, DatabaseWriter], threading.Lock]:
+    """Cached as a resource so writers survive script reruns and are shared by all sessions."""
+    return {}, threading.Lock()
+
+
+def get_db_writer(schema: str = 'main') -> DatabaseWriter:
+    """Writer for the main database (with split databases and the archive attached) or for one split database."""
+    path = DB_PATH if schema == 'main' else split_db_path(schema)
+    attached = {}
+    if schema == 'main':
+        attached = {name: split_db_path(name) for name in SPLIT_DATABASES}
+        attached['archive'] = archive_db_path()
+    writers, lock = _db_writer_registry()
+    with lock:
+        writer = writers.get(path)
+        if writer is None:
+            writer = writers[path] = DatabaseWriter(
+                path, attached=attached, max_queue=WRITE_QUEUE_SIZE, max_batch=WRITE_BATCH_SIZE,
+                busy_timeout=WRITE_BUSY_TIMEOUT
+            )
+    return writer
+
+
+def submit_write(job, *args, schema: str = 'main') -> Future:
+    """Queue job(cursor, *args) on the database's writer; the future resolves once it is committed."""
+    return get_db_writer(schema).submit(job, *args)
+
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     c = conn.cursor()
+    # WAL lets page loads, exports and backups read while the writers commit; the mode is kept in each file
+    c.execute("ATTACH DATABASE ? AS archive", (archive_db_path(),))
+    for schema in ('main', *SPLIT_DATABASES, 'archive'):
+        c.execute(f"PRAGMA {schema}.journal_mode = WAL")
+    c.execute("DETACH DATABASE archive")
     c.execute('''
         CREATE TABLE IF NOT EXISTS missing_persons (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -211,16 +422,82 @@ def init_db():
         'location_lng': "REAL",
         'location_accuracy': "REAL",
         'reporter_tracking_code': "TEXT",
-        'report_source': "TEXT DEFAULT 'Public'"
+        'report_source': "TEXT DEFAULT 'Public'",
+        'faces_encoded': "INTEGER DEFAULT 0",
+        'face_quality': "REAL",
+        'duplicate_of': "INTEGER",
+        'age_band': "INTEGER",
+        'gender_key': "TEXT",
+        'segment': "TEXT",
+        'report_kind': "TEXT",
+        'cluster_id': "INTEGER",
+        'resolved_at': "DATETIME"
     }
     for column, definition in new_columns.items():
         if column not in existing_columns:
             c.execute(f"ALTER TABLE missing_persons ADD COLUMN {column} {definition}")
             if column == 'date_reported':
                 c.execute("UPDATE missing_persons SET date_reported = CURRENT_TIMESTAMP WHERE date_reported IS NULL")
+            if column == 'gender_key':
+                c.execute(f"UPDATE missing_persons SET age_band = {_age_band_sql('age')}, gender_key = {_gender_key_sql('gender')}")
+            if column == 'segment':
+                c.execute(f"UPDATE missing_persons SET segment = {_segment_sql('date_reported')}")
+            if column == 'report_kind':
+                c.execute(f"UPDATE missing_persons SET report_kind = {_report_kind_sql('')}")
+            if column == 'resolved_at':
+                # When older cases were resolved is unknown; start their archive clock now
+                c.execute(
+                    f"UPDATE missing_persons SET resolved_at = CURRENT_TIMESTAMP WHERE status IN ({_resolved_statuses_sql()})"
+                )
+
+    # Age/gender partition keys for the matcher, derived from the estimates on every write
+    for event, columns in (("INSERT", ""), ("UPDATE", " OF age, gender")):
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_partition_{event.lower()} AFTER {event}{columns} ON missing_persons
+            BEGIN
+                UPDATE missing_persons
+                SET age_band = {_age_band_sql('NEW.age')}, gender_key = {_gender_key_sql('NEW.gender')}
+                WHERE id = NEW.id;
+            END
+        ''')
+    # Monthly time segment of each report, used to shard the search indexes
+    for event, columns in (("INSERT", ""), ("UPDATE", " OF date_reported")):
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_segment_{event.lower()} AFTER {event}{columns} ON missing_persons
+            BEGIN
+                UPDATE missing_persons SET segment = {_segment_sql('NEW.date_reported')} WHERE id = NEW.id;
+            END
+        ''')
+
+    # When a case was resolved, stamped on every status write path so archiving counts from resolution
+    for event, columns, condition in (("INSERT", "", "1"), ("UPDATE", " OF status", "NEW.status IS NOT OLD.status")):
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_resolved_{event.lower()} AFTER {event}{columns} ON missing_persons
+            WHEN {condition}
+            BEGIN
+                UPDATE missing_persons
+                SET resolved_at = CASE WHEN NEW.status IN ({_resolved_statuses_sql()}) THEN CURRENT_TIMESTAMP END
+                WHERE id = NEW.id;
+            END
+        ''')
+
+    # Sighting vs missing partition, fixed when the report is filed
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_report_kind_insert AFTER INSERT ON missing_persons
+        BEGIN
+            UPDATE missing_persons SET report_kind = {_report_kind_sql('NEW.')} WHERE id = NEW.id;
+        END
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
 
     c.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
+        CREATE TABLE IF NOT EXISTS events.notifications (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             message TEXT NOT NULL,
@@ -230,9 +507,40 @@ def init_db():
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events.notifications_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            level TEXT,
+            payload TEXT,
+            is_read INTEGER,
+            created_at DATETIME,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Reporter SMS/email waiting for outbox.py; a claimed row's next_attempt_at doubles as its lease
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events.outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT,
+            body TEXT NOT NULL,
+            report_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME
+        )
+    ''')
 
+    # Report ids reference missing_persons in the main database; SQLite cannot enforce that across files
     c.execute('''
-        CREATE TABLE IF NOT EXISTS match_results (
+        CREATE TABLE IF NOT EXISTS matches.match_results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             source_report_id INTEGER NOT NULL,
             candidate_report_id INTEGER,
@@ -241,28 +549,202 @@ def init_db():
             details TEXT,
             status TEXT DEFAULT 'New',
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(source_report_id) REFERENCES missing_persons(id),
-            FOREIGN KEY(candidate_report_id) REFERENCES missing_persons(id)
+            cluster_id INTEGER
         )
     ''')
 
+    backfill_case_links = not c.execute(
+        "SELECT 1 FROM matches.sqlite_master WHERE type = 'table' AND name = 'case_links' "
+        "UNION ALL SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'case_links'"
+    ).fetchone()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS matches.case_links (
+            report_id INTEGER PRIMARY KEY,
+            case_id INTEGER NOT NULL
+        )
+    ''')
+    _migrate_split_tables(c)
+
+    # Leader clustering of single-face sightings: one running-mean centroid per unidentified person
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sighting_clusters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            centroid BLOB NOT NULL,
+            member_count INTEGER NOT NULL DEFAULT 1,
+            leader_report_id INTEGER,
+            matched_centroid BLOB,
+            matched_scope TEXT,
+            matched_at DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute("PRAGMA table_info(sighting_clusters)")
+    cluster_columns = {info[1] for info in c.fetchall()}
+    for column, definition in (("matched_centroid", "BLOB"), ("matched_scope", "TEXT"), ("matched_at", "DATETIME")):
+        if column not in cluster_columns:
+            c.execute(f"ALTER TABLE sighting_clusters ADD COLUMN {column} {definition}")
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS face_embeddings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            face_index INTEGER NOT NULL,
+            box_top INTEGER,
+            box_right INTEGER,
+            box_bottom INTEGER,
+            box_left INTEGER,
+            encoding BLOB NOT NULL,
+            quality REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(report_id) REFERENCES missing_persons(id)
+        )
+    ''')
+    c.execute("PRAGMA table_info(face_embeddings)")
+    if 'quality' not in {info[1] for info in c.fetchall()}:
+        c.execute("ALTER TABLE face_embeddings ADD COLUMN quality REAL")
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            report_id INTEGER PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            dhash INTEGER NOT NULL,
+            band0 INTEGER NOT NULL,
+            band1 INTEGER NOT NULL,
+            band2 INTEGER NOT NULL,
+            band3 INTEGER NOT NULL,
+            FOREIGN KEY(report_id) REFERENCES missing_persons(id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS refined_face_embeddings (
+            report_id INTEGER NOT NULL,
+            face_index INTEGER NOT NULL,
+            num_jitters INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            encoding BLOB NOT NULL,
+            PRIMARY KEY (report_id, face_index, num_jitters, model),
+            FOREIGN KEY(report_id) REFERENCES missing_persons(id)
+        )
+    ''')
+
+    # Spatial index over report coordinates, kept in sync by triggers so every insert path is covered
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS report_locations USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_locations_insert AFTER INSERT ON missing_persons
+        WHEN NEW.location_lat IS NOT NULL AND NEW.location_lng IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO report_locations VALUES (NEW.id, NEW.location_lat, NEW.location_lat, NEW.location_lng, NEW.location_lng);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_locations_update AFTER UPDATE OF location_lat, location_lng ON missing_persons
+        BEGIN
+            DELETE FROM report_locations WHERE id = OLD.id;
+            INSERT INTO report_locations
+            SELECT NEW.id, NEW.location_lat, NEW.location_lat, NEW.location_lng, NEW.location_lng
+            WHERE NEW.location_lat IS NOT NULL AND NEW.location_lng IS NOT NULL;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_locations_delete AFTER DELETE ON missing_persons
+        BEGIN
+            DELETE FROM report_locations WHERE id = OLD.id;
+        END
+    ''')
+    c.execute('''
+        INSERT INTO report_locations
+        SELECT id, location_lat, location_lat, location_lng, location_lng
+        FROM missing_persons
+        WHERE location_lat IS NOT NULL AND location_lng IS NOT NULL
+          AND id NOT IN (SELECT id FROM report_locations)
+    ''')
+
     c.execute("CREATE INDEX IF NOT EXISTS idx_missing_status ON missing_persons(status)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_missing_tracking ON missing_persons(reporter_tracking_code)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_notifications_read ON notifications(is_read)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_matches_status ON match_results(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_missing_partition ON missing_persons(status, gender_key, age_band)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_missing_segment ON missing_persons(status, segment)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_missing_kind ON missing_persons(report_kind, status, segment)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_hashes_sha256 ON image_hashes(sha256)")
+    for band in range(DHASH_BANDS):
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_hashes_band{band} ON image_hashes(band{band})")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_faces_report ON face_embeddings(report_id)")
+    _dedupe_tracking_codes(c)
+    c.execute("DROP INDEX IF EXISTS idx_missing_tracking")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_missing_tracking_code ON missing_persons(reporter_tracking_code)")
+    c.execute("CREATE INDEX IF NOT EXISTS events.idx_notifications_unread ON notifications(is_read, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS events.idx_notifications_created ON notifications(created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS events.idx_notifications_archive_archived ON notifications_archive(archived_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS events.idx_outbox_due ON outbox(status, channel, next_attempt_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS matches.idx_matches_status ON match_results(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS matches.idx_matches_cluster ON match_results(cluster_id, match_type)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_missing_cluster ON missing_persons(cluster_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS matches.idx_case_links_case ON case_links(case_id)")
 
     conn.commit()
     conn.close()
+    if backfill_case_links:
+        rebuild_case_links()
 
-def create_notification(title: str, message: str, level: str = 'info', payload: dict | None = None):
+def get_setting(key: str, default=None):
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    row = conn.execute("SELECT value FROM app_settings WHERE key = ?", (key,)).fetchone()
+    conn.close()
+    return row[0] if row else default
+
+
+def set_setting(key: str, value):
+    submit_write(
+        lambda c: c.execute("INSERT OR REPLACE INTO app_settings (key, value) VALUES (?, ?)", (key, str(value)))
+    ).result()
+
+
+def insert_notification(c: sqlite3.Cursor, title: str, message: str, level: str = 'info', payload: dict | None = None) -> int:
     c.execute(
         "INSERT INTO notifications (title, message, level, payload) VALUES (?, ?, ?, ?)",
         (title, message, level, json.dumps(payload) if payload else None)
     )
-    conn.commit()
+    return c.lastrowid
+
+
+def create_notification(title: str, message: str, level: str = 'info', payload: dict | None = None) -> int:
+    """Queue an alert on the events writer and return its id once committed."""
+    return submit_write(insert_notification, title, message, level, payload, schema='events').result()
+
+
+def _enqueue_outbox_job(c: sqlite3.Cursor, messages: list[tuple]):
+    c.executemany(
+        "INSERT INTO outbox (channel, recipient, subject, body, report_id) VALUES (?, ?, ?, ?, ?)", messages
+    )
+
+
+def queue_reporter_messages(report_ids: list[int], subject: str, body: str):
+    """Queue an SMS and/or email to the consenting reporters of the given reports.
+
+    Only the outbox row is written here; outbox.py delivers it, so callers never wait on a provider.
+    Bodies may use {report_id} and {tracking_code}.
+    """
+    if not report_ids:
+        return
+    placeholders = ",".join("?" for _ in report_ids)
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute(
+        f"""
+        SELECT id, reporter_phone, reporter_email, reporter_tracking_code FROM missing_persons
+        WHERE id IN ({placeholders}) AND reporter_consent = 1
+        """,
+        list(report_ids)
+    ).fetchall()
     conn.close()
+    messages = []
+    for report_id, phone, email, tracking_code in rows:
+        text = body.format(report_id=report_id, tracking_code=tracking_code or "N/A")
+        if phone:
+            messages.append(("sms", phone, None, text, report_id))
+        if email:
+            messages.append(("email", email, subject, text, report_id))
+    if messages:
+        submit_write(_enqueue_outbox_job, messages, schema='events').result()
 
 
 def notify_new_submission(report_id: int, source: str, tracking_code: str | None, reporter_phone: str | None):
@@ -285,15 +767,7 @@ def notify_new_submission(report_id: int, source: str, tracking_code: str | None
     )
 
 
-def get_notifications(include_read: bool = False, limit: int = 20):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    if include_read:
-        c.execute("SELECT id, title, message, level, payload, is_read, created_at FROM notifications ORDER BY created_at DESC LIMIT ?", (limit,))
-    else:
-        c.execute("SELECT id, title, message, level, payload, is_read, created_at FROM notifications WHERE is_read = 0 ORDER BY created_at DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+def _notification_dicts(rows) -> list[dict]:
     return [
         {
             "id": row[0],
@@ -308,314 +782,2068 @@ def get_notifications(include_read: bool = False, limit: int = 20):
     ]
 
 
+def get_notifications(include_read: bool = False, limit: int = 20):
+    """Newest notifications first (ids increase with creation time, so this walks the index)."""
+    conn = connect_split("events")
+    c = conn.cursor()
+    if include_read:
+        c.execute("SELECT id, title, message, level, payload, is_read, created_at FROM notifications ORDER BY id DESC LIMIT ?", (limit,))
+    else:
+        c.execute("SELECT id, title, message, level, payload, is_read, created_at FROM notifications WHERE is_read = 0 ORDER BY id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return _notification_dicts(rows)
+
+
+def get_notifications_since(last_seen_id: int, include_read: bool = False, limit: int = 50) -> list[dict]:
+    """Notifications created after last_seen_id, oldest first, for incremental polling."""
+    conn = connect_split("events")
+    c = conn.cursor()
+    c.execute(
+        f"""
+        SELECT id, title, message, level, payload, is_read, created_at
+        FROM notifications
+        WHERE id > ? {"" if include_read else "AND is_read = 0"}
+        ORDER BY id
+        LIMIT ?
+        """,
+        (last_seen_id, limit)
+    )
+    rows = c.fetchall()
+    conn.close()
+    return _notification_dicts(rows)
+
+
+def count_unread_notifications() -> int:
+    conn = connect_split("events")
+    count = conn.execute("SELECT COUNT(*) FROM notifications WHERE is_read = 0").fetchone()[0]
+    conn.close()
+    return count
+
+
+def archive_read_notifications(retention_days: int = NOTIFICATION_RETENTION_DAYS,
+                               archive_days: int = NOTIFICATION_ARCHIVE_DAYS, batch_size: int = 500) -> int:
+    """Move read notifications older than retention_days to notifications_archive in batches.
+
+    Archived notifications older than archive_days are deleted. Returns the number moved.
+    """
+    moved = 0
+    while True:
+        batch = submit_write(_archive_notifications_job, retention_days, batch_size, schema='events').result()
+        if not batch:
+            break
+        moved += batch
+    submit_write(
+        lambda c: c.execute("DELETE FROM notifications_archive WHERE archived_at < datetime('now', ?)", (f"-{int(archive_days)} days",)),
+        schema='events'
+    ).result()
+    return moved
+
+
+def _archive_notifications_job(c: sqlite3.Cursor, retention_days: int, batch_size: int) -> int:
+    ids = [row[0] for row in c.execute(
+        "SELECT id FROM notifications WHERE is_read = 1 AND created_at < datetime('now', ?) ORDER BY id LIMIT ?",
+        (f"-{int(retention_days)} days", batch_size)
+    ).fetchall()]
+    if ids:
+        placeholders = ",".join("?" for _ in ids)
+        c.execute(
+            f"""
+            INSERT OR REPLACE INTO notifications_archive (id, title, message, level, payload, is_read, created_at)
+            SELECT id, title, message, level, payload, is_read, created_at FROM notifications WHERE id IN ({placeholders})
+            """,
+            ids
+        )
+        c.execute(f"DELETE FROM notifications WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+
+def maybe_run_maintenance():
+    """Archive old notifications and resolved cases at most once per NOTIFICATION_ARCHIVE_INTERVAL_HOURS."""
+    last_run = get_setting("notifications_archived_at")
+    now = datetime.datetime.now()
+    if last_run and now - datetime.datetime.fromisoformat(last_run) < datetime.timedelta(hours=NOTIFICATION_ARCHIVE_INTERVAL_HOURS):
+        return
+    set_setting("notifications_archived_at", now.isoformat())
+    archive_read_notifications()
+    archive_resolved_cases()
+
+
 def mark_notification_read(notification_id: int):
-    conn = sqlite3.connect(DB_PATH)
+    get_db_writer('events').execute("UPDATE notifications SET is_read = 1 WHERE id = ?", (notification_id,)).result()
+
+
+def delete_notification(notification_id: int):
+    get_db_writer('events').execute("DELETE FROM notifications WHERE id = ?", (notification_id,)).result()
+
+
+def delete_match(match_id: int):
+    members = _match_case_members(match_id)
+    get_db_writer('matches').execute("DELETE FROM match_results WHERE id = ?", (match_id,)).result()
+    if members:
+        rebuild_case_links(members)
+
+
+def _set_status_job(c: sqlite3.Cursor, person_id: int, new_status: str):
+    c.execute("UPDATE missing_persons SET status = ? WHERE id = ?", (new_status, person_id))
+
+
+def set_status(person_id: int, new_status: str, notify: bool = True):
+    submit_write(_set_status_job, person_id, new_status).result()
+    if notify:
+        create_notification(
+            "Report status updated",
+            f"Report #{person_id} marked as {new_status}.",
+            payload={"person_id": person_id, "status": new_status}
+        )
+
+
+def _insert_report_job(c: sqlite3.Cursor, fields: dict) -> int:
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" for _ in fields)
+    for attempt in range(TRACKING_CODE_RETRIES + 1):
+        try:
+            c.execute(f"INSERT INTO missing_persons ({columns}) VALUES ({placeholders})", tuple(fields.values()))
+            return c.lastrowid
+        except sqlite3.IntegrityError as error:
+            # A failed INSERT leaves the transaction intact, so a fresh code can be tried right away
+            if "reporter_tracking_code" not in str(error) or attempt == TRACKING_CODE_RETRIES:
+                raise
+            fields["reporter_tracking_code"] = generate_tracking_code()
+
+
+def insert_report(fields: dict) -> int:
+    """Queue a new report on the main writer and return its id once committed.
+
+    A tracking code that is already taken is replaced in `fields` with a fresh one.
+    """
+    return submit_write(_insert_report_job, fields).result()
+
+
+def update_status(person_id, new_status):
+    set_status(person_id, new_status, notify=True)
+
+
+def delete_report(person_id):
+    delete_reports([person_id])
+
+
+def _delete_reports_job(c: sqlite3.Cursor, person_ids: list[int]):
+    placeholders = ",".join("?" for _ in person_ids)
+    for pid in person_ids:
+        _leave_sighting_cluster(c, pid)
+    c.execute(f"DELETE FROM face_embeddings WHERE report_id IN ({placeholders})", person_ids)
+    c.execute(f"DELETE FROM refined_face_embeddings WHERE report_id IN ({placeholders})", person_ids)
+    c.execute(f"DELETE FROM image_hashes WHERE report_id IN ({placeholders})", person_ids)
+    c.execute(f"DELETE FROM case_links WHERE report_id IN ({placeholders})", person_ids)
+    c.execute(f"DELETE FROM missing_persons WHERE id IN ({placeholders})", person_ids)
+    for pid in person_ids:
+        insert_notification(c, "Report deleted", f"Report #{pid} removed by admin.", "warning", {"person_id": pid})
+
+
+def delete_reports(person_ids: list[int]):
+    """Delete reports and everything derived from them in one transaction."""
+    person_ids = [int(pid) for pid in person_ids]
+    if not person_ids:
+        return
+    submit_write(_delete_reports_job, person_ids).result()
+    remove_from_embedding_store(person_ids)
+
+
+# --- Linked Cases ---
+# case_links maps every report linked by a confirmed match to its case id. Unions relabel the smaller
+# case, so each report always points straight at its case and a whole case is one indexed lookup.
+def _union_cases(c: sqlite3.Cursor, first_id: int, second_id: int):
+    rows = dict(c.execute(
+        "SELECT report_id, case_id FROM case_links WHERE report_id IN (?, ?)", (first_id, second_id)
+    ).fetchall())
+    first_case = rows.get(first_id, first_id)
+    second_case = rows.get(second_id, second_id)
+    c.execute("INSERT OR IGNORE INTO case_links (report_id, case_id) VALUES (?, ?)", (first_id, first_case))
+    c.execute("INSERT OR IGNORE INTO case_links (report_id, case_id) VALUES (?, ?)", (second_id, second_case))
+    if first_case == second_case:
+        return
+    sizes = dict(c.execute(
+        "SELECT case_id, COUNT(*) FROM case_links WHERE case_id IN (?, ?) GROUP BY case_id", (first_case, second_case)
+    ).fetchall())
+    keep, merge = sorted((first_case, second_case), key=lambda case_id: (-sizes.get(case_id, 0), case_id))
+    c.execute("UPDATE case_links SET case_id = ? WHERE case_id = ?", (keep, merge))
+
+
+def rebuild_case_links(report_ids: list[int] | None = None):
+    """Recompute cases from confirmed matches, for all reports or just the given ones."""
+    if report_ids is not None and not report_ids:
+        return
+    submit_write(_rebuild_case_links_job, report_ids, schema='matches').result()
+
+
+def _rebuild_case_links_job(c: sqlite3.Cursor, report_ids: list[int] | None):
+    if report_ids is None:
+        c.execute("DELETE FROM case_links")
+        edges = c.execute(
+            f"""
+            SELECT source_report_id, candidate_report_id FROM match_results
+            WHERE candidate_report_id IS NOT NULL AND status IN ({_confirmed_statuses_sql()})
+            """
+        ).fetchall()
+    else:
+        placeholders = ",".join("?" for _ in report_ids)
+        c.execute(f"DELETE FROM case_links WHERE report_id IN ({placeholders})", report_ids)
+        edges = c.execute(
+            f"""
+            SELECT source_report_id, candidate_report_id FROM match_results
+            WHERE candidate_report_id IS NOT NULL AND status IN ({_confirmed_statuses_sql()})
+              AND (source_report_id IN ({placeholders}) OR candidate_report_id IN ({placeholders}))
+            """,
+            report_ids + report_ids
+        ).fetchall()
+    for first_id, second_id in edges:
+        _union_cases(c, first_id, second_id)
+
+
+def _confirmed_statuses_sql() -> str:
+    return ",".join(f"'{status}'" for status in CONFIRMED_MATCH_STATUSES)
+
+
+def _match_case_members(match_id: int) -> list[int]:
+    conn = connect_split("matches")
+    rows = conn.execute(
+        """
+        SELECT report_id FROM case_links
+        WHERE case_id = (
+            SELECT case_id FROM case_links
+            WHERE report_id = (SELECT source_report_id FROM match_results WHERE id = ?)
+        )
+        """,
+        (match_id,)
+    ).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def get_case_report_ids(person_id: int) -> list[int]:
+    """Every report linked to the given one through confirmed matches, directly or transitively (itself included)."""
+    conn = connect_split("matches")
+    rows = conn.execute(
+        "SELECT report_id FROM case_links WHERE case_id = (SELECT case_id FROM case_links WHERE report_id = ?)",
+        (person_id,)
+    ).fetchall()
+    conn.close()
+    return sorted({person_id, *(row[0] for row in rows)})
+
+
+def get_matched_partner_ids(person_id: int) -> list[int]:
+    """Return other report IDs linked to the given person by confirmed matches, including transitive links."""
+    return [pid for pid in get_case_report_ids(person_id) if pid != person_id]
+
+
+def get_direct_partner_ids(person_id: int) -> list[int]:
+    """Reports with a queued or confirmed (not dismissed) match to the given one."""
+    conn = connect_split("matches")
+    rows = conn.execute(
+        """
+        SELECT candidate_report_id FROM match_results
+        WHERE source_report_id = ? AND candidate_report_id IS NOT NULL AND status != 'Dismissed'
+        UNION
+        SELECT source_report_id FROM match_results WHERE candidate_report_id = ? AND status != 'Dismissed'
+        """,
+        (person_id, person_id)
+    ).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def _reviewed_report_ids(person_id: int) -> list[int]:
+    """The report an admin acts on, its confirmed case and its direct match partners.
+
+    Unconfirmed matches of those partners are not followed, so one false match cannot pull a
+    third report into a resolve or delete.
+    """
+    return sorted({*get_case_report_ids(person_id), *get_direct_partner_ids(person_id)})
+
+
+def resolve_match_as_found(person_id: int):
+    """Mark a matched record, its confirmed case and its direct partners as Found, confirming the matches between them."""
+    submit_write(_resolve_as_found_job, person_id, _reviewed_report_ids(person_id)).result()
+
+
+def _resolve_as_found_job(c: sqlite3.Cursor, person_id: int, all_ids: list[int]):
+    placeholders = ",".join("?" for _ in all_ids)
+    c.execute(f"UPDATE missing_persons SET status = 'Found' WHERE id IN ({placeholders})", all_ids)
+    edges = c.execute(
+        f"""
+        UPDATE match_results
+        SET status = 'Resolved'
+        WHERE source_report_id IN ({placeholders}) AND candidate_report_id IN ({placeholders}) AND status != 'Dismissed'
+        RETURNING source_report_id, candidate_report_id
+        """,
+        all_ids + all_ids,
+    ).fetchall()
+    for first_id, second_id in edges:
+        _union_cases(c, first_id, second_id)
+    insert_notification(
+        c, "Report status updated", f"Report #{person_id} marked as Found.",
+        payload={"person_id": person_id, "status": "Found", "linked_reports": all_ids}
+    )
+
+
+def delete_report_and_matches(person_id: int):
+    """Delete a report plus its confirmed case and direct match partners, and clean up match records."""
+    unique_ids = _reviewed_report_ids(person_id)
+    placeholders = ",".join("?" for _ in unique_ids)
+    get_db_writer('matches').execute(
+        f"""
+        DELETE FROM match_results
+        WHERE source_report_id IN ({placeholders}) OR candidate_report_id IN ({placeholders})
+        """,
+        unique_ids + unique_ids,
+    ).result()
+    delete_reports(unique_ids)
+
+
+def get_stats():
+    conn = connect_db()
     c = conn.cursor()
-    c.execute("UPDATE notifications SET is_read = 1 WHERE id = ?", (notification_id,))
+    missing_count = c.execute("SELECT COUNT(*) FROM missing_persons WHERE status = 'Missing'").fetchone()[0]
+    found_count = c.execute("SELECT COUNT(*) FROM missing_persons WHERE status = 'Found'").fetchone()[0]
+    if os.path.exists(archive_db_path()):
+        c.execute("ATTACH DATABASE ? AS archive", (archive_db_path(),))
+        if c.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'missing_persons'").fetchone():
+            found_count += c.execute("SELECT COUNT(*) FROM archive.missing_persons WHERE status = 'Found'").fetchone()[0]
+    alerts = c.execute("SELECT COUNT(*) FROM notifications WHERE is_read = 0").fetchone()[0]
+    pending_matches = c.execute("SELECT COUNT(*) FROM match_results WHERE status IN ('New','Under Review')").fetchone()[0]
+    conn.close()
+    return missing_count, found_count, alerts, pending_matches
+
+
+# --- Case Archive ---
+# Resolved cases move to a separate SQLite file so the hot database stays small; it is ATTACHed
+# as "archive" whenever archived rows are read or written.
+def archive_db_path() -> str:
+    return f"{os.path.splitext(DB_PATH)[0]}_archive.db"
+
+
+def _sync_archive_tables(c: sqlite3.Cursor):
+    """Create or extend the archive copies of ARCHIVED_TABLES to match the hot schema."""
+    for table in ARCHIVED_TABLES:
+        columns = [(info[1], info[2]) for info in c.execute(f"PRAGMA {table_schema(table)}.table_info({table})").fetchall()]
+        archived = {info[1] for info in c.execute(f"PRAGMA archive.table_info({table})").fetchall()}
+        if not archived:
+            definitions = ", ".join(
+                f"{name} INTEGER PRIMARY KEY" if name == "id" else f"{name} {declared}" for name, declared in columns
+            )
+            c.execute(f"CREATE TABLE archive.{table} ({definitions}, archived_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+            if table != 'missing_persons':
+                c.execute(f"CREATE INDEX archive.idx_{table}_report ON {table}({'report_id' if table == 'face_embeddings' else 'source_report_id'})")
+        else:
+            for name, declared in columns:
+                if name not in archived:
+                    c.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {declared}")
+
+
+def connect_with_archive(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Connection to the hot database with the archive attached as "archive"."""
+    conn = connect_db(check_same_thread)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_db_path(),))
+    _sync_archive_tables(conn.cursor())
     conn.commit()
+    return conn
+
+
+def _resolved_statuses_sql() -> str:
+    return ",".join(f"'{status}'" for status in RESOLVED_STATUSES)
+
+
+def _archive_batch_job(c: sqlite3.Cursor, statuses: tuple[str, ...], min_age_days: int, batch_size: int) -> list[int]:
+    """Copy one batch of cases resolved over min_age_days ago into the archive; returns their ids."""
+    placeholders = ",".join("?" for _ in statuses)
+    ids = [row[0] for row in c.execute(
+        f"""
+        SELECT id FROM main.missing_persons
+        WHERE status IN ({placeholders}) AND resolved_at < datetime('now', ?)
+        ORDER BY id LIMIT ?
+        """,
+        (*statuses, f"-{int(min_age_days)} days", batch_size)
+    ).fetchall()]
+    if not ids:
+        return ids
+    _sync_archive_tables(c)
+    # Sightings leave their cluster while their face rows are still there to subtract from the centroid
+    for pid in ids:
+        _leave_sighting_cluster(c, pid)
+    _copy_to_archive(c, ids)
+    return ids
+
+
+def _archived_rows(ids: list[int]):
+    id_list = ",".join("?" for _ in ids)
+    for table, where in (
+        ('missing_persons', f"id IN ({id_list})"),
+        ('match_results', f"source_report_id IN ({id_list}) OR candidate_report_id IN ({id_list})"),
+        ('face_embeddings', f"report_id IN ({id_list})"),
+    ):
+        yield table, table_schema(table), where, ids * where.count("IN (")
+
+
+def _copy_to_archive(c: sqlite3.Cursor, ids: list[int]):
+    for table, schema, where, params in _archived_rows(ids):
+        columns = ", ".join(info[1] for info in c.execute(f"PRAGMA {schema}.table_info({table})").fetchall())
+        c.execute(f"INSERT OR REPLACE INTO archive.{table} ({columns}) SELECT {columns} FROM {schema}.{table} WHERE {where}", params)
+
+
+def _archive_delete_job(c: sqlite3.Cursor, ids: list[int]):
+    """Remove archived cases from the hot databases, refreshing their archive copies first."""
+    _copy_to_archive(c, ids)
+    for table, schema, where, params in _archived_rows(ids):
+        c.execute(f"DELETE FROM {schema}.{table} WHERE {where}", params)
+    id_list = ",".join("?" for _ in ids)
+    for table in ('refined_face_embeddings', 'image_hashes', 'case_links'):
+        c.execute(f"DELETE FROM {table_schema(table)}.{table} WHERE report_id IN ({id_list})", ids)
+
+
+def archive_resolved_cases(statuses: tuple[str, ...] = ARCHIVE_STATUSES, min_age_days: int = ARCHIVE_AFTER_DAYS,
+                           batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move cases resolved over min_age_days ago, with images, faces and match history, into the archive database.
+
+    Each batch runs on the main writer, which has the archive attached. In WAL mode a commit is atomic per file
+    only, so the copies are committed before the originals are deleted: a crash in between leaves rows in both
+    databases, which the next run copies again and removes, but never loses them. Returns the number of reports archived.
+    """
+    archived = 0
+    while True:
+        ids = submit_write(_archive_batch_job, statuses, min_age_days, batch_size).result()
+        if not ids:
+            break
+        submit_write(_archive_delete_job, ids).result()
+        remove_from_embedding_store(ids)
+        archived += len(ids)
+    return archived
+
+
+def load_archived_faces():
+    """Face metadata and encodings of archived reports, shaped like load_candidate_faces output."""
+    if not os.path.exists(archive_db_path()):
+        return np.empty(0, dtype=META_DTYPE), np.empty((0, 0), dtype=np.float32)
+    conn = connect_with_archive()
+    rows = conn.execute(
+        "SELECT report_id, face_index, box_top, box_right, box_bottom, box_left, encoding FROM archive.face_embeddings"
+    ).fetchall()
+    conn.close()
+    meta = np.empty(len(rows), dtype=META_DTYPE)
+    if not rows:
+        return meta, np.empty((0, 0), dtype=np.float32)
+    meta["report_id"] = [row[0] for row in rows]
+    meta["face_index"] = [row[1] for row in rows]
+    meta["box"] = [np.clip(row[2:6], 0, 65535) for row in rows]
+    return meta, np.vstack([np.frombuffer(row[6], dtype=np.float32) for row in rows])
+
+
+def record_match_result(source_report_id: int, candidate_report_id: int | None, similarity: float, match_type: str,
+                        details: dict, cluster_id: int | None = None) -> bool:
+    """Store a match unless it repeats one already queued; returns whether a row was added.
+
+    With a sighting cluster_id, one row is kept per cluster and missing report, so repeat
+    sightings of the same person do not queue the same match again.
+    """
+    partner_id = None
+    if cluster_id is not None:
+        conn = sqlite3.connect(DB_PATH)
+        row = conn.execute("SELECT cluster_id FROM missing_persons WHERE id = ?", (source_report_id,)).fetchone()
+        conn.close()
+        partner_id = candidate_report_id if row and row[0] == cluster_id else source_report_id
+    return submit_write(
+        _record_match_job, source_report_id, candidate_report_id, similarity, match_type, details, cluster_id, partner_id,
+        schema='matches'
+    ).result()
+
+
+def _record_match_job(c: sqlite3.Cursor, source_report_id: int, candidate_report_id: int | None, similarity: float,
+                      match_type: str, details: dict, cluster_id: int | None, partner_id: int | None) -> bool:
+    # Avoid duplicate matches for the same pair and type; checked on the writer, so concurrent submissions cannot race
+    c.execute(
+        "SELECT id FROM match_results WHERE source_report_id = ? AND candidate_report_id IS ? AND match_type = ?",
+        (source_report_id, candidate_report_id, match_type)
+    )
+    existing = c.fetchone()
+    if not existing and cluster_id is not None:
+        c.execute(
+            """
+            SELECT id FROM match_results
+            WHERE cluster_id = ? AND match_type = ? AND (source_report_id = ? OR candidate_report_id = ?)
+            """,
+            (cluster_id, match_type, partner_id, partner_id)
+        )
+        existing = c.fetchone()
+    if existing:
+        return False
+
+    c.execute(
+        '''
+        INSERT INTO match_results (source_report_id, candidate_report_id, similarity, match_type, details, cluster_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''',
+        (source_report_id, candidate_report_id, similarity, match_type, json.dumps(details), cluster_id)
+    )
+    return True
+
+
+def update_match_status(match_id: int, new_status: str):
+    if new_status in CONFIRMED_MATCH_STATUSES:
+        submit_write(_confirm_match_job, match_id, new_status, schema='matches').result()
+        return
+    members = _match_case_members(match_id)
+    get_db_writer('matches').execute("UPDATE match_results SET status = ? WHERE id = ?", (new_status, match_id)).result()
+    if members:
+        # A match that is no longer confirmed no longer links its reports, which may split the case
+        rebuild_case_links(members)
+
+
+def _confirm_match_job(c: sqlite3.Cursor, match_id: int, new_status: str):
+    row = c.execute(
+        "UPDATE match_results SET status = ? WHERE id = ? RETURNING source_report_id, candidate_report_id",
+        (new_status, match_id)
+    ).fetchone()
+    if row and row[1] is not None:
+        _union_cases(c, row[0], row[1])
+
+
+def get_match_results(status_filter: list[str] | None = None, limit: int = 20):
+    conn = connect_split("matches")
+    c = conn.cursor()
+    if status_filter:
+        placeholders = ",".join("?" for _ in status_filter)
+        query = f'''
+            SELECT id, source_report_id, candidate_report_id, similarity, match_type, details, status, created_at, cluster_id
+            FROM match_results
+            WHERE status IN ({placeholders})
+            ORDER BY created_at DESC
+            LIMIT ?
+        '''
+        c.execute(query, (*status_filter, limit))
+    else:
+        c.execute('''
+            SELECT id, source_report_id, candidate_report_id, similarity, match_type, details, status, created_at, cluster_id
+            FROM match_results
+            ORDER BY created_at DESC
+            LIMIT ?
+        ''', (limit,))
+    rows = c.fetchall()
     conn.close()
+    return [
+        {
+            "id": row[0],
+            "source_report_id": row[1],
+            "candidate_report_id": row[2],
+            "similarity": row[3],
+            "match_type": row[4],
+            "details": json.loads(row[5]) if row[5] else {},
+            "status": row[6],
+            "created_at": row[7],
+            "cluster_id": row[8]
+        } for row in rows
+    ]
 
 
-def delete_notification(notification_id: int):
+def group_matches_by_cluster(matches: list[dict]) -> list[list[dict]]:
+    """Group queued matches so each sighting cluster is reviewed as one alert per missing report, in queue order."""
+    sources = sorted({match["source_report_id"] for match in matches if match.get("cluster_id") is not None})
     conn = sqlite3.connect(DB_PATH)
+    source_clusters = dict(conn.execute(
+        f"SELECT id, cluster_id FROM missing_persons WHERE id IN ({','.join('?' for _ in sources)})", sources
+    ).fetchall()) if sources else {}
+    conn.close()
+    groups = {}
+    for match in matches:
+        cluster_id = match.get("cluster_id")
+        if cluster_id is None:
+            key = ("match", match["id"])
+        else:
+            # The cluster's sighting may be either end of the match; the other end is the missing report
+            in_cluster = source_clusters.get(match["source_report_id"]) == cluster_id
+            key = ("cluster", cluster_id, match["candidate_report_id"] if in_cluster else match["source_report_id"])
+        groups.setdefault(key, []).append(match)
+    return list(groups.values())
+
+
+def get_person_matches(person_id: int, include_archive: bool = False):
+    """Matches involving a report, newest first; with include_archive, archived matches are read too."""
+    columns = "id, source_report_id, candidate_report_id, similarity, match_type, status, created_at"
+    where = "WHERE source_report_id = ? OR candidate_report_id = ?"
+    if include_archive:
+        # UNION drops the identical copies an interrupted archive pass leaves in both files
+        conn = connect_with_archive()
+        query = f"""
+            SELECT {columns} FROM matches.match_results {where}
+            UNION
+            SELECT {columns} FROM archive.match_results {where}
+            ORDER BY created_at DESC
+        """
+        params = (person_id, person_id) * 2
+    else:
+        conn = connect_split("matches")
+        query = f"SELECT {columns} FROM match_results {where} ORDER BY created_at DESC"
+        params = (person_id, person_id)
     c = conn.cursor()
-    c.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
-    conn.commit()
+    c.execute(query, params)
+    rows = c.fetchall()
     conn.close()
+    return [
+        {
+            "id": row[0],
+            "source_report_id": row[1],
+            "candidate_report_id": row[2],
+            "similarity": row[3],
+            "match_type": row[4],
+            "status": row[5],
+            "created_at": row[6]
+        } for row in rows
+    ]
 
 
-def delete_match(match_id: int):
+# --- Shared Embedding Store ---
+# Encodings are partitioned by report kind (missing vs sighting) and sharded by the month a report
+# was filed: shard "<kind>/<YYYY-MM>" per recent segment, and one compacted "<kind>/cold" shard for
+# segments older than the cold cutoff.
+_embedding_stores: dict[str, EmbeddingStore] = {}
+
+
+def embedding_store_dir() -> str:
+    return f"{os.path.splitext(DB_PATH)[0]}.faces"
+
+
+def embedding_store_path(shard: str) -> str:
+    return os.path.join(embedding_store_dir(), f"{shard}.emb")
+
+
+def list_embedding_shards(kind: str | None = None) -> list[str]:
+    """Shards present on disk, per kind newest segment first and the cold shard last."""
+    shards = []
+    for shard_kind in ([kind] if kind else sorted(OPEN_STATUSES)):
+        segments = [
+            os.path.basename(path)[:-len(".emb")]
+            for path in glob.glob(os.path.join(embedding_store_dir(), shard_kind, "*.emb"))
+        ]
+        ordered = sorted((segment for segment in segments if segment != COLD_SHARD), reverse=True)
+        ordered += [segment for segment in segments if segment == COLD_SHARD]
+        shards.extend(f"{shard_kind}/{segment}" for segment in ordered)
+    return shards
+
+
+def get_embedding_store(shard: str) -> EmbeddingStore:
+    """Memory-mapped encoding shard next to the database; all shards are rebuilt from SQLite if missing."""
+    if not os.path.isdir(embedding_store_dir()):
+        rebuild_embedding_store()
+    path = embedding_store_path(shard)
+    store = _embedding_stores.get(path)
+    if store is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        store = EmbeddingStore(path, EMBEDDING_STORE_DTYPE)
+        _embedding_stores[path] = store
+    return store
+
+
+def rebuild_embedding_store():
+    """Recreate every shard from the encodings stored in SQLite."""
+    directory = embedding_store_dir()
+    for path in glob.glob(os.path.join(directory, "*", "*.emb")):
+        os.remove(path)
+    os.makedirs(directory, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("DELETE FROM match_results WHERE id = ?", (match_id,))
-    conn.commit()
+    c.execute("SELECT DISTINCT report_id FROM face_embeddings ORDER BY report_id")
+    report_ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    shards = report_shards(report_ids)
+    for report_id in report_ids:
+        get_embedding_store(shards[report_id]).append(report_id, get_face_encodings(report_id))
+
+
+def rebuild_embedding_shard(shard: str) -> int:
+    """Recreate one shard from the encodings stored in SQLite; returns the number of reports written."""
+    conn = sqlite3.connect(DB_PATH)
+    report_ids = [row[0] for row in conn.execute("SELECT DISTINCT report_id FROM face_embeddings ORDER BY report_id")]
     conn.close()
+    report_ids = [report_id for report_id, owner in report_shards(report_ids).items() if owner == shard]
+    # Swapped in under the shard's file lock, so a concurrent cold compaction cannot interleave with it
+    store = get_embedding_store(shard)
+    store.rebuild([(report_id, get_face_encodings(report_id)) for report_id in report_ids])
+    return len(report_ids)
+
+
+def have_face_encodings(report_ids) -> bool:
+    """Whether any of the reports has encodings stored in SQLite."""
+    report_ids = [int(report_id) for report_id in report_ids]
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        for start in range(0, len(report_ids), 900):
+            chunk = report_ids[start:start + 900]
+            if conn.execute(
+                f"SELECT 1 FROM face_embeddings WHERE report_id IN ({','.join('?' for _ in chunk)}) LIMIT 1", chunk
+            ).fetchone():
+                return True
+        return False
+    finally:
+        conn.close()
+
+
+def remove_from_embedding_store(report_ids: list[int]):
+    """Tombstone reports in every shard and compact shards once enough rows are dead."""
+    for shard in list_embedding_shards():
+        store = get_embedding_store(shard)
+        if store.delete_reports(report_ids) and store.deleted_fraction() > EMBEDDING_COMPACT_THRESHOLD:
+            store.compact()
+
+
+# --- Time Segments ---
+def _segment_sql(column: str) -> str:
+    return f"CASE WHEN {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' THEN substr({column}, 1, 7) END"
+
+
+def segment_months_ago(months: int, today: datetime.date | None = None) -> str:
+    today = today or datetime.date.today()
+    month_index = today.year * 12 + today.month - 1 - months
+    return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+
+def _report_kind_sql(prefix: str) -> str:
+    sighting_statuses = ",".join(f"'{status}'" for status in OPEN_STATUSES['sighting'])
+    return (
+        f"CASE WHEN {prefix}status IN ({sighting_statuses}) OR {prefix}report_source IN ('Sighting', 'CCTV') "
+        "THEN 'sighting' ELSE 'missing' END"
+    )
+
+
+def report_segments(report_ids) -> dict[int, tuple[str | None, str]]:
+    """Time segment and kind of each report."""
+    report_ids = [int(report_id) for report_id in report_ids]
+    segments = {}
+    conn = sqlite3.connect(DB_PATH)
+    for start in range(0, len(report_ids), 900):
+        chunk = report_ids[start:start + 900]
+        placeholders = ",".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"SELECT id, segment, COALESCE(report_kind, 'missing') FROM missing_persons WHERE id IN ({placeholders})", chunk
+        ).fetchall()
+        segments.update((row[0], (row[1], row[2])) for row in rows)
+    conn.close()
+    return segments
+
+
+def report_shards(report_ids) -> dict[int, str]:
+    """Embedding shard holding each report: its kind's segment, or that kind's cold shard once compacted."""
+    cold_cutoff = get_setting("cold_segment_cutoff", "")
+    return {
+        report_id: f"{kind}/{segment if segment and segment >= cold_cutoff else COLD_SHARD}"
+        for report_id, (segment, kind) in report_segments(report_ids).items()
+    }
+
+
+def segments_newest_first(report_ids) -> list[list[int]]:
+    """Group reports by time segment, newest first; undated reports come last."""
+    groups = {}
+    for report_id, (segment, _kind) in report_segments(report_ids).items():
+        groups.setdefault(segment or "", []).append(report_id)
+    return [groups[segment] for segment in sorted(groups, reverse=True)]
+
+
+def search_window_clause(alias: str = "mp") -> tuple[str, list]:
+    """SQL limiting candidates to the admin-configured lookback window (undated reports are kept)."""
+    months = int(get_setting("search_lookback_months", SEARCH_LOOKBACK_MONTHS))
+    if months <= 0:
+        return "", []
+    return f"({alias}.segment >= ? OR {alias}.segment IS NULL)", [segment_months_ago(months)]
+
+
+def compact_cold_segments(months: int = COLD_SEGMENT_MONTHS) -> int:
+    """Merge the shards of segments older than `months` into the cold shard; returns rows moved."""
+    cutoff = max(segment_months_ago(months), get_setting("cold_segment_cutoff", ""))
+    # Publish the cutoff first so new encodings for old segments go straight to the cold shard
+    set_setting("cold_segment_cutoff", cutoff)
+    moved = 0
+    for kind in OPEN_STATUSES:
+        cold = get_embedding_store(f"{kind}/{COLD_SHARD}")
+        for shard in list_embedding_shards(kind):
+            segment = shard.split("/", 1)[1]
+            if segment == COLD_SHARD or segment >= cutoff:
+                continue
+            store = get_embedding_store(shard)
+            _embedding_stores.pop(store.path, None)
+            moved += cold.absorb(store)
+        cold.compact()
+    return moved
+
+
+# --- Page Read Cache ---
+# Streamlit reruns the whole script on every click; page queries are served from this process-wide
+# cache until a write bumps the data version.
+@st.cache_resource
+def _read_cache_registry() -> tuple[OrderedDict, threading.Lock, dict]:
+    """Cached as a resource so entries and counters are shared by every session of the process."""
+    return OrderedDict(), threading.Lock(), {"hits": 0, "misses": 0}
+
+
+@st.cache_resource
+def _version_reader(db_path: str) -> tuple[sqlite3.Connection, threading.Lock]:
+    """Long-lived connection used only for PRAGMA data_version, which compares against its own earlier reads."""
+    return connect_db(check_same_thread=False), threading.Lock()
+
+
+def data_version(*schemas: str) -> int:
+    """Grows whenever any other connection, in this or another process, commits to the given databases (default: all).
+
+    Reads SQLite's file change counters on one persistent connection, so a cache check opens nothing.
+    """
+    conn, lock = _version_reader(DB_PATH)
+    with lock:
+        return sum(conn.execute(f"PRAGMA {schema}.data_version").fetchone()[0] for schema in schemas or ('main', *SPLIT_DATABASES))
+
+
+def cached_read(loader, *args):
+    """loader(*args), reused until data_version() changes. Cached results are shared: do not mutate them."""
+    key = (DB_PATH, loader.__name__, args)
+    version = data_version()
+    entries, lock, stats = _read_cache_registry()
+    with lock:
+        entry = entries.get(key)
+        if entry is not None and entry[0] == version:
+            entries.move_to_end(key)
+            stats["hits"] += 1
+            return entry[1]
+        stats["misses"] += 1
+    result = loader(*args)
+    with lock:
+        entries[key] = (version, result)
+        entries.move_to_end(key)
+        while len(entries) > READ_CACHE_SIZE:
+            entries.popitem(last=False)
+    return result
+
+
+def read_cache_stats() -> dict:
+    entries, lock, stats = _read_cache_registry()
+    with lock:
+        lookups = stats["hits"] + stats["misses"]
+        return {**stats, "entries": len(entries), "hit_rate": stats["hits"] / lookups if lookups else 0.0}
+
+
+def get_latest_reports(limit: int = 5) -> pd.DataFrame:
+    conn = sqlite3.connect(DB_PATH)
+    latest = pd.read_sql_query(
+        "SELECT id, name, status, date_reported FROM missing_persons ORDER BY date_reported DESC LIMIT ?",
+        conn, params=(limit,)
+    )
+    conn.close()
+    return latest
+
+
+def get_missing_persons_list() -> list[tuple]:
+    """Open missing-person reports for the public list, newest first."""
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute("""
+        SELECT id, name, image, last_seen_location, description
+        FROM missing_persons
+        WHERE status = 'Missing'
+        ORDER BY date_reported DESC
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def count_cluster_sightings(cluster_ids) -> dict[int, int]:
+    cluster_ids = sorted({int(cluster_id) for cluster_id in cluster_ids})
+    if not cluster_ids:
+        return {}
+    conn = sqlite3.connect(DB_PATH)
+    counts = dict(conn.execute(
+        f"SELECT cluster_id, COUNT(*) FROM missing_persons WHERE cluster_id IN ({','.join('?' for _ in cluster_ids)}) GROUP BY cluster_id",
+        cluster_ids
+    ).fetchall())
+    conn.close()
+    return counts
+
+
+def load_match_queue(status_filter: tuple[str, ...], limit: int) -> tuple[list[list[dict]], dict[int, dict], dict[int, int]]:
+    """Grouped queued matches with every report summary and cluster size the queue shows.
+
+    One loader per page, so the queue takes a single read cache entry instead of one per row.
+    """
+    groups = group_matches_by_cluster(get_match_results(list(status_filter), limit))
+    matches = [match for group in groups for match in group]
+    report_ids = {report_id for match in matches for report_id in (match["source_report_id"], match["candidate_report_id"]) if report_id}
+    cluster_ids = {match["cluster_id"] for match in matches if match["cluster_id"] is not None}
+    return groups, fetch_person_summaries(report_ids), count_cluster_sightings(cluster_ids)
+
+
+# --- Dashboard Heatmap ---
+@st.cache_data(max_entries=8, show_spinner=False)
+def _heatmap_cells(db_path: str, version: int, max_points: int) -> tuple[pd.DataFrame, float]:
+    """Grid-binned open cases; cached per database and main database data_version."""
+    conn = sqlite3.connect(db_path)
+    cell = HEATMAP_MIN_CELL_DEGREES
+    while True:
+        # Shifting coordinates positive lets CAST truncate like floor(), so cells never straddle 0
+        cells = pd.read_sql_query(
+            """
+            SELECT AVG(location_lat) AS lat, AVG(location_lng) AS lon, COUNT(*) AS cases
+            FROM missing_persons
+            WHERE status = 'Missing' AND location_lat IS NOT NULL AND location_lng IS NOT NULL
+            GROUP BY CAST((location_lat + 90) / ? AS INTEGER), CAST((location_lng + 180) / ? AS INTEGER)
+            """,
+            conn, params=(cell, cell)
+        )
+        if len(cells) <= max_points or cell >= 360:
+            break
+        cell *= max(2.0, float(np.sqrt(len(cells) / max_points)))
+    conn.close()
+    return cells, cell
+
+
+def heatmap_cells(max_points: int = HEATMAP_MAX_POINTS) -> tuple[pd.DataFrame, float]:
+    """At most max_points (lat, lon, cases) cells of open cases, at the finest grid that fits, and the cell size in degrees."""
+    return _heatmap_cells(DB_PATH, data_version("main"), max_points)
+
+
+# --- Upload Hashing & Duplicate Detection ---
+def compute_image_hashes(image_bytes: bytes) -> dict:
+    """SHA-256 of the raw upload plus a 64-bit difference hash of its content."""
+    pixels = np.asarray(Image.open(io.BytesIO(image_bytes)).convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    dhash = int("".join("1" if bit else "0" for bit in bits), 2)
+    return {"sha256": hashlib.sha256(image_bytes).hexdigest(), "dhash": dhash}
+
+
+def _dhash_bands(dhash: int) -> list[int]:
+    width = 64 // DHASH_BANDS
+    return [(dhash >> (band * width)) & ((1 << width) - 1) for band in range(DHASH_BANDS)]
+
+
+def _to_signed64(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def store_image_hashes(report_id: int, hashes: dict):
+    get_db_writer().execute(
+        "INSERT OR REPLACE INTO image_hashes (report_id, sha256, dhash, band0, band1, band2, band3) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (report_id, hashes["sha256"], _to_signed64(hashes["dhash"]), *_dhash_bands(hashes["dhash"]))
+    ).result()
+
+
+def find_exact_duplicate(sha256: str, exclude_id: int | None = None):
+    """Earliest report whose upload has the same bytes, with its stored AI results."""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute(
+        """
+        SELECT mp.id, mp.age, mp.gender, mp.faces_encoded
+        FROM image_hashes ih
+        JOIN missing_persons mp ON mp.id = ih.report_id
+        WHERE ih.sha256 = ? AND ih.report_id != ?
+        ORDER BY mp.id
+        LIMIT 1
+        """,
+        (sha256, exclude_id if exclude_id is not None else -1)
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {"id": row[0], "age": row[1], "gender": row[2], "faces_encoded": bool(row[3])}
+
+
+def find_near_duplicates(dhash: int, max_distance: int = DUPLICATE_HASH_DISTANCE, exclude_id: int | None = None) -> list[dict]:
+    """Reports whose difference hash is within max_distance bits, closest first.
+
+    Multi-index hashing: if two hashes differ in at most max_distance bits, at least one
+    of the bands differs in at most max_distance // DHASH_BANDS bits, so probing each band
+    index with its few low-radius variants finds every candidate without a table scan.
+    """
+    width = 64 // DHASH_BANDS
+    band_radius = max_distance // DHASH_BANDS
+    clauses = []
+    params = []
+    for band, value in enumerate(_dhash_bands(dhash)):
+        variants = {value}
+        for _ in range(band_radius):
+            variants |= {variant ^ (1 << bit) for variant in variants for bit in range(width)}
+        clauses.append(f"band{band} IN ({','.join('?' for _ in variants)})")
+        params.extend(variants)
+
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute(
+        f"SELECT report_id, dhash FROM image_hashes WHERE ({' OR '.join(clauses)}) AND report_id != ?",
+        (*params, exclude_id if exclude_id is not None else -1)
+    ).fetchall()
+    conn.close()
+
+    matches = []
+    for report_id, stored in rows:
+        distance = bin((stored & ((1 << 64) - 1)) ^ dhash).count("1")
+        if distance <= max_distance:
+            matches.append({"id": report_id, "distance": distance})
+    return sorted(matches, key=lambda match: (match["distance"], match["id"]))
+
+
+def copy_face_encodings(from_report_id: int, to_report_id: int):
+    """Reuse another report's stored faces for an identical upload."""
+    submit_write(_copy_face_encodings_job, from_report_id, to_report_id).result()
+    get_embedding_store(report_shards([to_report_id])[to_report_id]).append(
+        to_report_id, get_face_encodings(to_report_id)
+    )
+
+
+def _copy_face_encodings_job(c: sqlite3.Cursor, from_report_id: int, to_report_id: int):
+    c.execute("DELETE FROM face_embeddings WHERE report_id = ?", (to_report_id,))
+    c.execute(
+        '''
+        INSERT INTO face_embeddings (report_id, face_index, box_top, box_right, box_bottom, box_left, encoding, quality)
+        SELECT ?, face_index, box_top, box_right, box_bottom, box_left, encoding, quality
+        FROM face_embeddings
+        WHERE report_id = ?
+        ''',
+        (to_report_id, from_report_id)
+    )
+    c.execute(
+        """
+        UPDATE missing_persons
+        SET faces_encoded = 1, face_quality = (SELECT face_quality FROM missing_persons WHERE id = ?)
+        WHERE id = ?
+        """,
+        (from_report_id, to_report_id)
+    )
+
+
+def analyze_upload(image_bytes: bytes) -> dict:
+    """Hash an upload and estimate age/gender, reusing stored results for exact repeats."""
+    hashes = compute_image_hashes(image_bytes)
+    exact = find_exact_duplicate(hashes["sha256"])
+    if exact:
+        age, gender = exact["age"], exact["gender"]
+    else:
+        age, gender = detect_age_gender(image_bytes)
+    return {
+        "hashes": hashes,
+        "age": age,
+        "gender": gender,
+        "exact_duplicate": exact,
+        "near_duplicates": find_near_duplicates(hashes["dhash"]),
+    }
+
+
+def register_upload(report_id: int, upload: dict) -> int | None:
+    """Index a stored report's upload and flag it when it repeats an earlier photo.
+
+    Returns the report it most likely duplicates, if any.
+    """
+    store_image_hashes(report_id, upload["hashes"])
+    exact = upload["exact_duplicate"]
+    if exact and exact["faces_encoded"]:
+        copy_face_encodings(exact["id"], report_id)
+
+    duplicate_of = exact["id"] if exact else (upload["near_duplicates"][0]["id"] if upload["near_duplicates"] else None)
+    if duplicate_of is None:
+        return None
+    get_db_writer().execute("UPDATE missing_persons SET duplicate_of = ? WHERE id = ?", (duplicate_of, report_id)).result()
+    create_notification(
+        "Possible duplicate report",
+        f"Report #{report_id} uses {'the same photo as' if exact else 'a near-identical photo to'} report #{duplicate_of}.",
+        level="info",
+        payload={"report_id": report_id, "duplicate_of": duplicate_of, "near_duplicates": upload["near_duplicates"][:5]}
+    )
+    return duplicate_of
+
+
+# --- Face Encoding Store ---
+def load_rgb_array(image_bytes: bytes) -> np.ndarray:
+    return np.array(Image.open(io.BytesIO(image_bytes)).convert('RGB'))
+
+
+def score_face_quality(img_np: np.ndarray, box, landmarks: dict | None = None) -> dict:
+    """Cheap face quality estimate from box size, Laplacian blur variance and landmark pose."""
+    top, right, bottom, left = box
+    size = min(right - left, bottom - top)
+    face = img_np[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)]
+    if size <= 0 or face.size == 0:
+        return {"score": 0.0, "size": 0, "sharpness": 0.0, "yaw": None, "usable": False}
+    gray = cv2.cvtColor(face, cv2.COLOR_RGB2GRAY)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    # Horizontal nose offset from the eye midpoint, relative to eye distance: ~0 frontal, >0.5 profile
+    yaw = None
+    if landmarks and landmarks.get('nose_tip') and landmarks.get('left_eye') and landmarks.get('right_eye'):
+        left_eye_x = np.mean([point[0] for point in landmarks['left_eye']])
+        right_eye_x = np.mean([point[0] for point in landmarks['right_eye']])
+        eye_distance = abs(right_eye_x - left_eye_x)
+        if eye_distance > 0:
+            nose_x = np.mean([point[0] for point in landmarks['nose_tip']])
+            yaw = float(abs(nose_x - (left_eye_x + right_eye_x) / 2) / eye_distance)
+
+    size_score = min(1.0, size / IDEAL_FACE_SIZE)
+    blur_score = min(1.0, sharpness / IDEAL_BLUR_VARIANCE)
+    pose_score = 1.0 if yaw is None else max(0.0, 1.0 - yaw / (2 * MAX_POSE_YAW))
+    score = float((size_score * blur_score * pose_score) ** (1 / 3))
+    usable = (
+        size >= MIN_FACE_SIZE
+        and sharpness >= MIN_BLUR_VARIANCE
+        and (yaw is None or yaw <= MAX_POSE_YAW)
+        and score >= MIN_FACE_QUALITY
+    )
+    return {"score": score, "size": int(size), "sharpness": sharpness, "yaw": yaw, "usable": usable}
+
+
+def analyze_faces(image_bytes: bytes) -> dict:
+    """Detect faces, score their quality and encode only the usable ones, best face first."""
+    img_np = load_rgb_array(image_bytes)
+    locations = face_recognition.face_locations(img_np)
+    if not locations:
+        return {"faces": [], "best_quality": None, "rejected": 0}
+    all_landmarks = face_recognition.face_landmarks(img_np, face_locations=locations, model="small")
+    assessed = [
+        (index, [int(v) for v in location], score_face_quality(img_np, location, landmarks))
+        for index, (location, landmarks) in enumerate(zip(locations, all_landmarks))
+    ]
+    assessed.sort(key=lambda item: item[2]["score"], reverse=True)
+    usable = [item for item in assessed if item[2]["usable"]]
+
+    faces = []
+    if usable:
+        encodings = face_recognition.face_encodings(img_np, known_face_locations=[tuple(item[1]) for item in usable])
+        faces = [
+            {
+                "face_index": index,
+                "box": box,
+                "encoding": np.asarray(encoding, dtype=np.float32),
+                "quality": quality["score"],
+            }
+            for (index, box, quality), encoding in zip(usable, encodings)
+        ]
+    return {"faces": faces, "best_quality": assessed[0][2]["score"], "rejected": len(assessed) - len(usable)}
+
+
+def encode_faces(image_bytes: bytes) -> list[dict]:
+    """Encode every usable face in an image, keeping each face's bounding box."""
+    return analyze_faces(image_bytes)["faces"]
+
+
+_probe_cache: OrderedDict[str, list[dict]] = OrderedDict()
+
+
+def encode_probe(image_bytes: bytes) -> list[dict]:
+    """encode_faces with an LRU cache of recent uploads, keyed by content hash."""
+    key = hashlib.sha256(image_bytes).hexdigest()
+    if key in _probe_cache:
+        _probe_cache.move_to_end(key)
+        return _probe_cache[key]
+    faces = encode_faces(image_bytes)
+    _probe_cache[key] = faces
+    while len(_probe_cache) > PROBE_CACHE_SIZE:
+        _probe_cache.popitem(last=False)
+    return faces
+
+
+def search_similar_faces(image_bytes: bytes, k: int = PHOTO_SEARCH_TOP_K, tolerance: float = MATCH_TOLERANCE,
+                         rerank: bool = False, statuses: tuple[str, ...] = ('Missing',),
+                         include_archive: bool = False) -> dict:
+    """Top-k stored reports whose faces match an uploaded photo, best first.
+
+    With include_archive, faces of archived cases are searched as well (by coarse distance only,
+    since their images live in the archive). Returns the probe faces, the matches and the number
+    of faces searched.
+    """
+    probe_faces = encode_probe(image_bytes)
+    if not probe_faces:
+        return {"probe_faces": [], "matches": [], "faces_searched": 0}
+    candidate_meta, candidate_matrix = load_candidate_faces(statuses)
+    if rerank:
+        face_matches = rerank_face_matches(
+            probe_faces, candidate_meta, candidate_matrix, image_bytes, tolerance=tolerance, top_k=max(k, RERANK_TOP_K)
+        )
+    else:
+        face_matches = match_faces(probe_faces, candidate_meta, candidate_matrix, tolerance=tolerance)
+    faces_searched = len(candidate_meta)
+    if include_archive:
+        archived_meta, archived_matrix = load_archived_faces()
+        if len(archived_meta):
+            face_matches = sorted(
+                face_matches + match_faces(probe_faces, archived_meta, archived_matrix, tolerance=tolerance),
+                key=lambda match: match["distance"]
+            )
+            faces_searched += len(archived_meta)
+    return {"probe_faces": probe_faces, "matches": face_matches[:k], "faces_searched": faces_searched}
+
+
+def store_face_encodings(report_id: int, faces: list[dict], face_quality: float | None = None):
+    submit_write(_store_face_encodings_job, report_id, faces, face_quality).result()
+    store = get_embedding_store(report_shards([report_id])[report_id])
+    store.delete_reports([report_id])
+    store.append(report_id, faces)
+
+
+def _store_face_encodings_job(c: sqlite3.Cursor, report_id: int, faces: list[dict], face_quality: float | None):
+    c.execute("DELETE FROM face_embeddings WHERE report_id = ?", (report_id,))
+    c.executemany(
+        '''
+        INSERT INTO face_embeddings (report_id, face_index, box_top, box_right, box_bottom, box_left, encoding, quality)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+        [
+            (
+                report_id,
+                face["face_index"],
+                *face["box"],
+                np.asarray(face["encoding"], dtype=np.float32).tobytes(),
+                face.get("quality"),
+            )
+            for face in faces
+        ]
+    )
+    if face_quality is None and faces:
+        face_quality = max((face.get("quality") or 0.0) for face in faces)
+    c.execute("UPDATE missing_persons SET faces_encoded = 1, face_quality = ? WHERE id = ?", (face_quality, report_id))
+
+
+def get_face_encodings(report_id: int) -> list[dict]:
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        '''
+        SELECT face_index, box_top, box_right, box_bottom, box_left, encoding
+        FROM face_embeddings
+        WHERE report_id = ?
+        ORDER BY face_index
+        ''',
+        (report_id,)
+    )
+    rows = c.fetchall()
+    conn.close()
+    return [
+        {"face_index": row[0], "box": list(row[1:5]), "encoding": np.frombuffer(row[5], dtype=np.float32)}
+        for row in rows
+    ]
+
+
+def ensure_face_encodings(report_id: int, image_bytes: bytes | None) -> list[dict]:
+    """Return the stored faces for a report, encoding and storing them on first use."""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("SELECT faces_encoded FROM missing_persons WHERE id = ?", (report_id,)).fetchone()
+    conn.close()
+    if row and row[0]:
+        return get_face_encodings(report_id)
+    analysis = {"faces": [], "best_quality": None}
+    if image_bytes:
+        try:
+            analysis = analyze_faces(image_bytes)
+        except Exception:
+            pass
+    if row:
+        store_face_encodings(report_id, analysis["faces"], analysis["best_quality"])
+    return analysis["faces"]
+
+
+def get_face_quality(report_id: int) -> float | None:
+    """Best face quality score stored for a report (None when no face was detected)."""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("SELECT face_quality FROM missing_persons WHERE id = ?", (report_id,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def face_quality_warning(report_id: int) -> str | None:
+    """User-facing explanation when a report's photo was kept out of the face index."""
+    quality = get_face_quality(report_id)
+    if quality is None:
+        return "No face could be detected in the photo, so facial matching was skipped."
+    conn = sqlite3.connect(DB_PATH)
+    usable_faces = conn.execute("SELECT COUNT(*) FROM face_embeddings WHERE report_id = ?", (report_id,)).fetchone()[0]
+    conn.close()
+    if not usable_faces:
+        return "The face in this photo is too small, blurry or turned away for reliable facial matching. A clearer, front-facing photo will improve results."
+    return None
+
+
+def backfill_face_encodings(statuses: tuple[str, ...] = ('Missing',)):
+    """Encode candidate reports that were stored before their faces were indexed."""
+    placeholders = ",".join("?" for _ in statuses)
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        f"SELECT id, image FROM missing_persons WHERE status IN ({placeholders}) AND COALESCE(faces_encoded, 0) = 0",
+        statuses
+    )
+    pending = c.fetchall()
+    conn.close()
+    for report_id, image_bytes in pending:
+        ensure_face_encodings(report_id, image_bytes)
+
+
+def load_candidate_faces(statuses: tuple[str, ...] = ('Missing',), exclude_id: int | None = None,
+                         report_ids: list[int] | None = None):
+    """Load every stored face for reports in the given statuses as one encoding matrix.
+
+    When report_ids is given (e.g. a geographic shortlist) only those reports are loaded.
+    """
+    backfill_face_encodings(statuses)
+    if report_ids is not None:
+        return load_report_faces(report_ids)
+    # Group by shard in SQL so large candidate sets never go through per-report lookups
+    placeholders = ",".join("?" for _ in statuses)
+    where = f"status IN ({placeholders}) AND faces_encoded = 1 AND id != ?"
+    params = (*statuses, exclude_id if exclude_id is not None else -1)
+    cold_cutoff = get_setting("cold_segment_cutoff", "")
+    by_shard = {}
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    groups = c.execute(f"SELECT DISTINCT report_kind, segment FROM missing_persons WHERE {where}", params).fetchall()
+    for kind, segment in groups:
+        c.execute(f"SELECT id FROM missing_persons WHERE {where} AND report_kind IS ? AND segment IS ?", (*params, kind, segment))
+        shard = f"{kind or 'missing'}/{segment if segment and segment >= cold_cutoff else COLD_SHARD}"
+        by_shard.setdefault(shard, []).append(np.array(c.fetchall(), dtype=np.int64).reshape(-1))
+    conn.close()
+    return _load_shard_faces({shard: np.concatenate(ids) for shard, ids in by_shard.items()})
+
+
+def load_report_faces(report_ids: list[int]):
+    """Stored faces of the given reports as one encoding matrix, read from the shards holding them."""
+    by_shard = {}
+    for report_id, shard in report_shards(report_ids).items():
+        by_shard.setdefault(shard, []).append(report_id)
+    return _load_shard_faces(by_shard)
+
+
+def _load_shard_faces(by_shard: dict[str, list[int]]):
+    metas, matrices = [], []
+    for shard, shard_ids in by_shard.items():
+        try:
+            if os.path.exists(embedding_store_path(shard)):
+                meta, matrix = get_embedding_store(shard).load(shard_ids)
+            elif have_face_encodings(shard_ids):
+                raise FileNotFoundError(f"{embedding_store_path(shard)} is missing")
+            else:
+                continue
+        except (OSError, ValueError) as error:
+            # A lost or damaged shard would silently drop its faces from every search
+            rebuilt = rebuild_embedding_shard(shard)
+            create_notification(
+                "Embedding shard rebuilt",
+                f"Face shard {shard} could not be read ({error}); rebuilt {rebuilt} reports from the database.",
+                level="warning",
+                payload={"shard": shard},
+            )
+            meta, matrix = get_embedding_store(shard).load(shard_ids)
+        if len(meta):
+            metas.append(meta)
+            matrices.append(matrix)
+    if not metas:
+        return np.empty(0, dtype=META_DTYPE), np.empty((0, 0), dtype=np.float32)
+    return np.concatenate(metas), np.vstack(matrices)
+
+
+def face_distance_matrix(probes: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Euclidean distances between every probe and every candidate encoding in one pass."""
+    probes = np.asarray(probes, dtype=np.float32)
+    candidates = np.asarray(candidates, dtype=np.float32)
+    squared = (
+        np.sum(probes ** 2, axis=1)[:, None]
+        + np.sum(candidates ** 2, axis=1)[None, :]
+        - 2.0 * probes @ candidates.T
+    )
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def match_faces(probe_faces: list[dict], candidate_meta: list[dict], candidate_matrix: np.ndarray, tolerance: float = MATCH_TOLERANCE) -> list[dict]:
+    """Best face pairing per candidate report within tolerance, closest first."""
+    if not probe_faces or not len(candidate_meta):
+        return []
+    probe_matrix = np.vstack([face["encoding"] for face in probe_faces])
+    distances = face_distance_matrix(probe_matrix, candidate_matrix)
+    best_probe = np.argmin(distances, axis=0)
+    best_distance = distances[best_probe, np.arange(distances.shape[1])]
+
+    results = []
+    seen_reports = set()
+    for column in np.argsort(best_distance, kind="stable"):
+        distance = float(best_distance[column])
+        if distance > tolerance:
+            break
+        candidate = candidate_meta[column]
+        candidate_id = int(candidate["report_id"])
+        if candidate_id in seen_reports:
+            continue
+        seen_reports.add(candidate_id)
+        probe = probe_faces[int(best_probe[column])]
+        results.append({
+            "report_id": candidate_id,
+            "distance": distance,
+            "probe_face_index": probe["face_index"],
+            "probe_box": probe["box"],
+            "candidate_face_index": int(candidate["face_index"]),
+            "candidate_box": [int(v) for v in candidate["box"]],
+        })
+    return results
+
+
+# --- Age/Gender Partitions ---
+def _age_band_sql(column: str) -> str:
+    return (
+        f"CASE WHEN trim({column}) <> '' AND trim({column}) NOT GLOB '*[^0-9]*' "
+        f"THEN CAST(trim({column}) AS INTEGER) / {AGE_BAND_WIDTH} END"
+    )
+
+
+def _gender_key_sql(column: str) -> str:
+    cases = " ".join(f"WHEN '{label}' THEN '{key}'" for label, key in GENDER_KEYS.items())
+    return f"CASE lower(trim({column})) {cases} END"
+
+
+def compatible_age_bands(age: str | None) -> list[int]:
+    """Age bands within AGE_BAND_OVERLAP years of an estimate; empty when the estimate is unusable."""
+    age = (age or "").strip()
+    if not age.isdigit():
+        return []
+    years = int(age)
+    return list(range(max(years - AGE_BAND_OVERLAP, 0) // AGE_BAND_WIDTH, (years + AGE_BAND_OVERLAP) // AGE_BAND_WIDTH + 1))
+
+
+def candidate_partition_clause(age: str | None, gender: str | None, alias: str = "mp") -> tuple[str, list]:
+    """SQL restricting candidates to the age/gender partitions compatible with an estimate.
+
+    Unknown ("N/A", "Error") estimates leave that dimension unrestricted, and candidates whose
+    own estimate is unknown are always kept.
+    """
+    clauses = []
+    params = []
+    gender_key = GENDER_KEYS.get((gender or "").strip().lower())
+    if gender_key:
+        clauses.append(f"({alias}.gender_key = ? OR {alias}.gender_key IS NULL)")
+        params.append(gender_key)
+    bands = compatible_age_bands(age)
+    if bands:
+        clauses.append(f"({alias}.age_band IN ({','.join('?' for _ in bands)}) OR {alias}.age_band IS NULL)")
+        params.extend(bands)
+    return " AND ".join(clauses), params
+
+
+# --- Sighting Clusters ---
+def assign_sighting_cluster(report_id: int, encoding) -> tuple[int, np.ndarray]:
+    """Attach a sighting to the nearest cluster centroid within SIGHTING_CLUSTER_DISTANCE, or start one.
+
+    Returns the cluster id and its updated centroid.
+    """
+    return submit_write(_assign_sighting_cluster_job, report_id, np.asarray(encoding, dtype=np.float32)).result()
+
+
+def _assign_sighting_cluster_job(c: sqlite3.Cursor, report_id: int, encoding: np.ndarray) -> tuple[int, np.ndarray]:
+    row = c.execute("SELECT cluster_id FROM missing_persons WHERE id = ?", (report_id,)).fetchone()
+    if row and row[0] is not None:
+        centroid = c.execute("SELECT centroid FROM sighting_clusters WHERE id = ?", (row[0],)).fetchone()
+        if centroid:
+            return row[0], np.frombuffer(centroid[0], dtype=np.float32)
+    clusters = c.execute("SELECT id, centroid, member_count FROM sighting_clusters").fetchall()
+    cluster_id = None
+    if clusters:
+        centroids = np.vstack([np.frombuffer(cluster[1], dtype=np.float32) for cluster in clusters])
+        distances = face_distance_matrix(encoding[None, :], centroids)[0]
+        nearest = int(np.argmin(distances))
+        if distances[nearest] <= SIGHTING_CLUSTER_DISTANCE:
+            cluster_id, _centroid, member_count = clusters[nearest]
+            centroid = (centroids[nearest] * member_count + encoding) / (member_count + 1)
+            c.execute(
+                "UPDATE sighting_clusters SET centroid = ?, member_count = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (centroid.astype(np.float32).tobytes(), member_count + 1, cluster_id)
+            )
+    if cluster_id is None:
+        centroid = encoding
+        c.execute(
+            "INSERT INTO sighting_clusters (centroid, member_count, leader_report_id) VALUES (?, 1, ?)",
+            (centroid.tobytes(), report_id)
+        )
+        cluster_id = c.lastrowid
+    c.execute("UPDATE missing_persons SET cluster_id = ? WHERE id = ?", (cluster_id, report_id))
+    return cluster_id, np.asarray(centroid, dtype=np.float32)
 
 
-def set_status(person_id: int, new_status: str, notify: bool = True):
+def cluster_search_is_current(cluster_id: int, centroid: np.ndarray, scope: str) -> bool:
+    """Whether the cluster was searched over the same candidate scope from a centroid within SIGHTING_REMATCH_DISTANCE."""
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE missing_persons SET status = ? WHERE id = ?", (new_status, person_id))
-    conn.commit()
+    row = conn.execute("SELECT matched_centroid, matched_scope FROM sighting_clusters WHERE id = ?", (cluster_id,)).fetchone()
     conn.close()
-    if notify:
-        create_notification(
-            "Report status updated",
-            f"Report #{person_id} marked as {new_status}.",
-            payload={"person_id": person_id, "status": new_status}
+    if not row or row[0] is None or row[1] != scope:
+        return False
+    return float(np.linalg.norm(np.frombuffer(row[0], dtype=np.float32) - centroid)) <= SIGHTING_REMATCH_DISTANCE
+
+
+def mark_cluster_searched(cluster_id: int, centroid: np.ndarray, scope: str):
+    get_db_writer().execute(
+        "UPDATE sighting_clusters SET matched_centroid = ?, matched_scope = ?, matched_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (np.asarray(centroid, dtype=np.float32).tobytes(), scope, cluster_id)
+    ).result()
+
+
+def get_cluster_matches(cluster_id: int) -> list[dict]:
+    """Matches already queued for a sighting cluster, best first, one per open missing report."""
+    conn = connect_db()
+    rows = conn.execute(f"""
+        SELECT mp.id, mp.name, MAX(mr.similarity), mr.match_type
+        FROM match_results mr
+        JOIN missing_persons mp ON mp.id IN (mr.source_report_id, mr.candidate_report_id)
+        WHERE mr.cluster_id = ? AND mr.status != 'Dismissed' AND mp.status IN ({",".join("?" for _ in OPEN_STATUSES['missing'])})
+        GROUP BY mp.id
+        ORDER BY MAX(mr.similarity) DESC
+    """, (cluster_id, *OPEN_STATUSES['missing'])).fetchall()
+    conn.close()
+    return [
+        {"id": row[0], "name": row[1], "score": row[2], "method": "Facial" if row[3] == "facial" else "Context"}
+        for row in rows
+    ]
+
+
+def _leave_sighting_cluster(c: sqlite3.Cursor, report_id: int):
+    """Remove a sighting's face from its cluster centroid, dropping the cluster when it empties."""
+    row = c.execute(
+        """
+        SELECT sc.id, sc.centroid, sc.member_count
+        FROM missing_persons mp JOIN sighting_clusters sc ON sc.id = mp.cluster_id
+        WHERE mp.id = ?
+        """,
+        (report_id,)
+    ).fetchone()
+    face = c.execute(
+        "SELECT encoding FROM face_embeddings WHERE report_id = ? ORDER BY face_index LIMIT 1", (report_id,)
+    ).fetchone()
+    if row and row[2] > 1 and face:
+        centroid = (np.frombuffer(row[1], dtype=np.float32) * row[2] - np.frombuffer(face[0], dtype=np.float32)) / (row[2] - 1)
+        c.execute(
+            "UPDATE sighting_clusters SET centroid = ?, member_count = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (centroid.astype(np.float32).tobytes(), row[2] - 1, row[0])
         )
+    elif row:
+        c.execute("DELETE FROM sighting_clusters WHERE id = ?", (row[0],))
+    c.execute("UPDATE missing_persons SET cluster_id = NULL WHERE id = ?", (report_id,))
 
 
-def update_status(person_id, new_status):
-    set_status(person_id, new_status, notify=True)
+def combine_clauses(*clauses: tuple[str, list]) -> tuple[str, list]:
+    sql = " AND ".join(clause for clause, _params in clauses if clause)
+    return sql, [param for _clause, params in clauses for param in params]
 
 
-def delete_report(person_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM missing_persons WHERE id = ?", (person_id,))
-    conn.commit()
-    conn.close()
-    create_notification(
-        "Report deleted",
-        f"Report #{person_id} removed by admin.",
-        level="warning",
-        payload={"person_id": person_id}
-    )
+# --- Score Fusion ---
+def get_fusion_weights() -> dict[str, float]:
+    weights = dict(FUSION_WEIGHTS)
+    stored = get_setting("fusion_weights")
+    if stored:
+        weights.update({name: float(value) for name, value in json.loads(stored).items() if name in weights})
+    return weights
 
 
-def get_matched_partner_ids(person_id: int) -> list[int]:
-    """Return other report IDs that are matched to the given person."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    partners: set[int] = set()
-    c.execute(
-        "SELECT candidate_report_id FROM match_results WHERE source_report_id = ? AND candidate_report_id IS NOT NULL",
-        (person_id,),
-    )
-    partners.update(row[0] for row in c.fetchall() if row[0] is not None)
-    c.execute(
-        "SELECT source_report_id FROM match_results WHERE candidate_report_id = ? AND source_report_id IS NOT NULL",
-        (person_id,),
-    )
-    partners.update(row[0] for row in c.fetchall() if row[0] is not None)
-    conn.close()
-    return list(partners)
+def _parse_ages(values) -> np.ndarray:
+    ages = pd.to_numeric(pd.Series(values, dtype=object).astype(str).str.strip(), errors="coerce")
+    return ages.to_numpy(dtype=np.float64)
 
 
-def resolve_match_as_found(person_id: int):
-    """Mark a matched record and any linked reports as Found and resolve their match records."""
-    partner_ids = get_matched_partner_ids(person_id)
-    set_status(person_id, "Found", notify=True)
-    for pid in partner_ids:
-        set_status(pid, "Found", notify=False)
+def candidate_features(report_id: int, candidates: list[tuple], person_name: str, last_seen_location: str, age: str,
+                       face_matches: list[dict], searched_ids: set[int], distances_km: dict[int, float] | None = None):
+    """Per-signal scores in [0, 1] and availability masks for every shortlisted candidate.
 
-    all_ids = [person_id] + partner_ids
-    placeholders = ",".join("?" for _ in all_ids)
+    Face: 1 - distance for matched faces, 0 for searched candidates whose faces did not match.
+    Geo, age and time decay with the distance, age gap and days between the two reports.
+    """
+    ids = [candidate[0] for candidate in candidates]
+    count = len(ids)
+    features = {}
+    available = {}
+
+    face_distance = {face_match["report_id"]: face_match["distance"] for face_match in face_matches}
+    features['face'] = np.array([max(0.0, 1.0 - face_distance.get(cid, 1.0)) for cid in ids])
+    available['face'] = np.array([cid in face_distance or cid in searched_ids for cid in ids], dtype=bool)
+
+    names = [candidate[1] or "" for candidate in candidates]
+    locations = [candidate[2] or "" for candidate in candidates]
+    features['name'] = np.array([sequence_similarity(person_name or "", name) for name in names])
+    available['name'] = np.array([bool(person_name) and bool(name) for name in names], dtype=bool)
+    features['location'] = np.array([sequence_similarity(last_seen_location or "", location) for location in locations])
+    available['location'] = np.array([bool(last_seen_location) and bool(location) for location in locations], dtype=bool)
+
+    conn = sqlite3.connect(DB_PATH)
+    probe = conn.execute(
+        "SELECT location_lat, location_lng, date_reported FROM missing_persons WHERE id = ?", (report_id,)
+    ).fetchone() or (None, None, None)
+    rows = {}
+    for start in range(0, count, 900):
+        chunk = ids[start:start + 900]
+        rows.update((row[0], row[1:]) for row in conn.execute(
+            f"SELECT id, location_lat, location_lng, date_reported FROM missing_persons WHERE id IN ({','.join('?' for _ in chunk)})",
+            chunk
+        ))
+    conn.close()
+    lats = np.array([rows.get(cid, (None,))[0] for cid in ids], dtype=np.float64)
+    lngs = np.array([rows.get(cid, (None, None))[1] for cid in ids], dtype=np.float64)
+    if distances_km:
+        km = np.array([distances_km.get(cid, np.nan) for cid in ids], dtype=np.float64)
+    elif probe[0] is not None and probe[1] is not None:
+        km = haversine_km(probe[0], probe[1], lats, lngs)
+    else:
+        km = np.full(count, np.nan)
+    available['geo'] = ~np.isnan(km)
+    features['geo'] = np.where(available['geo'], np.exp(-np.nan_to_num(km) / GEO_SCORE_SCALE_KM), 0.0)
+
+    age_gap = np.abs(_parse_ages([candidate[3] for candidate in candidates]) - _parse_ages([age])[0])
+    available['age'] = ~np.isnan(age_gap)
+    features['age'] = np.clip(1.0 - np.nan_to_num(age_gap) / AGE_SCORE_RANGE, 0.0, 1.0)
+
+    dates = pd.to_datetime(pd.Series([rows.get(cid, (None, None, None))[2] for cid in ids], dtype=object),
+                           errors="coerce", format="ISO8601")
+    probe_date = pd.to_datetime(pd.Series([probe[2]], dtype=object), errors="coerce", format="ISO8601")[0]
+    gap_days = np.abs((dates - probe_date).dt.total_seconds().to_numpy(dtype=np.float64)) / 86400.0
+    available['time'] = ~np.isnan(gap_days)
+    features['time'] = np.where(available['time'], np.exp(-np.nan_to_num(gap_days) / TIME_SCORE_SCALE_DAYS), 0.0)
+    return features, available
+
+
+def score_candidates(features: dict[str, np.ndarray], available: dict[str, np.ndarray],
+                     weights: dict[str, float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse signal scores in one vectorized pass.
+
+    Returns the weighted mean of each candidate's available signals and its evidence, the share
+    of the total weight those signals carry. A lone matching field (e.g. an identical age string)
+    scores high but carries too little evidence to raise an alert on its own.
+    """
+    weights = get_fusion_weights() if weights is None else weights
+    names = [name for name in weights if name in features]
+    weight_column = np.array([weights[name] for name in names], dtype=np.float64)[:, None]
+    scores = np.vstack([features[name] for name in names]).astype(np.float64)
+    mask = np.vstack([available[name] for name in names]).astype(np.float64)
+    present = (weight_column * mask).sum(axis=0)
+    fused = np.divide((weight_column * mask * scores).sum(axis=0), present, out=np.zeros_like(present), where=present > 0)
+    return fused, present / max(weight_column.sum(), 1e-9)
+
+
+# --- Geospatial Candidate Search ---
+def haversine_km(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def find_reports_near(lat: float, lng: float, radius_km: float, statuses: tuple[str, ...] = ('Missing',),
+                      exclude_id: int | None = None, partition: tuple[str, list] = ("", [])) -> list[tuple]:
+    """Reports within radius_km of a point, nearest first, via the R*Tree bounding-box index.
+
+    Returns (id, name, last_seen_location, age, distance_km) tuples.
+    """
+    lat_delta = radius_km / 111.32
+    lng_delta = radius_km / max(111.32 * np.cos(np.radians(lat)), 1e-6)
+    placeholders = ",".join("?" for _ in statuses)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute(
         f"""
-        UPDATE match_results
-        SET status = 'Resolved'
-        WHERE source_report_id IN ({placeholders}) OR candidate_report_id IN ({placeholders})
+        SELECT mp.id, mp.name, mp.last_seen_location, mp.age, mp.location_lat, mp.location_lng
+        FROM report_locations rl
+        JOIN missing_persons mp ON mp.id = rl.id
+        WHERE rl.min_lat >= ? AND rl.max_lat <= ? AND rl.min_lng >= ? AND rl.max_lng <= ?
+          AND mp.status IN ({placeholders}) AND mp.id != ?
+          {"AND " + partition[0] if partition[0] else ""}
         """,
-        all_ids + all_ids,
+        (lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta, *statuses,
+         exclude_id if exclude_id is not None else -1, *partition[1])
     )
-    conn.commit()
+    rows = c.fetchall()
     conn.close()
+    if not rows:
+        return []
+    distances = haversine_km(lat, lng, [row[4] for row in rows], [row[5] for row in rows])
+    nearby = [(*row[:4], float(distance)) for row, distance in zip(rows, distances) if distance <= radius_km]
+    return sorted(nearby, key=lambda row: row[4])
 
 
-def delete_report_and_matches(person_id: int):
-    """Delete a report plus any matched partner reports and clean up match records."""
-    partner_ids = get_matched_partner_ids(person_id)
-    unique_ids = [person_id] + [pid for pid in partner_ids if pid != person_id]
+def find_unlocated_reports(statuses: tuple[str, ...] = ('Missing',), exclude_id: int | None = None,
+                           partition: tuple[str, list] = ("", [])) -> list[tuple]:
+    """Reports without coordinates, which no radius search can reach.
 
-    placeholders = ",".join("?" for _ in unique_ids)
+    Returns (id, name, last_seen_location, age, None) tuples, shaped like find_reports_near rows.
+    """
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
+    rows = conn.execute(
         f"""
-        DELETE FROM match_results
-        WHERE source_report_id IN ({placeholders}) OR candidate_report_id IN ({placeholders})
+        SELECT mp.id, mp.name, mp.last_seen_location, mp.age
+        FROM missing_persons mp
+        WHERE (mp.location_lat IS NULL OR mp.location_lng IS NULL)
+          AND mp.status IN ({",".join("?" for _ in statuses)}) AND mp.id != ?
+          {"AND " + partition[0] if partition[0] else ""}
         """,
-        unique_ids + unique_ids,
-    )
-    conn.commit()
+        (*statuses, exclude_id if exclude_id is not None else -1, *partition[1])
+    ).fetchall()
     conn.close()
+    return [(*row, None) for row in rows]
 
-    for pid in unique_ids:
-        delete_report(pid)
 
+def find_geo_candidates(report_id: int, radius_km: float, statuses: tuple[str, ...] = ('Missing',),
+                        partition: tuple[str, list] = ("", [])):
+    """Nearby candidates for a report, widening the radius until enough are found.
 
-def get_stats():
+    Reports without coordinates are always included after the nearby ones (distance None), since
+    they could be anywhere. Returns (candidates, radius_used) or (None, None) when the report has
+    no coordinates or even the widest radius is too sparse, in which case callers search everything.
+    """
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    missing_count = c.execute("SELECT COUNT(*) FROM missing_persons WHERE status = 'Missing'").fetchone()[0]
-    found_count = c.execute("SELECT COUNT(*) FROM missing_persons WHERE status = 'Found'").fetchone()[0]
-    alerts = c.execute("SELECT COUNT(*) FROM notifications WHERE is_read = 0").fetchone()[0]
-    pending_matches = c.execute("SELECT COUNT(*) FROM match_results WHERE status IN ('New','Under Review')").fetchone()[0]
+    row = conn.execute(
+        "SELECT location_lat, location_lng, location_accuracy FROM missing_persons WHERE id = ?", (report_id,)
+    ).fetchone()
     conn.close()
-    return missing_count, found_count, alerts, pending_matches
-
-
-def record_match_result(source_report_id: int, candidate_report_id: int | None, similarity: float, match_type: str, details: dict):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # Avoid duplicate matches for the same pair and type
-    c.execute(
-        "SELECT id FROM match_results WHERE source_report_id = ? AND candidate_report_id IS ? AND match_type = ?",
-        (source_report_id, candidate_report_id, match_type)
-    )
-    existing = c.fetchone()
-    if existing:
+    if not row or row[0] is None or row[1] is None:
+        return None, None
+    lat, lng, accuracy = row
+    radius = radius_km + (accuracy or 0.0) / 1000.0
+    while True:
+        nearby = find_reports_near(lat, lng, radius, statuses, exclude_id=report_id, partition=partition)
+        if len(nearby) >= GEO_MIN_CANDIDATES:
+            return nearby + find_unlocated_reports(statuses, exclude_id=report_id, partition=partition), radius
+        if radius >= GEO_MAX_RADIUS_KM:
+            return None, None
+        radius = min(radius * 2, GEO_MAX_RADIUS_KM)
+
+
+def refine_face_encoding(image_bytes: bytes | None, box, report_id: int | None = None, face_index: int = 0):
+    """High-jitter, large-landmark encoding of one face, cached per report face."""
+    if report_id is not None:
+        conn = sqlite3.connect(DB_PATH)
+        row = conn.execute(
+            "SELECT encoding FROM refined_face_embeddings WHERE report_id = ? AND face_index = ? AND num_jitters = ? AND model = ?",
+            (report_id, face_index, RERANK_JITTERS, RERANK_LANDMARK_MODEL)
+        ).fetchone()
         conn.close()
-        return
-
-    c.execute(
-        '''
-        INSERT INTO match_results (source_report_id, candidate_report_id, similarity, match_type, details)
-        VALUES (?, ?, ?, ?, ?)
-        ''',
-        (source_report_id, candidate_report_id, similarity, match_type, json.dumps(details))
+        if row:
+            return np.frombuffer(row[0], dtype=np.float32)
+    if not image_bytes:
+        return None
+    encodings = face_recognition.face_encodings(
+        load_rgb_array(image_bytes),
+        known_face_locations=[tuple(box)],
+        num_jitters=RERANK_JITTERS,
+        model=RERANK_LANDMARK_MODEL,
     )
-    conn.commit()
-    conn.close()
-
+    if not len(encodings):
+        return None
+    encoding = np.asarray(encodings[0], dtype=np.float32)
+    if report_id is not None:
+        get_db_writer().execute(
+            "INSERT OR REPLACE INTO refined_face_embeddings (report_id, face_index, num_jitters, model, encoding) VALUES (?, ?, ?, ?, ?)",
+            (report_id, face_index, RERANK_JITTERS, RERANK_LANDMARK_MODEL, encoding.tobytes())
+        ).result()
+    return encoding
+
+
+def rerank_face_matches(probe_faces: list[dict], candidate_meta: list[dict], candidate_matrix: np.ndarray,
+                        probe_image_bytes: bytes | None, probe_report_id: int | None = None,
+                        tolerance: float = MATCH_TOLERANCE, top_k: int = RERANK_TOP_K) -> list[dict]:
+    """Two-stage matching: shortlist with the fast encodings, then re-score the top-K with refined ones.
+
+    The shortlist uses a slightly looser tolerance so borderline true matches can be recovered;
+    only the probe faces and candidate photos that reach the shortlist pay for re-encoding.
+    """
+    shortlist = match_faces(probe_faces, candidate_meta, candidate_matrix, tolerance=tolerance + RERANK_MARGIN)[:top_k]
+    if not shortlist:
+        return []
 
-def update_match_status(match_id: int, new_status: str):
+    probes_by_index = {face["face_index"]: face for face in probe_faces}
+    refined_probes = {}
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("UPDATE match_results SET status = ? WHERE id = ?", (new_status, match_id))
-    conn.commit()
-    conn.close()
+    results = []
+    for match in shortlist:
+        probe_index = match["probe_face_index"]
+        if probe_index not in refined_probes:
+            refined_probes[probe_index] = refine_face_encoding(
+                probe_image_bytes, probes_by_index[probe_index]["box"], probe_report_id, probe_index
+            )
+        probe_encoding = refined_probes[probe_index]
 
+        candidate_encoding = refine_face_encoding(None, match["candidate_box"], match["report_id"], match["candidate_face_index"])
+        if candidate_encoding is None:
+            row = c.execute("SELECT image FROM missing_persons WHERE id = ?", (match["report_id"],)).fetchone()
+            candidate_encoding = refine_face_encoding(
+                row[0] if row else None, match["candidate_box"], match["report_id"], match["candidate_face_index"]
+            )
+        if probe_encoding is None or candidate_encoding is None:
+            continue
 
-def get_match_results(status_filter: list[str] | None = None, limit: int = 20):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    if status_filter:
-        placeholders = ",".join("?" for _ in status_filter)
-        query = f'''
-            SELECT id, source_report_id, candidate_report_id, similarity, match_type, details, status, created_at
-            FROM match_results
-            WHERE status IN ({placeholders})
-            ORDER BY created_at DESC
-            LIMIT ?
-        '''
-        c.execute(query, (*status_filter, limit))
-    else:
-        c.execute('''
-            SELECT id, source_report_id, candidate_report_id, similarity, match_type, details, status, created_at
-            FROM match_results
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (limit,))
-    rows = c.fetchall()
+        distance = float(np.linalg.norm(probe_encoding - candidate_encoding))
+        if distance <= tolerance:
+            results.append(dict(match, distance=distance, coarse_distance=match["distance"], refined=True))
     conn.close()
-    return [
-        {
-            "id": row[0],
-            "source_report_id": row[1],
-            "candidate_report_id": row[2],
-            "similarity": row[3],
-            "match_type": row[4],
-            "details": json.loads(row[5]) if row[5] else {},
-            "status": row[6],
-            "created_at": row[7]
-        } for row in rows
-    ]
-
-
-def get_person_matches(person_id: int):
+    return sorted(results, key=lambda match: match["distance"])
+
+
+def run_matching_pipeline(report_id: int, image_bytes: bytes | None, person_name: str, last_seen_location: str, age: str,
+                          rerank: bool | None = None, radius_km: float | None = None, gender: str | None = None):
+    """Match a report against the open reports of the opposite partition.
+
+    New missing reports are compared with earlier sightings and new sightings with open missing
+    cases, so every pair is compared once whichever arrives first. Only the age/gender partitions
+    compatible with the report's estimates and the configured lookback window are searched, and
+    with radius_km the nearby subset (plus reports without coordinates) is searched first, falling
+    back to the full set when nothing nearby clears the face or score thresholds. A face with no
+    confident match in the compatible partitions is searched again across all of them. Face search
+    walks the monthly segments newest first and stops once SEARCH_TOP_K confident matches are found. Face, text, distance,
+    age and time signals are then fused into one ranked list (see score_candidates). A sighting
+    joining a cluster that was already searched from about the same centroid reuses its matches.
+    """
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        '''
-        SELECT id, source_report_id, candidate_report_id, similarity, match_type, status, created_at
-        FROM match_results
-        WHERE source_report_id = ? OR candidate_report_id = ?
-        ORDER BY created_at DESC
-        ''',
-        (person_id, person_id)
-    )
-    rows = c.fetchall()
+    row = conn.execute("SELECT gender, report_kind FROM missing_persons WHERE id = ?", (report_id,)).fetchone()
     conn.close()
-    return [
-        {
-            "id": row[0],
-            "source_report_id": row[1],
-            "candidate_report_id": row[2],
-            "similarity": row[3],
-            "match_type": row[4],
-            "status": row[5],
-            "created_at": row[6]
-        } for row in rows
-    ]
+    if gender is None:
+        gender = row[0] if row else None
+    candidate_kind = OPPOSITE_KIND[row[1] if row and row[1] else 'missing']
+    statuses = OPEN_STATUSES[candidate_kind]
+    window = search_window_clause()
+    partition = combine_clauses(("mp.report_kind = ?", [candidate_kind]), candidate_partition_clause(age, gender), window)
+    full_partition = combine_clauses(("mp.report_kind = ?", [candidate_kind]), window)
+
+    # Encode on arrival so the report can be searched later from the other partition
+    probe_faces = ensure_face_encodings(report_id, image_bytes) if image_bytes else []
+    search_faces = probe_faces
+    probe_cluster_id = None
+    if candidate_kind == 'missing' and len(probe_faces) == 1:
+        # Repeat sightings of one person share a cluster and are searched by its centroid
+        probe_cluster_id, centroid = assign_sighting_cluster(report_id, probe_faces[0]["encoding"])
+        search_faces = [{**probe_faces[0], "encoding": centroid}]
+        search_scope = json.dumps([partition[0], partition[1], radius_km])
+        if cluster_search_is_current(probe_cluster_id, centroid, search_scope):
+            # Searching the same scope from about the same centroid would find the same reports; later missing
+            # reports search the sightings themselves, so joining the cluster's queued matches is enough.
+            matches_found = get_cluster_matches(probe_cluster_id)
+            if matches_found:
+                set_status(report_id, "Match Found - Await Review", notify=False)
+            return matches_found
+
+    if probe_faces:
+        backfill_face_encodings(statuses)
+    # The nearby subset is searched first; when nothing in it clears the face or score thresholds, the
+    # person may have travelled further, so the full set is searched instead. Age/gender estimates can
+    # be wrong, so a face with no confident match in the compatible partitions is searched against all.
+    scopes = [(partition, radius_km), (partition, None), (full_partition, radius_km), (full_partition, None)]
+    searched_scopes = set()
+    searched_partition = None
+    passing = confident = False
+    for scope_partition, scope_radius in scopes:
+        if confident:
+            break
+        if scope_partition is searched_partition and passing:
+            continue
+        if searched_partition is not None and scope_partition is not searched_partition and not probe_faces:
+            break
+        geo_candidates, search_radius = (
+            find_geo_candidates(report_id, scope_radius, statuses, partition=scope_partition) if scope_radius else (None, None)
+        )
+        scope = (scope_partition[0], tuple(scope_partition[1]), geo_candidates is not None)
+        if scope in searched_scopes:
+            continue
+        searched_scopes.add(scope)
+        searched_partition = scope_partition
+        passing = confident = False
+        distances_km = {}
+        if geo_candidates is not None:
+            candidates = [row[:4] for row in geo_candidates]
+            distances_km = {row[0]: row[4] for row in geo_candidates if row[4] is not None}
+        else:
+            conn = sqlite3.connect(DB_PATH)
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT mp.id, mp.name, mp.last_seen_location, mp.age
+                FROM missing_persons mp
+                WHERE mp.id != ? AND mp.status IN ({",".join("?" for _ in statuses)})
+                {"AND " + scope_partition[0] if scope_partition[0] else ""}
+            """, (report_id, *statuses, *scope_partition[1]))
+            candidates = c.fetchall()
+            conn.close()
+        if not candidates:
+            continue
 
+        # Face match attempt: every face in the upload against every stored candidate face at once
+        face_matches = []
+        searched_ids = set()
+        if probe_faces:
+            searched_meta, searched_matrices = [], []
+            for segment_ids in segments_newest_first([candidate[0] for candidate in candidates]):
+                searched_ids.update(segment_ids)
+                candidate_meta, candidate_matrix = load_report_faces(segment_ids)
+                if not len(candidate_meta):
+                    continue
+                searched_meta.append(candidate_meta)
+                searched_matrices.append(candidate_matrix)
+                face_matches.extend(match_faces(search_faces, candidate_meta, candidate_matrix))
+                if sum(match["distance"] <= SEARCH_CONFIDENT_DISTANCE for match in face_matches) >= SEARCH_TOP_K:
+                    break
+            if searched_meta and (RERANK_ENABLED if rerank is None else rerank):
+                face_matches = rerank_face_matches(
+                    probe_faces, np.concatenate(searched_meta), np.vstack(searched_matrices), image_bytes, report_id
+                )
+            searched_ids &= {int(report) for meta in searched_meta for report in np.unique(meta["report_id"])}
 
-def run_matching_pipeline(report_id: int, image_bytes: bytes | None, person_name: str, last_seen_location: str, age: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        SELECT id, name, image, last_seen_location, age
-        FROM missing_persons
-        WHERE id != ? AND status = 'Missing'
-    """, (report_id,))
-    candidates = c.fetchall()
-    conn.close()
+        features, available = candidate_features(
+            report_id, candidates, person_name, last_seen_location, age, face_matches, searched_ids, distances_km
+        )
+        scores, evidence = score_candidates(features, available)
+        confident = any(match["distance"] <= SEARCH_CONFIDENT_DISTANCE for match in face_matches)
+        passing = bool(face_matches) or bool(np.any((scores >= FUSION_MIN_SCORE) & (evidence >= FUSION_MIN_EVIDENCE)))
 
     if not candidates:
         return []
 
     matches_found = []
+    new_matches = []
+    candidate_clusters = {}
+    if candidate_kind == 'sighting':
+        conn = sqlite3.connect(DB_PATH)
+        candidate_ids = [candidate[0] for candidate in candidates]
+        for start in range(0, len(candidate_ids), 900):
+            chunk = candidate_ids[start:start + 900]
+            candidate_clusters.update(conn.execute(
+                f"SELECT id, cluster_id FROM missing_persons WHERE id IN ({','.join('?' for _ in chunk)}) AND cluster_id IS NOT NULL",
+                chunk
+            ).fetchall())
+        conn.close()
+    face_by_id = {face_match["report_id"]: face_match for face_match in face_matches}
 
-    uploaded_encoding = None
-    if image_bytes:
-        try:
-            uploaded_img_np = np.array(Image.open(io.BytesIO(image_bytes)))
-            encodings = face_recognition.face_encodings(uploaded_img_np)
-            if encodings:
-                uploaded_encoding = encodings[0]
-        except Exception:
-            uploaded_encoding = None
-
-    for candidate in candidates:
-        candidate_id, candidate_name, candidate_image_bytes, candidate_location, candidate_age = candidate
-
-        # Face match attempt
-        if uploaded_encoding is not None and candidate_image_bytes:
-            try:
-                db_img_np = np.array(Image.open(io.BytesIO(candidate_image_bytes)))
-                db_encodings = face_recognition.face_encodings(db_img_np)
-                if db_encodings:
-                    db_encoding = db_encodings[0]
-                    is_match = face_recognition.compare_faces([uploaded_encoding], db_encoding, tolerance=MATCH_TOLERANCE)[0]
-                    if is_match:
-                        distance = face_recognition.face_distance([uploaded_encoding], db_encoding)[0]
-                        similarity = float((1 - distance) * 100)
-                        details = {
-                            "match_reason": "Facial recognition",
-                            "source_name": person_name,
-                            "candidate_name": candidate_name
-                        }
-                        record_match_result(report_id, candidate_id, similarity, "facial", details)
-                        matches_found.append({"id": candidate_id, "name": candidate_name, "score": similarity, "method": "Facial"})
-            except Exception:
-                pass
-
-        # Text similarity fallback
-        name_similarity = sequence_similarity(person_name, candidate_name)
-        location_similarity = sequence_similarity(last_seen_location or "", candidate_location or "")
-        age_similarity = 1.0 if candidate_age and age and candidate_age == age else 0.0
-        combined_score = max(name_similarity, location_similarity, age_similarity)
-
-        if combined_score >= MIN_TEXT_SIMILARITY:
+    reported_clusters = set()
+    for index in np.argsort(-scores, kind="stable"):
+        candidate_id, candidate_name = candidates[index][0], candidates[index][1]
+        face_match = face_by_id.get(candidate_id)
+        if face_match is None and (scores[index] < FUSION_MIN_SCORE or evidence[index] < FUSION_MIN_EVIDENCE):
+            continue
+        cluster_id = candidate_clusters.get(candidate_id, probe_cluster_id)
+        if candidate_id in candidate_clusters:
+            # Only the best-scoring sighting of each cluster is reported
+            if cluster_id in reported_clusters:
+                continue
+            reported_clusters.add(cluster_id)
+
+        similarity = float(scores[index] * 100)
+        signals = {name: round(float(features[name][index]), 2) for name in features if available[name][index]}
+        if face_match is not None:
+            details = {
+                "match_reason": "Facial recognition",
+                "source_name": person_name,
+                "candidate_name": candidate_name,
+                "face_distance": round(face_match["distance"], 4),
+                "source_face_index": face_match["probe_face_index"],
+                "source_face_box": face_match["probe_box"],
+                "candidate_face_box": face_match["candidate_box"],
+                "refined": face_match.get("refined", False),
+            }
+        else:
             details = {
                 "match_reason": "Contextual similarity",
-                "name_similarity": f"{name_similarity:.2f}",
-                "location_similarity": f"{location_similarity:.2f}",
-                "age_similarity": f"{age_similarity:.2f}"
+                "name_similarity": f"{features['name'][index]:.2f}",
+                "location_similarity": f"{features['location'][index]:.2f}",
+                "age_similarity": f"{features['age'][index]:.2f}"
             }
-            record_match_result(report_id, candidate_id, combined_score * 100, "context", details)
-            matches_found.append({"id": candidate_id, "name": candidate_name, "score": combined_score * 100, "method": "Context"})
-
-    if matches_found:
-        top_match = matches_found[0]
-        reporter_summary = fetch_person_summary(report_id)
-        reporter_phone = reporter_summary['phone'] if reporter_summary else "N/A"
-        create_notification(
-            "Potential match detected",
-            f"Report #{report_id} has {len(matches_found)} potential match(es). Highest: {top_match['name']} ({top_match['method']}). Reporter Phone: {reporter_phone}",
-            level="warning",
-            payload={"report_id": report_id, "matches": matches_found}
-        )
+        details["signals"] = signals
+        if candidate_id in distances_km:
+            details["distance_km"] = round(distances_km[candidate_id], 2)
+            details["search_radius_km"] = round(search_radius, 1)
+        match = {
+            "id": candidate_id,
+            "name": candidate_name,
+            "score": similarity,
+            "method": "Facial" if face_match is not None else "Context",
+        }
+        if face_match is not None:
+            match["face_box"] = face_match["probe_box"]
+        match_type = "facial" if face_match is not None else "context"
+        if record_match_result(report_id, candidate_id, similarity, match_type, details, cluster_id):
+            new_matches.append(match)
+        matches_found.append(match)
+
+    if new_matches:
+        notify_matches(report_id, new_matches)
+    elif matches_found:
+        # Already queued for this sighting's cluster: join the review silently
         set_status(report_id, "Match Found - Await Review", notify=False)
-        for match in matches_found:
-            set_status(match['id'], "Match Found - Await Review", notify=False)
+    if probe_cluster_id is not None:
+        mark_cluster_searched(probe_cluster_id, centroid, search_scope)
 
     return matches_found
 
+
+def notify_matches(report_id: int, matches_found: list[dict]):
+    """Alert admins about new matches and move every involved report into review."""
+    top_match = matches_found[0]
+    reporter_summary = fetch_person_summary(report_id)
+    reporter_phone = reporter_summary['phone'] if reporter_summary else "N/A"
+    create_notification(
+        "Potential match detected",
+        f"Report #{report_id} has {len(matches_found)} potential match(es). Highest: {top_match['name']} ({top_match['method']}). Reporter Phone: {reporter_phone}",
+        level="warning",
+        payload={"report_id": report_id, "matches": matches_found}
+    )
+    set_status(report_id, "Match Found - Await Review", notify=False)
+    for match in matches_found:
+        set_status(match['id'], "Match Found - Await Review", notify=False)
+    queue_reporter_messages([report_id, *(match['id'] for match in matches_found)], *REPORTER_MESSAGES['match'])
+
+# --- Ingestion Service ---
+# UI-free entry points shared by the Streamlit forms and api_server.py.
+def submit_report(fields: dict, image_bytes: bytes | None, source: str = "Public", sighting: bool = False) -> dict:
+    """Store a missing-person report or a sighting, index its photo and run matching.
+
+    fields holds missing_persons columns (name, last_seen_location, reporter_phone, ...); age and
+    gender are estimated from the photo. Returns the new report id and tracking code, the AI
+    estimates, queued matches, a likely duplicate and any face quality warning.
+    """
+    upload = analyze_upload(image_bytes) if image_bytes else None
+    record = {
+        "age": upload["age"] if upload else "N/A",
+        "gender": upload["gender"] if upload else "N/A",
+        "image": image_bytes,
+        "date_reported": datetime.datetime.now(),
+        "reporter_tracking_code": None if sighting else generate_tracking_code(),
+        "report_source": source,
+        **fields,
+    }
+    if sighting:
+        record.setdefault("name", "Sighting Report")
+        record.setdefault("reporter_consent", 1)  # Assume consent for sightings
+        record["status"] = "Sighting Reported"
+    report_id = insert_report(record)
+
+    tracking_code = record["reporter_tracking_code"]
+    notify_new_submission(
+        report_id=report_id,
+        source=source,
+        tracking_code=tracking_code if source == "Public" else None,
+        reporter_phone=record.get("reporter_phone"),
+    )
+    queue_reporter_messages([report_id], *REPORTER_MESSAGES['sighting' if sighting else 'report'])
+    duplicate_of = register_upload(report_id, upload) if upload else None
+    matches = run_matching_pipeline(
+        report_id, image_bytes, record["name"], record.get("last_seen_location"), record["age"], radius_km=GEO_SEARCH_RADIUS_KM
+    )
+    return {
+        "report_id": report_id,
+        "tracking_code": tracking_code,
+        "age": record["age"],
+        "gender": record["gender"],
+        "matches": matches,
+        "duplicate_of": duplicate_of,
+        "quality_warning": face_quality_warning(report_id),
+    }
+
+
+def rematch_report(report_id: int) -> list[dict] | None:
+    """Run matching again for a stored report; None if it does not exist."""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute(
+        "SELECT image, name, last_seen_location, age, gender FROM missing_persons WHERE id = ?", (report_id,)
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    image_bytes, name, last_seen_location, age, gender = row
+    return run_matching_pipeline(
+        report_id, image_bytes, name, last_seen_location, age, radius_km=GEO_SEARCH_RADIUS_KM, gender=gender
+    )
+
+
 # --- UI Components ---
 def report_missing_person_form(source: str = "Public"):
     require_contact = source == "Public"
@@ -680,7 +2908,6 @@ def report_missing_person_form(source: str = "Public"):
                 return
 
             image_bytes = uploaded_image.getvalue()
-            age_estimate, gender_estimate = detect_age_gender(image_bytes) if uploaded_image else ("N/A", "N/A")
 
             lat_value = None
             lng_value = None
@@ -701,55 +2928,28 @@ def report_missing_person_form(source: str = "Public"):
             reporter_phone_clean = reporter_phone.strip() if reporter_phone else None
             reporter_email_clean = reporter_email.strip() if reporter_email else None
 
-            tracking_code = generate_tracking_code()
-            reported_at = datetime.datetime.now()
-
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute(
-                """
-                INSERT INTO missing_persons (
-                    name, age, gender, last_seen_location, description, image, date_reported,
-                    reporter_phone, reporter_email, reporter_consent, location_lat, location_lng,
-                    location_accuracy, reporter_tracking_code, report_source
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    name,
-                    age_estimate,
-                    gender_estimate,
-                    last_seen,
-                    description,
-                    image_bytes,
-                    reported_at,
-                    reporter_phone_clean,
-                    reporter_email_clean,
-                    int(reporter_consent),
-                    lat_value,
-                    lng_value,
-                    accuracy_value,
-                    tracking_code,
-                    source
-                )
-            )
-            person_id = c.lastrowid
-            conn.commit()
-            conn.close()
-
-            notify_new_submission(
-                report_id=person_id,
-                source=source,
-                tracking_code=tracking_code if source == "Public" else None,
-                reporter_phone=reporter_phone_clean,
-            )
-            matches = run_matching_pipeline(person_id, image_bytes, name, last_seen, age_estimate)
+            result = submit_report({
+                "name": name,
+                "last_seen_location": last_seen,
+                "description": description,
+                "reporter_phone": reporter_phone_clean,
+                "reporter_email": reporter_email_clean,
+                "reporter_consent": int(reporter_consent),
+                "location_lat": lat_value,
+                "location_lng": lng_value,
+                "location_accuracy": accuracy_value,
+            }, image_bytes, source=source)
 
             st.success(f"Report for {name} submitted successfully.")
-            st.info(f"Tracking ID: **{tracking_code}** — share this to follow up on the case.")
-            if age_estimate != "N/A" or gender_estimate != "N/A":
-                st.info(f"AI Analysis: Estimated Age {age_estimate}, Estimated Gender {gender_estimate}.")
-            if matches:
-                st.warning(f"{len(matches)} potential match(es) queued for admin review.")
+            st.info(f"Tracking ID: **{result['tracking_code']}** — share this to follow up on the case.")
+            if result["age"] != "N/A" or result["gender"] != "N/A":
+                st.info(f"AI Analysis: Estimated Age {result['age']}, Estimated Gender {result['gender']}.")
+            if result["matches"]:
+                st.warning(f"{len(result['matches'])} potential match(es) queued for admin review.")
+            if result["duplicate_of"]:
+                st.info(f"This photo matches report #{result['duplicate_of']} already on file, so it has been flagged as a likely duplicate for admin review.")
+            if result["quality_warning"]:
+                st.warning(result["quality_warning"])
 
 def search_by_image_tab():
     st.header("Found Someone?")
@@ -790,7 +2990,6 @@ def search_by_image_tab():
 
             # Process the sighting report
             image_bytes = uploaded_image.getvalue()
-            age_estimate, gender_estimate = detect_age_gender(image_bytes)
 
             lat_value = None
             lng_value = None
@@ -801,56 +3000,43 @@ def search_by_image_tab():
                 lng_value = captured_coords['lng']
                 accuracy_value = captured_coords['accuracy']
 
-            # Insert sighting as a report
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute(
-                """
-                INSERT INTO missing_persons (
-                    name, age, gender, last_seen_location, description, image, date_reported,
-                    reporter_phone, reporter_email, reporter_consent, location_lat, location_lng,
-                    location_accuracy, reporter_tracking_code, report_source, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    "Sighting Report",
-                    age_estimate,
-                    gender_estimate,
-                    sighting_location,
-                    additional_notes,
-                    image_bytes,
-                    datetime.datetime.now(),
-                    reporter_phone,
-                    reporter_email,
-                    1,  # Assume consent for sightings
-                    lat_value,
-                    lng_value,
-                    accuracy_value,
-                    None,  # No tracking code for sightings
-                    "Sighting",
-                    "Sighting Reported"
-                )
-            )
-            sighting_id = c.lastrowid
-            conn.commit()
-            conn.close()
-
-            notify_new_submission(
-                report_id=sighting_id,
-                source="Sighting",
-                tracking_code=None,
-                reporter_phone=reporter_phone,
-            )
-            # Run matching pipeline on the sighting image with the new report_id
-            matches = run_matching_pipeline(sighting_id, image_bytes, "Sighting Report", sighting_location, age_estimate)
+            # Store the sighting as a report; it is matched against open missing reports
+            result = submit_report({
+                "last_seen_location": sighting_location,
+                "description": additional_notes,
+                "reporter_phone": reporter_phone,
+                "reporter_email": reporter_email,
+                "location_lat": lat_value,
+                "location_lng": lng_value,
+                "location_accuracy": accuracy_value,
+            }, image_bytes, source="Sighting", sighting=True)
 
             st.success("Sighting report submitted successfully!")
             st.info("🚔 **Police will follow up with you shortly.** Please keep your phone available for contact from local authorities.")
-            if age_estimate != "N/A" or gender_estimate != "N/A":
-                st.info(f"AI Analysis of photo: Estimated Age {age_estimate}, Estimated Gender {gender_estimate}.")
+            if result["age"] != "N/A" or result["gender"] != "N/A":
+                st.info(f"AI Analysis of photo: Estimated Age {result['age']}, Estimated Gender {result['gender']}.")
+            if result["duplicate_of"]:
+                st.info(f"This photo matches report #{result['duplicate_of']} already on file, so it has been flagged as a likely duplicate for admin review.")
+            if result["quality_warning"]:
+                st.warning(result["quality_warning"])
             st.warning("Do not approach the person directly. Wait for professional assistance.")
 
 
+def lookup_tracking_status(tracking_code: str) -> dict | None:
+    """Public status of a report by tracking code: one unique-index probe that never reads the photo."""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("""
+        SELECT id, name, status, last_seen_location, date_reported, location_lat, location_lng
+        FROM missing_persons
+        WHERE reporter_tracking_code = ?
+    """, (tracking_code,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+    keys = ("id", "name", "status", "last_seen_location", "date_reported", "location_lat", "location_lng")
+    return dict(zip(keys, row))
+
+
 def track_report_form():
     st.header("Track an Existing Report")
     st.write("Enter the tracking ID that was shared after you submitted the report.")
@@ -861,25 +3047,22 @@ def track_report_form():
             st.warning("Please enter a valid tracking ID.")
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            SELECT id, name, status, last_seen_location, date_reported, reporter_phone, location_lat, location_lng
-            FROM missing_persons
-            WHERE reporter_tracking_code = ?
-        """, (tracking_id,))
-        record = c.fetchone()
-        conn.close()
+        if "tracking_lookup_bucket" not in st.session_state:
+            st.session_state.tracking_lookup_bucket = TokenBucket(TRACKING_LOOKUP_RATE, TRACKING_LOOKUP_BURST)
+        if not st.session_state.tracking_lookup_bucket.try_acquire():
+            st.error("Too many lookups. Please wait a minute before checking again.")
+            return
 
+        record = lookup_tracking_status(tracking_id)
         if record:
             st.success("Report located.")
-            st.write(f"**Name:** {record[1]}")
-            st.write(f"**Status:** {record[2]}")
-            st.write(f"**Last Seen:** {record[3]}")
-            st.write(f"**Reported On:** {record[4]}")
+            st.write(f"**Name:** {record['name']}")
+            st.write(f"**Status:** {record['status']}")
+            st.write(f"**Last Seen:** {record['last_seen_location']}")
+            st.write(f"**Reported On:** {record['date_reported']}")
             st.write("**Investigator Contact:** Provided to authorities.")
-            if record[6] is not None and record[7] is not None:
-                st.map(pd.DataFrame([{"lat": record[6], "lon": record[7]}]))
+            if record['location_lat'] is not None and record['location_lng'] is not None:
+                st.map(pd.DataFrame([{"lat": record['location_lat'], "lon": record['location_lng']}]))
             st.caption("If details change, submit an update mentioning this tracking ID.")
         else:
             st.error("No report found for that tracking ID. Double-check the code from your confirmation message.")
@@ -902,7 +3085,7 @@ def render_alerts_and_matches():
     st.header("Alerts & Matches Center")
     st.write("Review unread alerts from public reports and automated match jobs.")
 
-    notifications = get_notifications(include_read=True, limit=25)
+    notifications = cached_read(get_notifications, True, 25)
     if notifications:
         for note in notifications:
             if note['level'] == 'warning':
@@ -929,15 +3112,21 @@ def render_alerts_and_matches():
         st.info("No alerts at the moment.")
 
     st.subheader("Potential Matches Queue")
-    matches = get_match_results(status_filter=['New', 'Under Review'], limit=30)
-    if not matches:
+    groups, summaries, cluster_sizes = cached_read(load_match_queue, ('New', 'Under Review'), 30)
+    if not groups:
         st.success("No pending matches. Great job staying on top of the queue!")
         return
 
-    for match in matches:
-        source_summary = fetch_person_summary(match['source_report_id'])
-        candidate_summary = fetch_person_summary(match['candidate_report_id']) if match['candidate_report_id'] else None
+    for group in groups:
+        match = max(group, key=lambda item: item['similarity'])
+        source_summary = summaries.get(match['source_report_id'])
+        candidate_summary = summaries.get(match['candidate_report_id']) if match['candidate_report_id'] else None
         st.markdown(f"**Match #{match['id']}** — {match['match_type'].title()} ({match['similarity']:.1f}%) — Status: {match['status']}")
+        if match['cluster_id'] is not None:
+            st.caption(
+                f"Sighting cluster #{match['cluster_id']}: {cluster_sizes.get(match['cluster_id'], 0)} sighting(s), "
+                f"{len(group)} queued match(es) reviewed together."
+            )
         col1, col2 = st.columns(2)
         with col1:
             st.write("**Source Report**")
@@ -961,11 +3150,13 @@ def render_alerts_and_matches():
         action_col1, action_col2, action_col3 = st.columns(3)
         with action_col1:
             if st.button("Mark Under Review", key=f"review_{match['id']}"):
-                update_match_status(match['id'], "Under Review")
+                for item in group:
+                    update_match_status(item['id'], "Under Review")
                 st.rerun()
         with action_col2:
             if st.button("Escalate", key=f"escalate_{match['id']}"):
-                update_match_status(match['id'], "Escalated")
+                for item in group:
+                    update_match_status(item['id'], "Escalated")
                 create_notification(
                     "Match escalated",
                     f"Match #{match['id']} escalated for field investigation.",
@@ -975,7 +3166,8 @@ def render_alerts_and_matches():
                 st.rerun()
         with action_col3:
             if st.button("Dismiss", key=f"dismiss_{match['id']}"):
-                update_match_status(match['id'], "Dismissed")
+                for item in group:
+                    update_match_status(item['id'], "Dismissed")
                 st.rerun()
 
         st.divider()
@@ -983,82 +3175,71 @@ def render_alerts_and_matches():
 def find_matches_page():
     st.header("Find Potential Matches by Photo")
     st.info("Upload a photo of a found person. The system will use facial recognition to find potential matches from the active missing persons database.")
-    
+
     uploaded_image = st.file_uploader("Upload a Photo to Compare", type=['png', 'jpg', 'jpeg'], key="matching_uploader")
+    col1, col2, col3 = st.columns(3)
+    tolerance = col1.slider("Match tolerance", min_value=0.3, max_value=0.8, value=float(MATCH_TOLERANCE), step=0.02,
+                            help="Lower is stricter.")
+    top_k = col2.slider("Results to show", min_value=1, max_value=50, value=PHOTO_SEARCH_TOP_K)
+    high_accuracy = col3.checkbox(
+        "High-accuracy re-ranking",
+        value=RERANK_ENABLED,
+        help=f"Re-encode the top {RERANK_TOP_K} candidates with {RERANK_JITTERS} jitters for more reliable scores."
+    )
+    include_archive = st.checkbox("Include archive", help="Also search resolved cases moved to the archive database.")
 
-    if uploaded_image:
-        st.image(uploaded_image, caption="Image to Compare", width=300)
-        if st.button("Find Matches"):
-            with st.spinner("Processing image and comparing against database... This may take a moment."):
-                # 1. Load the uploaded image and find its face encoding
-                uploaded_bytes = uploaded_image.getvalue()
-                uploaded_img_np = np.array(Image.open(io.BytesIO(uploaded_bytes)))
-                
-                uploaded_face_encodings = face_recognition.face_encodings(uploaded_img_np)
-
-                if not uploaded_face_encodings:
-                    st.error("No face could be detected in the uploaded image. Please try a clearer photo.")
-                    return
+    if not uploaded_image:
+        return
+    st.image(uploaded_image, caption="Image to Compare", width=300)
 
-                uploaded_encoding = uploaded_face_encodings[0]
+    # Uploads are encoded once and cached, so changing the sliders re-runs only the index search
+    started = time.perf_counter()
+    with st.spinner("Searching the face index..."):
+        result = search_similar_faces(uploaded_image.getvalue(), k=top_k, tolerance=tolerance, rerank=high_accuracy,
+                                      include_archive=include_archive)
+    elapsed_ms = (time.perf_counter() - started) * 1000
 
-                # 2. Get all missing persons from the database
-                conn = sqlite3.connect(DB_PATH)
-                c = conn.cursor()
-                c.execute("SELECT id, name, image FROM missing_persons WHERE status = 'Missing'")
-                all_missing_persons = c.fetchall()
-                conn.close()
+    if not result["probe_faces"]:
+        st.error("No clear, front-facing face could be detected in the uploaded image. Please try a sharper photo.")
+        return
+    if not result["faces_searched"]:
+        st.warning("There are no active missing person reports in the database to compare against.")
+        return
 
-                if not all_missing_persons:
-                    st.warning("There are no active missing person reports in the database to compare against.")
-                    return
+    st.subheader("Matching Results")
+    st.caption(f"Searched {result['faces_searched']} stored face(s) in {elapsed_ms:.0f} ms.")
+    if not result["matches"]:
+        st.warning("No matches found in the database for the uploaded photo.")
+        return
 
-                # 3. Compare the uploaded face to all faces in the database
-                matches = []
-                for person in all_missing_persons:
-                    person_id, person_name, person_image_bytes = person
-                    
-                    try:
-                        db_img_np = np.array(Image.open(io.BytesIO(person_image_bytes)))
-                        db_face_encodings = face_recognition.face_encodings(db_img_np)
-                        
-                        if db_face_encodings:
-                            db_encoding = db_face_encodings[0]
-                            # The compare_faces function returns a list of True/False values
-                            is_match = face_recognition.compare_faces([uploaded_encoding], db_encoding, tolerance=0.6)[0]
-                            
-                            if is_match:
-                                distance = face_recognition.face_distance([uploaded_encoding], db_encoding)[0]
-                                similarity = (1 - distance) * 100
-                                matches.append({
-                                    "id": person_id,
-                                    "name": person_name,
-                                    "image": person_image_bytes,
-                                    "similarity": f"{similarity:.2f}%"
-                                })
-                    except Exception:
-                        # Ignore images in the DB that cause processing errors
-                        continue
-                
-                # 4. Display the results
-                st.subheader("Matching Results")
-                if matches:
-                    # Sort matches by similarity, highest first
-                    sorted_matches = sorted(matches, key=lambda x: float(x['similarity'][:-1]), reverse=True)
-                    st.success(f"Found {len(sorted_matches)} potential match(es).")
-                    for match in sorted_matches:
-                        with st.container():
-                            col1, col2 = st.columns([1, 2])
-                            with col1:
-                                st.image(match['image'], caption=f"Match: {match['name']}")
-                            with col2:
-                                st.write(f"**Name:** {match['name']}")
-                                st.write(f"**Match Confidence:** {match['similarity']}")
-                                st.write(f"**Database ID:** {match['id']}")
-                                st.info("Review this case in the 'Manage Reports' section.")
-                            st.markdown("---")
-                else:
-                    st.warning("No matches found in the database for the uploaded photo.")
+    st.success(f"Showing the {len(result['matches'])} closest match(es).")
+    # Results are already ranked; each one is rendered as soon as its record is fetched
+    conn = connect_with_archive() if include_archive else sqlite3.connect(DB_PATH)
+    for face_match in result["matches"]:
+        person = conn.execute(
+            "SELECT name, image FROM missing_persons WHERE id = ?", (face_match["report_id"],)
+        ).fetchone()
+        if not person and include_archive:
+            person = conn.execute(
+                "SELECT name, image FROM archive.missing_persons WHERE id = ?", (face_match["report_id"],)
+            ).fetchone()
+        if not person:
+            continue
+        similarity = (1 - face_match["distance"]) * 100
+        with st.container():
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                if person[1]:
+                    st.image(person[1], caption=f"Match: {person[0]}")
+            with col2:
+                st.write(f"**Name:** {person[0]}")
+                st.write(f"**Match Confidence:** {similarity:.2f}%")
+                st.write(f"**Database ID:** {face_match['report_id']}")
+                if len(result["probe_faces"]) > 1:
+                    st.write(f"**Matched Face (top, right, bottom, left):** {face_match['probe_box']}")
+                st.info("Review this case in the 'Manage Reports' section.")
+            st.markdown("---")
+    conn.close()
 
 # --- Login and Portal Functions ---
 def show_login_page():
@@ -1086,31 +3267,30 @@ def admin_portal():
         st.session_state['logged_in'] = False
         st.rerun()
 
-    emit_admin_toasts()
+    with st.sidebar:
+        admin_alerts_poller()
+    maybe_run_maintenance()
     menu = st.sidebar.radio(
         "Navigation",
-        ["Dashboard", "Manage Reports", "Add New Report", "Alerts & Matches"]
+        ["Dashboard", "Manage Reports", "Add New Report", "Find Matches", "Alerts & Matches"]
+    )
+    cache_stats = read_cache_stats()
+    st.sidebar.caption(
+        f"Read cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries"
     )
 
     if menu == "Dashboard":
         st.header("Admin Dashboard")
-        missing_count, found_count, alerts, pending_matches = get_stats()
+        missing_count, found_count, alerts, pending_matches = cached_read(get_stats)
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Active Missing Reports", missing_count)
         col2.metric("Persons Found", found_count)
         col3.metric("Unread Alerts", alerts)
         col4.metric("Pending Matches", pending_matches)
 
-        conn = sqlite3.connect(DB_PATH)
-        latest = pd.read_sql_query(
-            "SELECT id, name, status, date_reported FROM missing_persons ORDER BY date_reported DESC LIMIT 5",
-            conn
-        )
-        map_df = pd.read_sql_query(
-            "SELECT location_lat as lat, location_lng as lon FROM missing_persons WHERE status = 'Missing' AND location_lat IS NOT NULL AND location_lng IS NOT NULL",
-            conn
-        )
-        conn.close()
+        latest = cached_read(get_latest_reports, 5)
+        map_df, cell_degrees = heatmap_cells()
 
         st.subheader("Recent Activity")
         if not latest.empty:
@@ -1120,19 +3300,62 @@ def admin_portal():
 
         st.subheader("Active Case Heatmap")
         if not map_df.empty:
-            st.map(map_df)
+            # Dot radius grows with the case count, up to half a grid cell
+            cell_meters = cell_degrees * 111_000
+            map_df = map_df.assign(size=cell_meters / 2 * np.sqrt(map_df["cases"] / map_df["cases"].max()))
+            st.map(map_df, size="size")
+            st.caption(f"{int(map_df['cases'].sum())} open cases in {len(map_df)} cells of ~{cell_meters:,.0f} m")
         else:
             st.info("No geolocated reports yet.")
 
+        with st.expander("Search Settings"):
+            lookback = st.number_input(
+                "Match lookback window (months, 0 = all history)",
+                min_value=0,
+                value=int(get_setting("search_lookback_months", SEARCH_LOOKBACK_MONTHS)),
+                step=1
+            )
+            st.write("Match score weights")
+            current_weights = get_fusion_weights()
+            weight_cols = st.columns(len(current_weights))
+            new_weights = {
+                name: weight_cols[index].number_input(
+                    name.title(), min_value=0.0, max_value=1.0, value=float(weight), step=0.05, key=f"weight_{name}"
+                )
+                for index, (name, weight) in enumerate(current_weights.items())
+            }
+            if st.button("Save Search Settings"):
+                set_setting("search_lookback_months", int(lookback))
+                set_setting("fusion_weights", json.dumps(new_weights))
+                st.success("Search settings saved.")
+            st.caption(f"Face index shards: {', '.join(list_embedding_shards()) or 'none'}")
+            if st.button(f"Compact segments older than {COLD_SEGMENT_MONTHS} months"):
+                moved = compact_cold_segments()
+                st.success(f"Moved {moved} face encoding(s) into cold storage.")
+            if st.button(f"Archive cases resolved over {ARCHIVE_AFTER_DAYS} days ago"):
+                archived = archive_resolved_cases()
+                st.success(f"Moved {archived} resolved case(s) into the archive database.")
+
     elif menu == "Manage Reports":
         st.header("Manage All Reports")
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("""
-            SELECT id, name, age, gender, status, date_reported, reporter_phone, reporter_email,
-                   reporter_tracking_code, report_source, last_seen_location, location_lat, location_lng
-            FROM missing_persons
-            ORDER BY date_reported DESC
-        """, conn)
+        include_archive = st.checkbox("Include archive", help="Also list resolved cases moved to the archive database.")
+        columns = """id, name, age, gender, status, date_reported, reporter_phone, reporter_email,
+                   reporter_tracking_code, report_source, last_seen_location, location_lat, location_lng,
+                   face_quality, duplicate_of"""
+        if include_archive:
+            conn = connect_with_archive()
+            df = pd.read_sql_query(f"""
+                SELECT {columns}, 0 AS archived FROM main.missing_persons
+                UNION ALL
+                SELECT {columns}, 1 AS archived FROM archive.missing_persons
+                ORDER BY date_reported DESC
+            """, conn)
+        else:
+            conn = sqlite3.connect(DB_PATH)
+            df = pd.read_sql_query(f"""
+                SELECT {columns}, 0 AS archived FROM missing_persons
+                ORDER BY date_reported DESC
+            """, conn)
         conn.close()
 
         if df.empty:
@@ -1146,11 +3369,17 @@ def admin_portal():
             ]
             for _, row in filtered_df.iterrows():
                 header = f"{row['name']} | Status: {row['status']} | Source: {row['report_source']}"
+                if row['archived']:
+                    header += " | Archived"
                 with st.expander(header):
-                    conn = sqlite3.connect(DB_PATH)
-                    details = conn.execute("SELECT description, image FROM missing_persons WHERE id = ?", (int(row['id']),)).fetchone()
+                    if row['archived']:
+                        conn = connect_with_archive()
+                        details = conn.execute("SELECT description, image FROM archive.missing_persons WHERE id = ?", (int(row['id']),)).fetchone()
+                    else:
+                        conn = sqlite3.connect(DB_PATH)
+                        details = conn.execute("SELECT description, image FROM missing_persons WHERE id = ?", (int(row['id']),)).fetchone()
                     conn.close()
-                    person_matches = get_person_matches(row['id'])
+                    person_matches = get_person_matches(int(row['id']), include_archive=include_archive)
                     if person_matches:
                         newest_match = person_matches[0]
                         st.warning(
@@ -1167,11 +3396,15 @@ def admin_portal():
                     col2.write(f"**ID:** {row['id']}")
                     col2.write(f"**Reported Age:** {row['age']}")
                     col2.write(f"**Gender:** {row['gender']}")
+                    if pd.notna(row['face_quality']):
+                        col2.write(f"**Face Quality:** {row['face_quality']:.2f}")
                     col2.write(f"**Date Reported:** {row['date_reported']}")
                     col2.write(f"**Last Seen:** {row['last_seen_location']}")
                     col2.write(f"**Tracking ID:** {row['reporter_tracking_code']}")
                     col2.write(f"**Reporter Phone:** {row['reporter_phone'] or 'N/A'}")
                     col2.write(f"**Reporter Email:** {row['reporter_email'] or 'N/A'}")
+                    if pd.notna(row['duplicate_of']):
+                        col2.warning(f"Likely duplicate of report #{int(row['duplicate_of'])}")
 
                     if details and details[0]:
                         st.write("**Description:**")
@@ -1223,6 +3456,9 @@ def admin_portal():
     elif menu == "Add New Report":
         report_missing_person_form(source="Admin")
 
+    elif menu == "Find Matches":
+        find_matches_page()
+
     elif menu == "Alerts & Matches":
         render_alerts_and_matches()
 
@@ -1231,16 +3467,7 @@ def lost_lists_tab():
     st.header("Lost Lists")
     st.write("Browse the list of missing persons. If you have information about any of these individuals, please report it through the 'Found Someone?' section.")
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        SELECT id, name, image, last_seen_location, description
-        FROM missing_persons
-        WHERE status = 'Missing'
-        ORDER BY date_reported DESC
-    """)
-    missing_persons = c.fetchall()
-    conn.close()
+    missing_persons = cached_read(get_missing_persons_list)
 
     if not missing_persons:
         st.info("No missing persons reports at the moment.")
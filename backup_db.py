@@ -0,0 +1,242 @@
+"""
+Online backups of the Missing Person Finder databases.
+
+Every SQLite file of the deployment (the main database, the split events and
+matches databases and the case archive) is attached to one connection and
+copied with SQLite's backup API inside a single read transaction. The copies
+therefore form one consistent snapshot: a match never references a report
+missing from the main copy, and a case archived meanwhile is in exactly one
+of them. The databases run in WAL mode, so the app's writers keep committing
+while the snapshot is read, and each file is copied in one step, which a
+concurrent commit cannot restart. The face embedding store directory, which
+lives outside the databases, is copied first; on restore it is reconciled
+with the restored face_embeddings table. Each copy is checked with
+``PRAGMA integrity_check`` before the backup is published: it is written to
+``<stamp>.partial`` and renamed only when complete, so a backup directory
+without that suffix is always usable. Older backups beyond ``--keep`` are
+removed.
+
+Usage:
+    python backup_db.py backup                 # one backup, keep the newest 7
+    python backup_db.py backup --every 6       # back up every 6 hours
+    python backup_db.py list
+    python backup_db.py verify backups/20260101-120000
+    python backup_db.py restore backups/20260101-120000
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import app
+
+BACKUP_KEEP = 7
+MANIFEST_NAME = "manifest.json"
+PARTIAL_SUFFIX = ".partial"
+
+
+def default_backup_root() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(app.DB_PATH)), "backups")
+
+
+def database_files() -> dict[str, str]:
+    """Schema name and path of every SQLite file of the deployment that currently exists."""
+    paths = {"main": app.DB_PATH, **{schema: app.split_db_path(schema) for schema in app.SPLIT_DATABASES},
+             "archive": app.archive_db_path()}
+    return {schema: path for schema, path in paths.items() if os.path.exists(path)}
+
+
+def copy_schema(source: sqlite3.Connection, schema: str, target_path: str):
+    """Copy one attached database in a single step, reading the source connection's open snapshot."""
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, name=schema)
+    finally:
+        target.close()
+
+
+def snapshot_databases(target_dir: str) -> dict[str, str]:
+    """Copy every database from one read transaction; returns the copies' paths by schema."""
+    files = database_files()
+    copies = {schema: os.path.join(target_dir, os.path.basename(path)) for schema, path in files.items()}
+    source = sqlite3.connect(files["main"], isolation_level=None)
+    try:
+        for schema, path in files.items():
+            if schema != "main":
+                source.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        source.execute("BEGIN")
+        # Reading every file first pins all of their snapshots before anything is copied
+        for schema in files:
+            source.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()
+        for schema, copy_path in copies.items():
+            copy_schema(source, schema, copy_path)
+        source.execute("COMMIT")
+    finally:
+        source.close()
+    return copies
+
+
+def copy_database(source_path: str, target_path: str):
+    """Copy one database file onto another through the backup API, in a single step."""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def check_integrity(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return "; ".join(row[0] for row in conn.execute("PRAGMA integrity_check").fetchall())
+    finally:
+        conn.close()
+
+
+def create_backup(backup_root: str | None = None, keep: int = BACKUP_KEEP) -> str:
+    """Back up every database and the embedding store; returns the published backup directory."""
+    backup_root = backup_root or default_backup_root()
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    target_dir = os.path.join(backup_root, stamp)
+    partial_dir = target_dir + PARTIAL_SUFFIX
+    os.makedirs(partial_dir)
+    manifest = {"created_at": datetime.datetime.now().isoformat(), "databases": {}, "embedding_store": None}
+    try:
+        # The store is copied before the databases, so a restore only has to add encodings filed meanwhile
+        store_dir = app.embedding_store_dir()
+        if os.path.isdir(store_dir):
+            shutil.copytree(store_dir, os.path.join(partial_dir, os.path.basename(store_dir)))
+            manifest["embedding_store"] = os.path.basename(store_dir)
+        for copy_path in snapshot_databases(partial_dir).values():
+            name = os.path.basename(copy_path)
+            integrity = check_integrity(copy_path)
+            if integrity != "ok":
+                raise RuntimeError(f"Backup of {name} failed its integrity check: {integrity}")
+            manifest["databases"][name] = {"bytes": os.path.getsize(copy_path)}
+        with open(os.path.join(partial_dir, MANIFEST_NAME), "w") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(partial_dir, target_dir)
+    except BaseException:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+    rotate_backups(backup_root, keep)
+    return target_dir
+
+
+def list_backups(backup_root: str | None = None) -> list[str]:
+    """Published backups, oldest first."""
+    backup_root = backup_root or default_backup_root()
+    if not os.path.isdir(backup_root):
+        return []
+    return [
+        os.path.join(backup_root, name) for name in sorted(os.listdir(backup_root))
+        if not name.endswith(PARTIAL_SUFFIX) and os.path.isfile(os.path.join(backup_root, name, MANIFEST_NAME))
+    ]
+
+
+def rotate_backups(backup_root: str, keep: int = BACKUP_KEEP) -> list[str]:
+    """Remove all but the newest `keep` backups, plus partial leftovers of interrupted runs."""
+    backups = list_backups(backup_root)
+    removed = backups[:-keep] if keep > 0 else backups
+    removed += [os.path.join(backup_root, name) for name in os.listdir(backup_root) if name.endswith(PARTIAL_SUFFIX)]
+    for path in removed:
+        shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def verify_backup(backup_dir: str) -> dict[str, str]:
+    """Integrity check result of every database in a backup."""
+    with open(os.path.join(backup_dir, MANIFEST_NAME)) as handle:
+        manifest = json.load(handle)
+    return {name: check_integrity(os.path.join(backup_dir, name)) for name in manifest["databases"]}
+
+
+def restore_backup(backup_dir: str):
+    """Restore a verified backup over the live files.
+
+    Databases are written back through the backup API, so open connections see the restored
+    content instead of a swapped-out file. The embedding store is replaced as a whole and then
+    reconciled with the restored encodings.
+    """
+    results = verify_backup(backup_dir)
+    damaged = {name: result for name, result in results.items() if result != "ok"}
+    if damaged:
+        raise RuntimeError(f"Refusing to restore damaged backup files: {damaged}")
+    live_dir = os.path.dirname(os.path.abspath(app.DB_PATH))
+    for name in results:
+        copy_database(os.path.join(backup_dir, name), os.path.join(live_dir, name))
+
+    with open(os.path.join(backup_dir, MANIFEST_NAME)) as handle:
+        store_name = json.load(handle)["embedding_store"]
+    store_dir = app.embedding_store_dir()
+    staging_dir = store_dir + ".restore"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    if store_name:
+        shutil.copytree(os.path.join(backup_dir, store_name), staging_dir)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    app._embedding_stores.clear()
+    if store_name:
+        os.replace(staging_dir, store_dir)
+        reconcile_embedding_store()
+    # Without a stored copy, the store is rebuilt from the restored database on first use
+
+
+def reconcile_embedding_store() -> tuple[int, int]:
+    """Add encodings missing from the store and drop reports it no longer has; returns (added, removed)."""
+    stored = set()
+    for shard in app.list_embedding_shards():
+        meta, _matrix = app.get_embedding_store(shard).load()
+        stored.update(int(report_id) for report_id in meta["report_id"])
+    conn = sqlite3.connect(app.DB_PATH)
+    expected = {row[0] for row in conn.execute("SELECT DISTINCT report_id FROM face_embeddings")}
+    conn.close()
+    missing = sorted(expected - stored)
+    shards = app.report_shards(missing)
+    for report_id in missing:
+        app.get_embedding_store(shards[report_id]).append(report_id, app.get_face_encodings(report_id))
+    extra = sorted(stored - expected)
+    if extra:
+        app.remove_from_embedding_store(extra)
+    return len(missing), len(extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up, verify and restore the app's databases while it runs.")
+    parser.add_argument("--root", help="Backup directory (default: backups/ next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backup = commands.add_parser("backup", help="Create a backup")
+    backup.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Number of backups to keep")
+    backup.add_argument("--every", type=float, metavar="HOURS", help="Keep running and back up at this interval")
+    commands.add_parser("list", help="List backups")
+    verify = commands.add_parser("verify", help="Run integrity checks on a backup")
+    verify.add_argument("backup_dir")
+    restore = commands.add_parser("restore", help="Restore a backup over the live databases")
+    restore.add_argument("backup_dir")
+    args = parser.parse_args()
+
+    if args.command == "backup":
+        while True:
+            started = time.perf_counter()
+            target = create_backup(args.root, keep=args.keep)
+            print(f"Backup written to {target} in {time.perf_counter() - started:.1f}s.")
+            if not args.every:
+                break
+            time.sleep(args.every * 3600)
+    elif args.command == "list":
+        for path in list_backups(args.root):
+            print(path)
+    elif args.command == "verify":
+        for name, result in verify_backup(args.backup_dir).items():
+            print(f"{name}: {result}")
+    elif args.command == "restore":
+        restore_backup(args.backup_dir)
+        print(f"Restored {args.backup_dir}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Serialized SQLite writer with group commit.
+
+Streamlit runs every browser session in its own thread, and SQLite allows one
+writer per database file, so concurrent submissions race for the file lock
+and some fail with "database is locked". A ``DatabaseWriter`` owns the only
+writing connection to one file. Callers queue jobs and get a
+``concurrent.futures.Future`` back; the writer thread drains up to
+``max_batch`` queued jobs, runs each inside its own savepoint and commits them
+all at once, then resolves the futures. One failing job is rolled back to its
+savepoint without affecting the rest of the batch.
+
+Transactions are deferred, so a batch locks only the files its jobs write,
+even when other databases are attached for cross-file jobs. If another
+process commits between a job's read and its write, SQLite reports the
+snapshot as busy; the whole batch is then rolled back and applied again,
+up to ``busy_retries`` times.
+
+The queue is bounded: when the writer falls behind, ``submit`` blocks, which
+slows submitters down instead of letting memory grow without limit.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+def _is_busy(error: Exception) -> bool:
+    return isinstance(error, sqlite3.OperationalError) and (
+        getattr(error, "sqlite_errorcode", 0) & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    )
+
+
+class DatabaseWriter:
+    """One writer thread per SQLite file that applies queued jobs in group commits."""
+
+    def __init__(self, path: str, attached: dict[str, str] | None = None, max_queue: int = 1024,
+                 max_batch: int = 64, busy_timeout: float = 30.0, busy_retries: int = 5):
+        self.path = path
+        self.attached = dict(attached or {})
+        self.max_batch = max_batch
+        self.busy_timeout = busy_timeout
+        self.busy_retries = busy_retries
+        self.batches = 0
+        self.jobs = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"db-writer:{path}", daemon=True)
+        self._thread.start()
+
+    # --- Submission ---
+    def submit(self, job, *args, timeout: float | None = None) -> Future:
+        """Queue job(cursor, *args); its return value becomes the future's result once committed."""
+        if self._closed:
+            raise RuntimeError(f"Writer for {self.path} is closed")
+        future = Future()
+        self._queue.put((job, args, future), timeout=timeout)
+        return future
+
+    def execute(self, sql: str, params=(), timeout: float | None = None) -> Future:
+        """Queue one statement; resolves to the cursor's lastrowid."""
+        return self.submit(lambda cursor: cursor.execute(sql, params).lastrowid, timeout=timeout)
+
+    def close(self):
+        """Apply everything already queued, then stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # --- Writer thread ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        for schema, path in self.attached.items():
+            conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(conn, batch)
+        conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list):
+        batch = [(job, args, future) for job, args, future in batch if future.set_running_or_notify_cancel()]
+        attempt = 0
+        while True:
+            try:
+                applied, failed = self._apply_batch(conn, batch)
+                break
+            except Exception as error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if _is_busy(error) and attempt < self.busy_retries:
+                    attempt += 1
+                    time.sleep(0.01 * attempt)
+                    continue
+                for _job, _args, future in batch:
+                    future.set_exception(error)
+                return
+        self.batches += 1
+        self.jobs += len(applied)
+        for future, result in applied:
+            future.set_result(result)
+        for future, error in failed:
+            future.set_exception(error)
+
+    def _apply_batch(self, conn: sqlite3.Connection, batch: list) -> tuple[list, list]:
+        """Run every job in one deferred transaction and commit; busy errors abort the whole batch."""
+        cursor = conn.cursor()
+        applied, failed = [], []
+        cursor.execute("BEGIN")
+        for job, args, future in batch:
+            cursor.execute("SAVEPOINT job")
+            try:
+                result = job(cursor, *args)
+            except Exception as error:
+                if _is_busy(error):
+                    raise
+                cursor.execute("ROLLBACK TO job")
+                cursor.execute("RELEASE job")
+                failed.append((future, error))
+                continue
+            cursor.execute("RELEASE job")
+            applied.append((future, result))
+        cursor.execute("COMMIT")
+        return applied, failed
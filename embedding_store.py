@@ -0,0 +1,292 @@
+"""
+Compact, memory-mapped face embedding store.
+
+Face encodings are kept in a single append-only file that every Streamlit
+worker process maps with ``np.memmap``, so the vectors live once in the OS
+page cache instead of once per process. Each row holds the owning report id,
+the face index and box, and the encoding quantized to int8 with a per-row
+scale (or stored as float16). 1M 128-d faces take about 144 MB in int8 form.
+
+Deleted rows are tombstoned in place (report_id = -1) and dropped by
+``compact()``, which rewrites the file and atomically swaps it in; readers
+notice the new file and remap it on their next access. ``absorb()`` and
+``rebuild()`` swap files in the same way while holding the file lock.
+"""
+import os
+import struct
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+MAGIC = b"MPFEMB01"
+HEADER_FORMAT = "<8sIIIQ"
+HEADER_SIZE = 64
+DTYPE_CODES = {"int8": 1, "float16": 2}
+DELETED = -1
+META_DTYPE = np.dtype([("report_id", "<i4"), ("face_index", "<i2"), ("box", "<u2", (4,))])
+
+
+def _id_array(report_ids) -> np.ndarray:
+    if isinstance(report_ids, np.ndarray):
+        return report_ids.astype(np.int32, copy=False)
+    return np.fromiter(report_ids, dtype=np.int32)
+
+
+def row_dtype(dim: int, dtype: str) -> np.dtype:
+    vector_type = "i1" if dtype == "int8" else "<f2"
+    return np.dtype([
+        ("report_id", "<i4"),
+        ("face_index", "<i2"),
+        ("scale", "<f2"),
+        ("box", "<u2", (4,)),
+        ("vector", vector_type, (dim,)),
+    ])
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped store of quantized face encodings."""
+
+    def __init__(self, path: str, dtype: str = "int8"):
+        if dtype not in DTYPE_CODES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.path = path
+        self.dtype = dtype
+        self.dim = None
+        self._rows = None
+        self._file_id = None
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                self._read_header()
+            except ValueError:
+                pass  # reported again by the first read; rebuild() can still replace the file
+
+    # --- File handling ---
+    def _read_header(self, handle=None):
+        if handle is None:
+            with open(self.path, "rb") as handle:
+                return self._read_header(handle)
+        handle.seek(0)
+        header = handle.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) < struct.calcsize(HEADER_FORMAT) or not header.startswith(MAGIC):
+            raise ValueError(f"{self.path} is not an embedding store")
+        _magic, _version, dim, dtype_code, count = struct.unpack(HEADER_FORMAT, header)
+        if dtype_code not in DTYPE_CODES.values():
+            raise ValueError(f"{self.path} has an unknown encoding type")
+        self.dim = dim
+        self.dtype = {code: name for name, code in DTYPE_CODES.items()}[dtype_code]
+        return count
+
+    def _write_header(self, handle, count: int):
+        handle.seek(0)
+        handle.write(struct.pack(HEADER_FORMAT, MAGIC, 1, self.dim, DTYPE_CODES[self.dtype], count).ljust(HEADER_SIZE, b"\0"))
+
+    def _open_locked(self):
+        """Open the store for writing under an exclusive lock, retrying if compaction swapped the file."""
+        while True:
+            handle = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.fstat(handle.fileno()).st_ino == os.stat(self.path).st_ino:
+                return handle
+            handle.close()
+
+    def _close_locked(self, handle):
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        handle.close()
+
+    def rows(self) -> np.ndarray:
+        """Current rows as a read-only memmap, remapped when another process appended or compacted."""
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=row_dtype(self.dim or 0, self.dtype))
+        stat = os.stat(self.path)
+        file_id = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if self._rows is None or file_id != self._file_id:
+            count = self._read_header()
+            dtype = row_dtype(self.dim, self.dtype)
+            count = min(count, (stat.st_size - HEADER_SIZE) // dtype.itemsize)
+            self._rows = (
+                np.memmap(self.path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+                if count else np.empty(0, dtype=dtype)
+            )
+            self._file_id = file_id
+        return self._rows
+
+    # --- Writes ---
+    def _encode_rows(self, report_id: int, faces: list[dict]) -> np.ndarray:
+        rows = np.zeros(len(faces), dtype=row_dtype(self.dim, self.dtype))
+        vectors = np.vstack([np.asarray(face["encoding"], dtype=np.float32) for face in faces])
+        rows["report_id"] = report_id
+        rows["face_index"] = [face["face_index"] for face in faces]
+        rows["box"] = [np.clip(face["box"], 0, 65535) for face in faces]
+        if self.dtype == "int8":
+            scales = np.max(np.abs(vectors), axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            rows["scale"] = scales
+            rows["vector"] = np.round(vectors / rows["scale"].astype(np.float32)[:, None]).astype(np.int8)
+        else:
+            rows["scale"] = 1.0
+            rows["vector"] = vectors.astype(np.float16)
+        return rows
+
+    def append(self, report_id: int, faces: list[dict]):
+        """Append one report's faces; existing rows are never rewritten."""
+        if not faces:
+            return
+        dim = len(faces[0]["encoding"])
+        self._append_rows(dim, lambda: self._encode_rows(report_id, faces))
+
+    def _append_rows(self, dim: int, make_rows):
+        with self._lock:
+            handle = self._open_locked()
+            try:
+                handle.seek(0, os.SEEK_END)
+                if handle.tell() < HEADER_SIZE:
+                    self.dim = dim
+                    self._write_header(handle, 0)
+                count = self._read_header(handle)
+                if dim != self.dim:
+                    raise ValueError(f"Expected {self.dim}-d encodings, got {dim}-d")
+                rows = make_rows()
+                handle.seek(HEADER_SIZE + count * rows.dtype.itemsize)
+                handle.write(rows.tobytes())
+                handle.truncate()
+                self._write_header(handle, count + len(rows))
+            finally:
+                self._close_locked(handle)
+
+    def absorb(self, other: "EmbeddingStore") -> int:
+        """Move the live rows of another store of the same dtype into this one and delete its file.
+
+        Both files stay locked from the read to the removal, so appends to `other` wait and then
+        land in a fresh file instead of being lost. Rows this store already holds for the absorbed
+        reports are replaced, so repeating an interrupted move does not duplicate them.
+        """
+        with self._lock:
+            handle = self._open_locked()
+            other_handle = other._open_locked()
+            try:
+                if os.fstat(other_handle.fileno()).st_size < HEADER_SIZE:
+                    os.remove(other.path)
+                    return 0
+                other._read_header(other_handle)
+                rows = other.rows()
+                live = np.asarray(rows[rows["report_id"] != DELETED])
+                if other.dtype != self.dtype:
+                    raise ValueError(f"Cannot merge a {other.dtype} store into a {self.dtype} store")
+                if len(live):
+                    if os.fstat(handle.fileno()).st_size < HEADER_SIZE:
+                        self.dim = other.dim
+                        kept = live[:0]
+                    else:
+                        self._read_header(handle)
+                        if other.dim != self.dim:
+                            raise ValueError(f"Expected {self.dim}-d encodings, got {other.dim}-d")
+                        current = self.rows()
+                        kept = np.asarray(current[
+                            (current["report_id"] != DELETED) & ~np.isin(current["report_id"], live["report_id"])
+                        ])
+                        del current
+                    self._swap_in(np.concatenate([kept, live]))
+                other._rows = None
+                del rows
+                os.remove(other.path)
+                return len(live)
+            finally:
+                other._close_locked(other_handle)
+                self._close_locked(handle)
+
+    def delete_reports(self, report_ids) -> int:
+        """Tombstone every row of the given reports in place."""
+        if not os.path.exists(self.path):
+            return 0
+        with self._lock:
+            handle = self._open_locked()
+            try:
+                count = self._read_header(handle)
+                if not count:
+                    return 0
+                dtype = row_dtype(self.dim, self.dtype)
+                rows = np.memmap(handle, dtype=dtype, mode="r+", offset=HEADER_SIZE, shape=(count,))
+                mask = np.isin(rows["report_id"], _id_array(report_ids))
+                removed = int(mask.sum())
+                if removed:
+                    rows["report_id"][mask] = DELETED
+                    rows.flush()
+                del rows
+                return removed
+            finally:
+                self._close_locked(handle)
+
+    def deleted_fraction(self) -> float:
+        rows = self.rows()
+        return float(np.mean(rows["report_id"] == DELETED)) if len(rows) else 0.0
+
+    def _swap_in(self, rows: np.ndarray):
+        """Write `rows` to a temporary file and rename it over the store; the caller holds the file lock."""
+        temp_path = f"{self.path}.compact"
+        with open(temp_path, "wb") as output:
+            self._write_header(output, len(rows))
+            output.seek(HEADER_SIZE)
+            output.write(rows.tobytes())
+        self._rows = None
+        os.replace(temp_path, self.path)
+
+    def compact(self) -> int:
+        """Rewrite the file without tombstoned rows and swap it in atomically."""
+        if not os.path.exists(self.path):
+            return 0
+        with self._lock:
+            handle = self._open_locked()
+            try:
+                rows = self.rows()
+                live = np.asarray(rows[rows["report_id"] != DELETED])
+                removed = len(rows) - len(live)
+                if not removed:
+                    return 0
+                del rows
+                self._swap_in(live)
+            finally:
+                self._close_locked(handle)
+            return removed
+
+    def rebuild(self, reports: list[tuple[int, list[dict]]]):
+        """Replace the store with the given (report_id, faces) pairs in one atomic swap under the file lock."""
+        reports = [(report_id, faces) for report_id, faces in reports if faces]
+        with self._lock:
+            handle = self._open_locked()
+            try:
+                if not reports:
+                    self._rows = None
+                    os.remove(self.path)
+                    return
+                self.dim = len(reports[0][1][0]["encoding"])
+                self._swap_in(np.concatenate([self._encode_rows(report_id, faces) for report_id, faces in reports]))
+            finally:
+                self._close_locked(handle)
+
+    # --- Reads ---
+    def load(self, report_ids=None):
+        """Face metadata (report_id, face_index, box records) and a float32 matrix for live rows.
+
+        Optionally limited to some reports; metadata stays a NumPy record array so that
+        selecting candidates never builds per-row Python objects.
+        """
+        rows = self.rows()
+        mask = rows["report_id"] != DELETED
+        if report_ids is not None:
+            mask &= np.isin(rows["report_id"], _id_array(report_ids))
+        selected = rows[mask]
+        matrix = selected["vector"].astype(np.float32)
+        if self.dtype == "int8" and len(selected):
+            matrix *= selected["scale"].astype(np.float32)[:, None]
+        meta = np.empty(len(selected), dtype=META_DTYPE)
+        for field in ("report_id", "face_index", "box"):
+            meta[field] = selected[field]
+        return meta, matrix.reshape(len(selected), self.dim or 0)
@@ -0,0 +1,169 @@
+"""
+Streaming CSV / Parquet export of reports and match results.
+
+Rows are read in chunks of ``--chunk-size``, each one a short query that
+continues after the last id of the previous chunk, and written out chunk by
+chunk. Memory use stays flat however many rows are exported, and no read
+transaction stays open while a slow client consumes the export. Photos are never loaded unless ``--images DIR`` is given; then
+each report's photo is written to its own file and the export carries the
+path instead of the bytes.
+
+Usage:
+    python export_data.py reports reports.csv --images exported_images/
+    python export_data.py matches matches.parquet
+    python export_data.py reports all_reports.parquet --include-archive
+"""
+import argparse
+import csv
+import io
+import os
+
+import app
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional; CSV needs only the standard library
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 1000
+DATASETS = {
+    "reports": "missing_persons",
+    "matches": "match_results",
+}
+IMAGE_EXTENSIONS = ((b"\x89PNG", ".png"), (b"\xff\xd8", ".jpg"), (b"GIF8", ".gif"))
+
+
+def export_columns(conn, table: str) -> list[tuple[str, str]]:
+    """(name, declared type) of a table's columns, without the image BLOB."""
+    return [
+        (info[1], (info[2] or "").upper())
+        for info in conn.execute(f"PRAGMA {app.table_schema(table)}.table_info({table})").fetchall()
+        if info[1] != "image"
+    ]
+
+
+def image_extension(image_bytes: bytes) -> str:
+    return next((extension for magic, extension in IMAGE_EXTENSIONS if image_bytes.startswith(magic)), ".bin")
+
+
+def iter_chunks(dataset: str, chunk_size: int = EXPORT_CHUNK_SIZE, image_dir: str | None = None,
+                include_archive: bool = False):
+    """Yield (column names, rows) chunks of a dataset, optionally spilling photos to image_dir."""
+    table = DATASETS[dataset]
+    with_images = image_dir is not None and dataset == "reports"
+    # Streaming responses resume generators on whichever worker thread is free; the connection is
+    # only ever used by one thread at a time, so SQLite's same-thread check can be lifted
+    conn = app.connect_with_archive(False) if include_archive else app.connect_db(False)
+    try:
+        names = [name for name, _declared in export_columns(conn, table)]
+        selected = names + ["image"] if with_images else names
+        id_index = names.index("id")
+        sources = [f"{app.table_schema(table)}.{table}"] + ([f"archive.{table}"] if include_archive else [])
+        if with_images:
+            os.makedirs(image_dir, exist_ok=True)
+            names = names + ["image_path"]
+        for source in sources:
+            last_id = -1
+            while True:
+                # Each chunk is its own rowid range scan, so no lock or snapshot is held between chunks
+                rows = conn.execute(
+                    f"SELECT {', '.join(selected)} FROM {source} WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][id_index]
+                if with_images:
+                    rows = [row[:-1] + (_write_image(image_dir, row[id_index], row[-1]),) for row in rows]
+                yield names, rows
+    finally:
+        conn.close()
+
+
+def _write_image(image_dir: str, report_id: int, image_bytes: bytes | None) -> str | None:
+    if not image_bytes:
+        return None
+    path = os.path.join(image_dir, f"{report_id}{image_extension(image_bytes)}")
+    with open(path, "wb") as handle:
+        handle.write(image_bytes)
+    return path
+
+
+def iter_csv(dataset: str, chunk_size: int = EXPORT_CHUNK_SIZE, image_dir: str | None = None,
+             include_archive: bool = False):
+    """CSV text of a dataset, one string per chunk with the header first, for files and HTTP streaming alike."""
+    first = True
+    for names, rows in iter_chunks(dataset, chunk_size, image_dir, include_archive):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if first:
+            writer.writerow(names)
+            first = False
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def _arrow_schema(conn, dataset: str, with_images: bool):
+    def arrow_type(declared: str):
+        if "INT" in declared:
+            return pa.int64()
+        if any(token in declared for token in ("REAL", "FLOA", "DOUB")):
+            return pa.float64()
+        return pa.string()
+
+    fields = [pa.field(name, arrow_type(declared)) for name, declared in export_columns(conn, DATASETS[dataset])]
+    if with_images:
+        fields.append(pa.field("image_path", pa.string()))
+    return pa.schema(fields)
+
+
+def export_dataset(dataset: str, output_path: str, fmt: str | None = None, image_dir: str | None = None,
+                   chunk_size: int = EXPORT_CHUNK_SIZE, include_archive: bool = False) -> int:
+    """Write a dataset to CSV or Parquet incrementally; returns the number of rows written."""
+    fmt = fmt or ("parquet" if output_path.endswith(".parquet") else "csv")
+    rows_written = 0
+    if fmt == "csv":
+        with open(output_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            for names, rows in iter_chunks(dataset, chunk_size, image_dir, include_archive):
+                if not rows_written:
+                    writer.writerow(names)
+                writer.writerows(rows)
+                rows_written += len(rows)
+        return rows_written
+
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    conn = app.connect_db()
+    schema = _arrow_schema(conn, dataset, image_dir is not None and dataset == "reports")
+    conn.close()
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for _names, rows in iter_chunks(dataset, chunk_size, image_dir, include_archive):
+            columns = list(zip(*rows))
+            arrays = [
+                pa.array([None if value is None else str(value) for value in column], type=field.type)
+                if pa.types.is_string(field.type) else pa.array(column, type=field.type)
+                for field, column in zip(schema, columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reports or match results to CSV or Parquet.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("output", help="Output file; a .parquet suffix selects Parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Override the format implied by the suffix")
+    parser.add_argument("--images", metavar="DIR", help="Write report photos to DIR and export their paths")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched and written per chunk")
+    parser.add_argument("--include-archive", action="store_true", help="Also export archived cases")
+    args = parser.parse_args()
+
+    app.init_db()
+    count = export_dataset(args.dataset, args.output, args.format, args.images, args.chunk_size, args.include_archive)
+    print(f"Exported {count} {args.dataset} row(s) to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Reporter SMS/email delivery for the Missing Person Finder.
+
+Form handlers and the matching pipeline only insert rows into the ``outbox``
+table (``app.queue_reporter_messages``), so contacting a reporter never adds
+provider latency to a submission or an admin action. This worker claims due
+rows in batches per channel, hands each batch to that channel's transport
+and records the outcome: failures are retried with exponential backoff and,
+after ``MAX_ATTEMPTS``, marked failed with an admin alert. A token bucket per
+channel keeps the send rate within the provider's limits.
+
+Claiming a row pushes its ``next_attempt_at`` forward by ``LEASE_SECONDS``, so
+rows held by a worker that died are picked up again once the lease expires.
+
+Transports are objects with ``async send_batch(messages) -> list[str | None]``
+returning one error (or None) per message. ``SmtpTransport`` and
+``HttpSmsTransport`` are configured from the ``[smtp]`` and ``[sms]`` sections
+of config.ini; ``FakeTransport`` records messages for tests and dry runs.
+
+Usage:
+    python outbox.py            # deliver continuously
+    python outbox.py --once     # deliver everything due, then exit
+"""
+import argparse
+import asyncio
+import configparser
+import smtplib
+from email.message import EmailMessage
+
+import requests
+
+import app
+from rate_limit import TokenBucket
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+LEASE_SECONDS = 300
+POLL_INTERVAL_SECONDS = 5.0
+
+
+def backoff_seconds(attempts: int) -> int:
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+# --- Transports ---
+class FakeTransport:
+    """Records messages instead of sending them; with fail_with, every send fails with that error."""
+
+    def __init__(self, fail_with: str | None = None):
+        self.sent = []
+        self.fail_with = fail_with
+
+    async def send_batch(self, messages: list[dict]) -> list[str | None]:
+        if self.fail_with:
+            return [self.fail_with] * len(messages)
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+
+class SmtpTransport:
+    """Sends a batch of emails over one SMTP session."""
+
+    def __init__(self, host: str, port: int = 587, username: str | None = None, password: str | None = None,
+                 sender: str = "alerts@localhost", use_tls: bool = True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.use_tls = use_tls
+
+    async def send_batch(self, messages: list[dict]) -> list[str | None]:
+        return await asyncio.to_thread(self._send_all, messages)
+
+    def _send_all(self, messages: list[dict]) -> list[str | None]:
+        errors = []
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = self.sender
+                email["To"] = message["recipient"]
+                email["Subject"] = message["subject"] or "Missing Person Finder"
+                email.set_content(message["body"])
+                try:
+                    smtp.send_message(email)
+                    errors.append(None)
+                except smtplib.SMTPException as error:
+                    errors.append(str(error))
+        return errors
+
+
+class HttpSmsTransport:
+    """Posts a batch of SMS to an HTTP gateway as {"messages": [{"to": ..., "body": ...}]}."""
+
+    def __init__(self, url: str, token: str | None = None, timeout: float = 30.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    async def send_batch(self, messages: list[dict]) -> list[str | None]:
+        return await asyncio.to_thread(self._post, messages)
+
+    def _post(self, messages: list[dict]) -> list[str | None]:
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        payload = {"messages": [{"to": message["recipient"], "body": message["body"]} for message in messages]}
+        response = requests.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        if response.ok:
+            return [None] * len(messages)
+        return [f"HTTP {response.status_code}: {response.text[:200]}"] * len(messages)
+
+
+def transports_from_config(path: str = "config.ini") -> tuple[dict, dict]:
+    """Transports and rate limits for the channels configured in config.ini."""
+    config = configparser.ConfigParser()
+    config.read(path)
+    transports, buckets = {}, {}
+    if config.has_option("smtp", "host"):
+        smtp = config["smtp"]
+        transports["email"] = SmtpTransport(
+            smtp["host"], smtp.getint("port", 587), smtp.get("username"), smtp.get("password"),
+            smtp.get("sender", "alerts@localhost"), smtp.getboolean("use_tls", True)
+        )
+        buckets["email"] = TokenBucket(smtp.getfloat("rate", 5.0))
+    if config.has_option("sms", "url"):
+        sms = config["sms"]
+        transports["sms"] = HttpSmsTransport(sms["url"], sms.get("token"))
+        buckets["sms"] = TokenBucket(sms.getfloat("rate", 1.0))
+    return transports, buckets
+
+
+# --- Outbox bookkeeping (runs on the events database writer) ---
+def _claim_job(c, channel: str, limit: int) -> list[dict]:
+    rows = c.execute(
+        """
+        UPDATE outbox SET attempts = attempts + 1, next_attempt_at = datetime('now', ?)
+        WHERE id IN (
+            SELECT id FROM outbox
+            WHERE status = 'pending' AND channel = ? AND next_attempt_at <= datetime('now')
+            ORDER BY id LIMIT ?
+        )
+        RETURNING id, channel, recipient, subject, body, report_id, attempts
+        """,
+        (f"+{LEASE_SECONDS} seconds", channel, limit)
+    ).fetchall()
+    keys = ("id", "channel", "recipient", "subject", "body", "report_id", "attempts")
+    return sorted((dict(zip(keys, row)) for row in rows), key=lambda message: message["id"])
+
+
+def _record_job(c, outcomes: list[tuple[dict, str | None]]) -> dict:
+    counts = {"sent": 0, "retrying": 0, "failed": 0}
+    for message, error in outcomes:
+        if error is None:
+            c.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                (message["id"],)
+            )
+            counts["sent"] += 1
+        elif message["attempts"] >= MAX_ATTEMPTS:
+            c.execute("UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, message["id"]))
+            app.insert_notification(
+                c, "Reporter message failed",
+                f"Could not send {message['channel']} to {message['recipient']} for report #{message['report_id']}: {error}",
+                "warning", {"outbox_id": message["id"], "report_id": message["report_id"]}
+            )
+            counts["failed"] += 1
+        else:
+            c.execute(
+                "UPDATE outbox SET last_error = ?, next_attempt_at = datetime('now', ?) WHERE id = ?",
+                (error, f"+{backoff_seconds(message['attempts'])} seconds", message["id"])
+            )
+            counts["retrying"] += 1
+    return counts
+
+
+async def deliver_pending(transports: dict, buckets: dict | None = None, batch_size: int = BATCH_SIZE) -> dict:
+    """Send every due message once for the channels that have a transport; returns outcome counts."""
+    buckets = buckets or {}
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    for channel, transport in transports.items():
+        while True:
+            messages = await asyncio.wrap_future(app.submit_write(_claim_job, channel, batch_size, schema='events'))
+            if not messages:
+                break
+            if channel in buckets:
+                for _message in messages:
+                    await buckets[channel].acquire()
+            try:
+                errors = await transport.send_batch(messages)
+            except Exception as error:
+                errors = [f"{type(error).__name__}: {error}"] * len(messages)
+            counts = await asyncio.wrap_future(
+                app.submit_write(_record_job, list(zip(messages, errors)), schema='events')
+            )
+            for key, value in counts.items():
+                totals[key] += value
+    return totals
+
+
+async def run_worker(transports: dict, buckets: dict | None = None, poll_interval: float = POLL_INTERVAL_SECONDS,
+                     stop: asyncio.Event | None = None):
+    """Deliver due messages until stop is set, sleeping poll_interval whenever the outbox is idle."""
+    stop = stop or asyncio.Event()
+    while not stop.is_set():
+        totals = await deliver_pending(transports, buckets)
+        if not any(totals.values()):
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued reporter SMS and email notifications.")
+    parser.add_argument("--once", action="store_true", help="Deliver everything currently due, then exit")
+    parser.add_argument("--config", default="config.ini", help="Path to the config file with [smtp]/[sms] sections")
+    args = parser.parse_args()
+
+    app.init_db()
+    transports, buckets = transports_from_config(args.config)
+    if not transports:
+        parser.error("No transports configured; add an [smtp] or [sms] section to the config file.")
+    if args.once:
+        print(asyncio.run(deliver_pending(transports, buckets)))
+    else:
+        asyncio.run(run_worker(transports, buckets))
+
+
+if __name__ == '__main__':
+    main()
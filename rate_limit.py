@@ -0,0 +1,39 @@
+"""
+Token bucket rate limiting shared by the app and the outbox worker.
+
+A bucket refills at ``rate`` tokens per second up to ``capacity`` and each
+action takes one token. ``try_acquire`` answers immediately, for limits that
+turn requests away (tracking lookups per Streamlit session), while
+``acquire`` waits until a token is available, for limits that only pace work
+(reporter messages per delivery channel).
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Allows `rate` actions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available; never waits."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep((1 - self.tokens) / self.rate)
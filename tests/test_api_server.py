@@ -0,0 +1,127 @@
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import app
+
+pytest.importorskip("httpx")
+from starlette.testclient import TestClient
+
+import api_server
+
+API_KEY = "test-key"
+ADMIN_KEY = "admin-key"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "api_missing_persons.db"))
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(app.face_recognition, "face_encodings", lambda _image, known_face_locations=None: [np.array([0.1, 0.2, 0.3])])
+    monkeypatch.setattr(app.face_recognition, "face_landmarks", lambda _image, face_locations=None, model="large": [{}])
+    monkeypatch.setattr(app, "score_face_quality", lambda _img, _box, landmarks=None: {"score": 1.0, "usable": True})
+    api = api_server.create_app(executor=ThreadPoolExecutor(max_workers=2), api_keys={API_KEY}, admin_keys={ADMIN_KEY})
+    with TestClient(api, headers={"X-API-Key": API_KEY}) as test_client:
+        yield test_client
+
+
+def _image_base64(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (5, 5), color=color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_batch_reports_and_sighting_are_ingested_and_matched(client):
+    response = client.post("/reports/batch", json={"reports": [
+        {"name": "Asha Rao", "last_seen_location": "Ward 5 Market", "reporter_phone": "9876543210",
+         "image_base64": _image_base64((10, 20, 30))},
+        {"name": "No Photo", "last_seen_location": "Ward 5 Market"},
+    ]})
+    assert response.status_code == 207
+    stored, rejected = response.json()["results"]
+    assert stored["tracking_code"] and stored["report_id"]
+    assert "image_base64" in rejected["error"]
+
+    response = client.post("/sightings", json={
+        "reporter_phone": "9123456780", "last_seen_location": "Ward 5 Market", "image_base64": _image_base64((40, 50, 60)),
+    })
+    assert response.status_code == 201
+    sighting = response.json()
+    assert [match["id"] for match in sighting["matches"]] == [stored["report_id"]]
+    assert app.fetch_person_summary(sighting["report_id"])["source"] == api_server.API_SOURCE
+
+    response = client.post(f"/reports/{sighting['report_id']}/match")
+    assert response.status_code == 200
+    assert response.json()["matches"] == [], "Both reports are already under review"
+    assert client.post("/reports/999999/match").status_code == 404
+
+
+def test_invalid_coordinates_are_rejected_per_item(client):
+    image = _image_base64((10, 20, 30))
+    response = client.post("/reports/batch", json={"reports": [
+        {"name": "Valid", "last_seen_location": "Pier", "image_base64": image,
+         "location_lat": 12.97, "location_lng": 77.59, "location_accuracy": 15},
+        {"name": "Text Lat", "last_seen_location": "Pier", "image_base64": image, "location_lat": "north"},
+        {"name": "Far Lng", "last_seen_location": "Pier", "image_base64": image, "location_lng": 181.0},
+        {"name": "Negative Accuracy", "last_seen_location": "Pier", "image_base64": image, "location_accuracy": -1},
+    ]})
+    assert response.status_code == 207
+    stored, *rejected = response.json()["results"]
+    assert stored["report_id"]
+    assert [result["error"] for result in rejected] == [
+        "location_lat must be a number",
+        "location_lng must be between -180 and 180",
+        "location_accuracy must be at least 0",
+    ]
+    response = client.post("/sightings", json={
+        "reporter_phone": "9123456780", "last_seen_location": "Pier", "image_base64": image, "location_lat": 91,
+    })
+    assert response.status_code == 400
+
+
+def test_unreadable_images_and_worker_failures_fail_only_their_item(client, monkeypatch):
+    submit_report = app.submit_report
+
+    def failing_submit(fields, image_bytes, **kwargs):
+        if fields["name"] == "Crashes":
+            raise RuntimeError("disk full")
+        return submit_report(fields, image_bytes, **kwargs)
+
+    monkeypatch.setattr(app, "submit_report", failing_submit)
+    response = client.post("/reports/batch", json={"reports": [
+        {"name": "Good", "last_seen_location": "Pier", "image_base64": _image_base64((10, 20, 30))},
+        {"name": "Not An Image", "last_seen_location": "Pier", "image_base64": base64.b64encode(b"plain text").decode()},
+        {"name": "Crashes", "last_seen_location": "Pier", "image_base64": _image_base64((40, 50, 60))},
+    ]})
+    assert response.status_code == 207
+    stored, not_image, crashed = response.json()["results"]
+    assert stored["report_id"] and stored["tracking_code"]
+    assert not_image == {"error": "image_base64 is not a readable image"}
+    assert "disk full" in crashed["error"]
+
+
+def test_requests_without_a_valid_key_are_rejected(client):
+    response = client.post("/reports", json={}, headers={"X-API-Key": "wrong"})
+    assert response.status_code == 401
+    assert client.get("/health").json() == {"status": "ok"}
+
+
+def test_export_endpoint_streams_csv_without_photos(client, monkeypatch):
+    for color in ((40, 50, 60), (70, 80, 90), (100, 110, 120)):
+        client.post("/sightings", json={
+            "reporter_phone": "9123456780", "last_seen_location": "Ward 5 Market", "image_base64": _image_base64(color),
+        })
+    assert client.get("/export/reports.csv").status_code == 403, "Ingestion keys cannot read reporter contacts"
+
+    monkeypatch.setattr(api_server.export_data, "EXPORT_CHUNK_SIZE", 2)
+    response = client.get("/export/reports.csv", headers={"X-API-Key": ADMIN_KEY})
+    assert response.status_code == 200
+    header, *rows = response.text.strip().splitlines()
+    assert header.startswith("id,") and "image" not in header.split(",")
+    assert len(rows) == 3, "Chunks resumed on other threads keep streaming"
+    assert all("Ward 5 Market" in row for row in rows)
+    assert client.get("/export/secrets.csv", headers={"X-API-Key": ADMIN_KEY}).status_code == 404
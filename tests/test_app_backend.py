@@ -1,6 +1,8 @@
 import datetime
 import io
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pytest
@@ -50,6 +52,34 @@ def _insert_person(**overrides):
     return person_id
 
 
+def _insert_sighting(**overrides):
+    return _insert_person(**{"status": "Sighting Reported", "report_source": "Sighting", **overrides})
+
+
+def _accept_all_faces(monkeypatch):
+    """Bypass the face quality gate for tests that use tiny synthetic images."""
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_landmarks",
+        lambda _image, face_locations=None, model="large": [{} for _ in face_locations],
+    )
+    monkeypatch.setattr(
+        app, "score_face_quality", lambda _img, _box, landmarks=None: {"score": 1.0, "usable": True}
+    )
+
+
+def _frontal_landmarks(_image, face_locations=None, model="large"):
+    landmarks = []
+    for top, right, bottom, left in face_locations:
+        center_x, center_y = (left + right) // 2, (top + bottom) // 2
+        landmarks.append({
+            "nose_tip": [(center_x, center_y)],
+            "left_eye": [(center_x - 30, center_y - 20), (center_x - 20, center_y - 20)],
+            "right_eye": [(center_x + 30, center_y - 20), (center_x + 20, center_y - 20)],
+        })
+    return landmarks
+
+
 @pytest.fixture(autouse=True)
 def fresh_database(tmp_path, monkeypatch):
     """Point the app at a temporary DB for each test."""
@@ -75,17 +105,78 @@ def test_init_db_creates_expected_schema(fresh_database):
     ):
         assert column in missing_columns
 
+    conn.close()
+
+    conn = app.connect_db()
+    cur = conn.cursor()
     cur.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='notifications'"
+        "SELECT name FROM events.sqlite_master WHERE type='table' AND name='notifications'"
     )
     assert cur.fetchone() is not None
     cur.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='match_results'"
+        "SELECT name FROM matches.sqlite_master WHERE type='table' AND name='match_results'"
     )
     assert cur.fetchone() is not None
+    cur.execute("SELECT name FROM main.sqlite_master WHERE name IN ('notifications', 'match_results')")
+    assert cur.fetchall() == [], "Write-heavy tables live in their own database files"
+    conn.close()
+
+
+def test_alerts_and_matches_do_not_wait_for_the_report_writer(fresh_database):
+    first_id = _insert_person(name="First")
+    second_id = _insert_sighting(name="Second")
+    writer = sqlite3.connect(app.DB_PATH, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("UPDATE missing_persons SET description = 'editing' WHERE id = ?", (first_id,))
+    try:
+        app.create_notification("During write", "main database is locked")
+        assert app.record_match_result(second_id, first_id, 80.0, "facial", {})
+    finally:
+        writer.rollback()
+        writer.close()
+    assert [(match["source_report_id"], match["candidate_report_id"]) for match in app.get_match_results()] == [(second_id, first_id)]
+
+
+def test_submission_writes_from_many_sessions_share_the_writer_queue(fresh_database):
+    report_ids = [_insert_sighting(name=f"Sighting {index}") for index in range(24)]
+    writer = app.get_db_writer()
+    jobs_before = writer.jobs
+
+    def index_upload(report_id):
+        image = _make_image_bytes(color=(report_id % 255, 0, 0))
+        app.store_image_hashes(report_id, app.compute_image_hashes(image))
+        app.store_face_encodings(report_id, [
+            {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.1, 0.2, 0.3]), "quality": 0.9}
+        ])
+        return app.assign_sighting_cluster(report_id, np.array([0.1, 0.2, 0.3]))[0]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        cluster_ids = set(pool.map(index_upload, report_ids))
+
+    assert len(cluster_ids) == 1, "Cluster assignment is serialized, so every sighting joins the first cluster"
+    assert writer.jobs - jobs_before == 3 * len(report_ids)
+    conn = sqlite3.connect(app.DB_PATH)
+    assert conn.execute("SELECT member_count FROM sighting_clusters").fetchall() == [(len(report_ids),)]
     conn.close()
 
 
+def test_init_db_moves_legacy_tables_into_split_databases(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "legacy.db"))
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("CREATE TABLE notifications (id INTEGER PRIMARY KEY, title TEXT, message TEXT, level TEXT, payload TEXT, is_read INTEGER, created_at DATETIME)")
+    conn.execute("INSERT INTO notifications (title, message, is_read) VALUES ('Old', 'kept', 0)")
+    conn.execute("CREATE TABLE match_results (id INTEGER PRIMARY KEY, source_report_id INTEGER, candidate_report_id INTEGER, similarity REAL, match_type TEXT, details TEXT, status TEXT, created_at DATETIME)")
+    conn.execute("INSERT INTO match_results (source_report_id, candidate_report_id, match_type, status) VALUES (1, 2, 'facial', 'Escalated')")
+    conn.commit()
+    conn.close()
+
+    app.init_db()
+
+    assert [note["title"] for note in app.get_notifications()] == ["Old"]
+    assert [(match["source_report_id"], match["candidate_report_id"]) for match in app.get_match_results()] == [(1, 2)]
+    assert app.get_case_report_ids(1) == [1, 2]
+
+
 def test_notification_lifecycle(fresh_database):
     app.create_notification("Test Alert", "Payload incoming", level="warning")
     unread = app.get_notifications(include_read=False)
@@ -100,21 +191,18 @@ def test_notification_lifecycle(fresh_database):
 def test_run_matching_pipeline_records_matches(monkeypatch, fresh_database):
     """Simulate a facial-recognition hit plus contextual similarity backup."""
 
-    def fake_face_encodings(_image_array):
-        return [np.array([0.1, 0.2, 0.3])]
-
-    def fake_compare_faces(_known, _candidate, tolerance=0.6):
-        return [True]
+    def fake_face_locations(_image_array):
+        return [(0, 4, 4, 0)]
 
-    def fake_face_distance(_known, _candidate):
-        return [0.2]
+    def fake_face_encodings(_image_array, known_face_locations=None):
+        return [np.array([0.1, 0.2, 0.3])]
 
+    monkeypatch.setattr(app.face_recognition, "face_locations", fake_face_locations)
     monkeypatch.setattr(app.face_recognition, "face_encodings", fake_face_encodings)
-    monkeypatch.setattr(app.face_recognition, "compare_faces", fake_compare_faces)
-    monkeypatch.setattr(app.face_recognition, "face_distance", fake_face_distance)
+    _accept_all_faces(monkeypatch)
 
     candidate_id = _insert_person(name="Jane Doe", last_seen_location="City Library")
-    source_id = _insert_person(
+    source_id = _insert_sighting(
         name="Unknown Person",
         last_seen_location="City Library",
         image=_make_image_bytes(color=(0, 255, 0)),
@@ -157,3 +245,776 @@ def test_notify_new_submission_creates_admin_alert(fresh_database):
     assert note["title"] == "New report received"
     assert "TRACK1234" in note["message"]
 
+
+
+def test_run_matching_pipeline_matches_every_face_in_group_photo(monkeypatch, fresh_database):
+    """A crowd photo with two faces should surface both missing persons."""
+    face_vectors = {
+        (0, 0, 255): [np.array([0.9, 0.0, 0.0])],
+        (255, 255, 0): [np.array([0.0, 0.9, 0.0])],
+        (0, 255, 0): [np.array([0.0, 0.9, 0.05]), np.array([0.9, 0.0, 0.05])],
+    }
+
+    def fake_face_locations(image_array):
+        faces = face_vectors[tuple(int(v) for v in image_array[0, 0])]
+        return [(index, 4, 4, 0) for index in range(len(faces))]
+
+    def fake_face_encodings(image_array, known_face_locations=None):
+        return face_vectors[tuple(int(v) for v in image_array[0, 0])]
+
+    monkeypatch.setattr(app.face_recognition, "face_locations", fake_face_locations)
+    monkeypatch.setattr(app.face_recognition, "face_encodings", fake_face_encodings)
+    _accept_all_faces(monkeypatch)
+
+    first_id = _insert_person(name="Asha", image=_make_image_bytes(color=(0, 0, 255)))
+    second_id = _insert_person(name="Ravi", image=_make_image_bytes(color=(255, 255, 0)))
+    crowd_image = _make_image_bytes(color=(0, 255, 0))
+    source_id = _insert_sighting(name="Crowd Sighting", image=crowd_image, last_seen_location="Railway Station")
+
+    matches = app.run_matching_pipeline(source_id, crowd_image, "Crowd Sighting", "Railway Station", "N/A")
+
+    facial = {match["id"]: match for match in matches if match["method"] == "Facial"}
+    assert set(facial) == {first_id, second_id}
+    assert facial[first_id]["face_box"] == [1, 4, 4, 0]
+    assert facial[second_id]["face_box"] == [0, 4, 4, 0]
+
+    stored = {
+        match["candidate_report_id"]: match
+        for match in app.get_match_results()
+        if match["match_type"] == "facial"
+    }
+    assert stored[first_id]["details"]["source_face_index"] == 1
+    assert stored[second_id]["details"]["source_face_box"] == [0, 4, 4, 0]
+
+
+def test_score_face_quality_rejects_blur_and_profile():
+    checkerboard = np.kron((np.indices((20, 20)).sum(axis=0) % 2) * 255, np.ones((10, 10)))
+    sharp = np.repeat(checkerboard[:, :, None], 3, axis=2).astype(np.uint8)
+    blurry = np.full((200, 200, 3), 128, dtype=np.uint8)
+    box = (20, 180, 180, 20)
+    frontal = _frontal_landmarks(sharp, [box])[0]
+    profile = dict(frontal, nose_tip=[(150, 100)])
+
+    assert app.score_face_quality(sharp, box, frontal)["usable"]
+    assert not app.score_face_quality(blurry, box, frontal)["usable"]
+    assert not app.score_face_quality(sharp, box, profile)["usable"]
+    assert not app.score_face_quality(sharp, (0, 20, 20, 0), frontal)["usable"]
+
+
+def test_quality_gate_skips_encoding_of_unusable_photos(monkeypatch, fresh_database):
+    def fail_face_encodings(*_args, **_kwargs):
+        raise AssertionError("Unusable faces must not reach the encoder")
+
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(20, 180, 180, 20)])
+    monkeypatch.setattr(app.face_recognition, "face_landmarks", _frontal_landmarks)
+    monkeypatch.setattr(app.face_recognition, "face_encodings", fail_face_encodings)
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 200), color=(128, 128, 128)).save(buffer, format="PNG")
+    report_id = _insert_person(image=buffer.getvalue())
+
+    assert app.ensure_face_encodings(report_id, buffer.getvalue()) == []
+    assert app.get_face_quality(report_id) is not None
+    assert app.get_face_quality(report_id) < app.MIN_FACE_QUALITY
+    assert "blurry" in app.face_quality_warning(report_id)
+
+
+def _gradient_image_bytes(flip=False, shift=0, fmt="PNG"):
+    gradient = np.tile(np.linspace(0, 200, 64, dtype=np.uint8), (64, 1))
+    gradient = np.clip(gradient.astype(np.int16) + shift, 0, 255).astype(np.uint8)
+    if flip:
+        gradient = gradient.T
+    buffer = io.BytesIO()
+    Image.fromarray(gradient).convert("RGB").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_exact_repeat_upload_reuses_stored_analysis(monkeypatch, fresh_database):
+    original = _make_image_bytes(color=(10, 20, 30))
+    first_id = _insert_person(age="27", gender="Woman", image=original)
+    app.store_image_hashes(first_id, app.compute_image_hashes(original))
+    app.store_face_encodings(first_id, [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.3, 0.1, 0.2]), "quality": 0.8}
+    ])
+
+    def fail_model_call(*_args, **_kwargs):
+        raise AssertionError("Exact repeats must not run any face model")
+
+    monkeypatch.setattr(app, "detect_age_gender", fail_model_call)
+    monkeypatch.setattr(app.face_recognition, "face_locations", fail_model_call)
+    monkeypatch.setattr(app.face_recognition, "face_encodings", fail_model_call)
+
+    upload = app.analyze_upload(original)
+    assert (upload["age"], upload["gender"]) == ("27", "Woman")
+
+    repeat_id = _insert_person(age=upload["age"], gender=upload["gender"], image=original)
+    assert app.register_upload(repeat_id, upload) == first_id
+    faces = app.ensure_face_encodings(repeat_id, original)
+    assert len(faces) == 1
+    assert np.allclose(faces[0]["encoding"], [0.3, 0.1, 0.2])
+    assert app.get_face_quality(repeat_id) == pytest.approx(0.8)
+    assert any(note["title"] == "Possible duplicate report" for note in app.get_notifications())
+
+
+def test_near_duplicate_lookup_uses_hamming_distance(fresh_database):
+    original = _gradient_image_bytes()
+    original_id = _insert_person(image=original)
+    app.store_image_hashes(original_id, app.compute_image_hashes(original))
+    unrelated = _gradient_image_bytes(flip=True)
+    unrelated_id = _insert_person(image=unrelated)
+    app.store_image_hashes(unrelated_id, app.compute_image_hashes(unrelated))
+
+    recompressed = _gradient_image_bytes(shift=6, fmt="JPEG")
+    hashes = app.compute_image_hashes(recompressed)
+    assert app.find_exact_duplicate(hashes["sha256"]) is None
+
+    near = app.find_near_duplicates(hashes["dhash"])
+    assert [match["id"] for match in near] == [original_id]
+    assert near[0]["distance"] <= app.DUPLICATE_HASH_DISTANCE
+
+
+def test_rerank_rescores_shortlist_with_cached_refined_encodings(monkeypatch, fresh_database):
+    """Fast encodings shortlist, high-jitter encodings decide, and refined encodings are cached."""
+    fast = {
+        (0, 255, 0): np.array([0.0, 0.0, 0.0]),
+        (255, 0, 0): np.array([0.55, 0.0, 0.0]),
+        (0, 0, 255): np.array([0.0, 0.64, 0.0]),
+        (9, 9, 9): np.array([0.0, 0.0, 2.0]),
+    }
+    refined = {
+        (0, 255, 0): np.array([0.0, 0.0, 0.0]),
+        (255, 0, 0): np.array([0.75, 0.0, 0.0]),
+        (0, 0, 255): np.array([0.0, 0.3, 0.0]),
+    }
+    refined_calls = []
+
+    def fake_face_encodings(image_array, known_face_locations=None, num_jitters=1, model="small"):
+        color = tuple(int(v) for v in image_array[0, 0])
+        if num_jitters > 1:
+            assert model == app.RERANK_LANDMARK_MODEL
+            refined_calls.append(color)
+            return [refined[color]]
+        return [fast[color]]
+
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(app.face_recognition, "face_encodings", fake_face_encodings)
+    _accept_all_faces(monkeypatch)
+
+    rejected_id = _insert_person(name="Coarse Only", image=_make_image_bytes(color=(255, 0, 0)))
+    rescued_id = _insert_person(name="Borderline", image=_make_image_bytes(color=(0, 0, 255)))
+    _insert_person(name="Far Away", image=_make_image_bytes(color=(9, 9, 9)))
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    source_id = _insert_sighting(name="Probe", image=probe_image, last_seen_location="Nowhere")
+
+    matches = app.run_matching_pipeline(source_id, probe_image, "Probe", "Nowhere", "N/A", rerank=True)
+
+    facial_ids = [match["id"] for match in matches if match["method"] == "Facial"]
+    assert facial_ids == [rescued_id]
+    assert rejected_id not in facial_ids
+    assert sorted(refined_calls) == sorted([(0, 255, 0), (255, 0, 0), (0, 0, 255)])
+
+    refined_calls.clear()
+    candidate_meta, candidate_matrix = app.load_candidate_faces(("Match Found - Await Review", "Missing"), exclude_id=source_id)
+    probe_faces = app.get_face_encodings(source_id)
+    again = app.rerank_face_matches(probe_faces, candidate_meta, candidate_matrix, probe_image, source_id)
+    assert [match["report_id"] for match in again] == [rescued_id]
+    assert refined_calls == [], "Refined encodings should be served from the cache"
+
+
+def test_deleted_reports_leave_the_shared_embedding_index(fresh_database):
+    keep_id = _insert_person(name="Keep")
+    drop_id = _insert_person(name="Drop")
+    for report_id in (keep_id, drop_id):
+        app.store_face_encodings(report_id, [
+            {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.1, 0.2, 0.3]), "quality": 0.9}
+        ])
+
+    meta, _matrix = app.load_candidate_faces()
+    assert sorted(meta["report_id"].tolist()) == [keep_id, drop_id]
+
+    app.delete_report(drop_id)
+    meta, matrix = app.load_candidate_faces()
+    assert meta["report_id"].tolist() == [keep_id]
+    assert np.allclose(matrix[0], [0.1, 0.2, 0.3], atol=0.005)
+
+
+def test_missing_or_damaged_shards_are_rebuilt_from_the_database(fresh_database):
+    report_id = _insert_person(name="Shard Case")
+    app.store_face_encodings(report_id, [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.1, 0.2, 0.3]), "quality": 0.9}
+    ])
+    shard = app.report_shards([report_id])[report_id]
+    path = app.embedding_store_path(shard)
+
+    os.remove(path)
+    meta, matrix = app.load_report_faces([report_id])
+    assert meta["report_id"].tolist() == [report_id]
+    assert np.allclose(matrix[0], [0.1, 0.2, 0.3], atol=0.005)
+
+    app._embedding_stores.clear()
+    with open(path, "r+b") as handle:
+        handle.write(b"garbage!")
+    assert app.load_report_faces([report_id])[0]["report_id"].tolist() == [report_id]
+    rebuilt = [note for note in app.get_notifications() if note["title"] == "Embedding shard rebuilt"]
+    assert len(rebuilt) == 2 and rebuilt[0]["level"] == "warning"
+
+
+def test_spatial_index_tracks_report_coordinates(fresh_database):
+    near_id = _insert_person(location_lat=19.07, location_lng=72.88)
+    moved_id = _insert_person(location_lat=28.61, location_lng=77.21)
+
+    nearby = app.find_reports_near(19.0, 72.85, radius_km=20)
+    assert [row[0] for row in nearby] == [near_id]
+    assert nearby[0][4] < 20
+
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET location_lat = 19.01, location_lng = 72.86 WHERE id = ?", (moved_id,))
+    conn.commit()
+    conn.close()
+    assert [row[0] for row in app.find_reports_near(19.0, 72.85, radius_km=20)] == [moved_id, near_id]
+
+    app.delete_report(near_id)
+    assert [row[0] for row in app.find_reports_near(19.0, 72.85, radius_km=20)] == [moved_id]
+
+
+def test_run_matching_pipeline_widens_radius_until_candidates_found(monkeypatch, fresh_database):
+    monkeypatch.setattr(app, "GEO_MIN_CANDIDATES", 1)
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda _image, known_face_locations=None: [np.array([0.1, 0.2, 0.3])],
+    )
+    _accept_all_faces(monkeypatch)
+
+    # ~7 km and ~1,150 km from the sighting
+    nearby_id = _insert_person(name="Nearby Case", location_lat=19.06, location_lng=72.88, location_accuracy=None)
+    far_id = _insert_person(name="Far Case", location_lat=28.61, location_lng=77.21, location_accuracy=None)
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    source_id = _insert_sighting(
+        name="Sighting", image=probe_image, location_lat=19.0, location_lng=72.85, location_accuracy=None
+    )
+
+    matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "N/A", radius_km=1.0)
+
+    facial = [match for match in matches if match["method"] == "Facial"]
+    assert [match["id"] for match in facial] == [nearby_id]
+    assert far_id not in {match["id"] for match in matches}
+    stored = [match for match in app.get_match_results() if match["match_type"] == "facial"]
+    assert stored[0]["details"]["search_radius_km"] == 8.0
+    assert 5 < stored[0]["details"]["distance_km"] < 10
+
+
+def test_radius_search_keeps_unlocated_reports_and_falls_back_to_the_full_set(monkeypatch, fresh_database):
+    monkeypatch.setattr(app, "GEO_MIN_CANDIDATES", 1)
+    monkeypatch.setattr(app, "SIGHTING_CLUSTER_DISTANCE", -1.0)  # each sighting runs its own search
+    face_vectors = {(0, 255, 0): np.array([0.1, 0.2, 0.3]), (9, 9, 9): np.array([-0.5, -0.5, -0.5])}
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda image, known_face_locations=None: [face_vectors[tuple(int(v) for v in image[0, 0])]],
+    )
+    _accept_all_faces(monkeypatch)
+
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    other_image = _make_image_bytes(color=(9, 9, 9))
+    _insert_person(name="Nearby Case", image=other_image, location_lat=19.06, location_lng=72.88, location_accuracy=None)
+    unlocated_id = _insert_person(name="Unlocated Case", image=probe_image, location_lat=None, location_lng=None)
+    far_id = _insert_person(name="Far Case", image=probe_image, location_lat=28.61, location_lng=77.21, location_accuracy=None)
+
+    def match_sighting():
+        source_id = _insert_sighting(
+            name="Sighting", image=probe_image, location_lat=19.0, location_lng=72.85, location_accuracy=None
+        )
+        matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "N/A", radius_km=1.0)
+        return [match["id"] for match in matches if match["method"] == "Facial"]
+
+    assert match_sighting() == [unlocated_id], "Reports without coordinates are searched with the nearby ones"
+
+    app.delete_report(unlocated_id)
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET status = 'Missing' WHERE report_kind = 'missing'")
+    conn.commit()
+    conn.close()
+    assert match_sighting() == [far_id], "Nothing nearby matched, so the full set is searched"
+
+
+def test_run_matching_pipeline_searches_compatible_age_gender_partitions(monkeypatch, fresh_database):
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda _image, known_face_locations=None: [np.array([0.1, 0.2, 0.3])],
+    )
+    _accept_all_faces(monkeypatch)
+
+    same_id = _insert_person(name="Same Partition", age="30", gender="Woman")
+    unknown_id = _insert_person(name="Unknown Partition", age="N/A", gender="N/A")
+    other_gender_id = _insert_person(name="Other Gender", age="30", gender="Man")
+    other_age_id = _insert_person(name="Other Age", age="70", gender="Woman")
+
+    conn = sqlite3.connect(app.DB_PATH)
+    bands = dict(conn.execute("SELECT id, age_band FROM missing_persons").fetchall())
+    conn.close()
+    assert bands[same_id] == 3 and bands[unknown_id] is None
+
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    source_id = _insert_sighting(name="Sighting", image=probe_image, age="36", gender="Woman")
+    matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "36")
+    assert {match["id"] for match in matches if match["method"] == "Facial"} == {same_id, unknown_id}
+
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET status = 'Missing'")
+    conn.commit()
+    conn.close()
+    unknown_source_id = _insert_sighting(name="Blurry Sighting", image=probe_image, age="Error", gender="Error")
+    matches = app.run_matching_pipeline(unknown_source_id, probe_image, "Blurry Sighting", "Somewhere", "Error")
+    assert {match["id"] for match in matches if match["method"] == "Facial"} >= {
+        same_id, unknown_id, other_gender_id, other_age_id
+    }
+
+
+def test_face_with_no_confident_match_in_its_partitions_searches_all_of_them(monkeypatch, fresh_database):
+    face_vectors = {(0, 255, 0): np.array([0.1, 0.2, 0.3]), (9, 9, 9): np.array([-0.5, -0.5, -0.5])}
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda image, known_face_locations=None: [face_vectors[tuple(int(v) for v in image[0, 0])]],
+    )
+    _accept_all_faces(monkeypatch)
+
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    _insert_person(name="Same Partition", image=_make_image_bytes(color=(9, 9, 9)), age="30", gender="Woman")
+    misfiled_id = _insert_person(name="Misfiled Estimate", image=probe_image, age="30", gender="Man")
+
+    source_id = _insert_sighting(name="Sighting", image=probe_image, age="32", gender="Woman")
+    matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "32")
+    assert [match["id"] for match in matches if match["method"] == "Facial"] == [misfiled_id]
+
+
+def test_face_search_goes_newest_segment_first_and_compacts_old_segments(monkeypatch, fresh_database):
+    monkeypatch.setattr(app, "SEARCH_TOP_K", 1)
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda _image, known_face_locations=None: [np.array([0.1, 0.2, 0.3])],
+    )
+    _accept_all_faces(monkeypatch)
+
+    recent_date = datetime.datetime.now().isoformat()
+    old_id = _insert_person(name="Old Case", date_reported="2019-03-02T10:00:00")
+    recent_id = _insert_person(name="Recent Case", date_reported=recent_date)
+    for report_id in (old_id, recent_id):
+        app.store_face_encodings(report_id, [
+            {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.1, 0.2, 0.3]), "quality": 0.9}
+        ])
+    assert app.list_embedding_shards() == [f"missing/{recent_date[:7]}", "missing/2019-03"]
+
+    probe_image = _make_image_bytes(color=(0, 255, 0))
+    source_id = _insert_sighting(name="Sighting", image=probe_image)
+    matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "N/A")
+    assert [match["id"] for match in matches if match["method"] == "Facial"] == [recent_id]
+
+    assert app.compact_cold_segments(months=12) == 1
+    assert app.list_embedding_shards("missing") == [f"missing/{recent_date[:7]}", f"missing/{app.COLD_SHARD}"]
+    meta, _matrix = app.load_report_faces([old_id, recent_id])
+    assert sorted(meta["report_id"].tolist()) == [old_id, recent_id]
+
+    app.set_setting("search_lookback_months", 6)
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET status = 'Missing'")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app, "SEARCH_TOP_K", 5)
+    matches = app.run_matching_pipeline(source_id, probe_image, "Sighting", "Somewhere", "N/A")
+    assert old_id not in {match["id"] for match in matches}
+
+
+def test_new_missing_report_is_matched_against_earlier_sightings(monkeypatch, fresh_database):
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda _image, known_face_locations=None: [np.array([0.1, 0.2, 0.3])],
+    )
+    _accept_all_faces(monkeypatch)
+
+    sighting_image = _make_image_bytes(color=(0, 255, 0))
+    sighting_id = _insert_sighting(name="Sighting Report", image=sighting_image)
+    assert app.run_matching_pipeline(sighting_id, sighting_image, "Sighting Report", "Somewhere", "N/A") == []
+
+    other_missing_id = _insert_person(name="Older Missing Case", last_seen_location="Elsewhere")
+    missing_image = _make_image_bytes(color=(0, 0, 255))
+    missing_id = _insert_person(name="Priya", image=missing_image, last_seen_location="Harbour")
+    matches = app.run_matching_pipeline(missing_id, missing_image, "Priya", "Harbour", "N/A")
+
+    assert [match["id"] for match in matches if match["method"] == "Facial"] == [sighting_id]
+    assert other_missing_id not in {match["id"] for match in matches}
+    assert app.list_embedding_shards("sighting")
+
+
+def test_repeat_sightings_share_a_cluster_and_one_queued_match(monkeypatch, fresh_database):
+    face_vectors = {
+        (0, 0, 255): np.array([0.5, 0.5, 0.5]),
+        (0, 255, 0): np.array([0.52, 0.5, 0.5]),
+        (0, 250, 0): np.array([0.5, 0.52, 0.5]),
+        (9, 9, 9): np.array([-0.5, -0.5, -0.5]),
+    }
+    monkeypatch.setattr(app.face_recognition, "face_locations", lambda _image: [(0, 4, 4, 0)])
+    monkeypatch.setattr(
+        app.face_recognition,
+        "face_encodings",
+        lambda image, known_face_locations=None: [face_vectors[tuple(int(v) for v in image[0, 0])]],
+    )
+    _accept_all_faces(monkeypatch)
+
+    searches = []
+    match_faces = app.match_faces
+    monkeypatch.setattr(app, "match_faces", lambda *args, **kwargs: searches.append(1) or match_faces(*args, **kwargs))
+
+    missing_id = _insert_person(name="Kiran", image=_make_image_bytes(color=(0, 0, 255)))
+    sighting_ids, results, search_counts = [], [], []
+    for color in ((0, 255, 0), (0, 250, 0), (9, 9, 9)):
+        image = _make_image_bytes(color=color)
+        sighting_id = _insert_sighting(name="Sighting Report", image=image, last_seen_location="Bus Depot")
+        results.append(app.run_matching_pipeline(sighting_id, image, "Sighting Report", "Bus Depot", "N/A"))
+        search_counts.append(len(searches))
+        sighting_ids.append(sighting_id)
+        app.set_status(missing_id, "Missing", notify=False)
+    assert search_counts[0] == search_counts[1] < search_counts[2], "The second sighting barely moved the centroid"
+    assert [match["id"] for match in results[1]] == [missing_id]
+    assert app.fetch_person_summary(sighting_ids[1])["status"] == "Match Found - Await Review"
+
+    conn = sqlite3.connect(app.DB_PATH)
+    clusters = dict(conn.execute("SELECT id, cluster_id FROM missing_persons WHERE cluster_id IS NOT NULL").fetchall())
+    member_counts = dict(conn.execute("SELECT id, member_count FROM sighting_clusters").fetchall())
+    conn.close()
+    assert clusters[sighting_ids[0]] == clusters[sighting_ids[1]] != clusters[sighting_ids[2]]
+    assert member_counts[clusters[sighting_ids[0]]] == 2
+
+    facial = [match for match in app.get_match_results() if match["match_type"] == "facial"]
+    assert [(match["source_report_id"], match["candidate_report_id"]) for match in facial] == [(sighting_ids[0], missing_id)]
+    alerts = [note for note in app.get_notifications() if note["title"] == "Potential match detected"]
+    assert len(alerts) == 1
+    assert len(app.group_matches_by_cluster(app.get_match_results())) == 1
+
+    app.delete_report(sighting_ids[1])
+    conn = sqlite3.connect(app.DB_PATH)
+    assert conn.execute("SELECT member_count FROM sighting_clusters WHERE id = ?", (clusters[sighting_ids[0]],)).fetchone() == (1,)
+    conn.close()
+
+    monkeypatch.setattr(app, "SIGHTING_REMATCH_DISTANCE", 0.001)
+    image = _make_image_bytes(color=(0, 250, 0))
+    rejoined_id = _insert_sighting(name="Sighting Report", image=image, last_seen_location="Bus Depot")
+    before = len(searches)
+    app.run_matching_pipeline(rejoined_id, image, "Sighting Report", "Bus Depot", "N/A")
+    assert len(searches) > before, "A centroid that moved past the threshold is searched again"
+
+
+def test_one_cluster_matching_two_missing_reports_gives_two_alerts(fresh_database):
+    first_missing = _insert_person(name="Asha")
+    second_missing = _insert_person(name="Ravi")
+    sightings = [_insert_sighting(name="Sighting Report") for _ in range(2)]
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("INSERT INTO sighting_clusters (id, centroid, member_count) VALUES (7, ?, 2)", (b"",))
+    conn.executemany("UPDATE missing_persons SET cluster_id = 7 WHERE id = ?", [(sighting,) for sighting in sightings])
+    conn.commit()
+    conn.close()
+
+    assert app.record_match_result(sightings[0], first_missing, 90.0, "facial", {}, cluster_id=7)
+    assert app.record_match_result(second_missing, sightings[1], 88.0, "facial", {}, cluster_id=7)
+    assert not app.record_match_result(sightings[1], first_missing, 91.0, "facial", {}, cluster_id=7)
+
+    groups = app.group_matches_by_cluster(app.get_match_results())
+    missing_ids = [{match["candidate_report_id"] if match["source_report_id"] in sightings else match["source_report_id"]
+                    for match in group} for group in groups]
+    assert sorted(missing_ids, key=min) == [{first_missing}, {second_missing}]
+
+
+def test_unconfirmed_matches_do_not_pull_other_reports_into_a_case(fresh_database):
+    false_id = _insert_person(name="A")
+    true_id = _insert_person(name="B")
+    sighting_id = _insert_sighting(name="S")
+    app.record_match_result(sighting_id, false_id, 40.0, "context", {})
+    app.record_match_result(sighting_id, true_id, 92.0, "facial", {})
+
+    app.resolve_match_as_found(true_id)
+    statuses = {person["id"]: person["status"] for person in map(app.fetch_person_summary, (false_id, true_id, sighting_id))}
+    assert statuses == {false_id: "Missing", true_id: "Found", sighting_id: "Found"}
+    assert app.get_case_report_ids(true_id) == sorted([true_id, sighting_id]), "Mark as Found confirms the direct match"
+
+    app.delete_report_and_matches(true_id)
+    conn = sqlite3.connect(app.DB_PATH)
+    remaining = {row[0] for row in conn.execute("SELECT id FROM missing_persons")}
+    conn.close()
+    assert remaining == {false_id}
+
+
+def test_linked_cases_follow_transitive_matches(fresh_database):
+    first_id = _insert_person(name="A")
+    second_id = _insert_sighting(name="B")
+    third_id = _insert_person(name="C")
+    unrelated_id = _insert_person(name="D")
+    app.record_match_result(second_id, first_id, 90.0, "facial", {})
+    app.record_match_result(second_id, third_id, 88.0, "facial", {})
+    assert app.get_case_report_ids(first_id) == [first_id], "Queued matches do not link reports"
+    for match in app.get_match_results():
+        app.update_match_status(match["id"], "Escalated")
+
+    assert app.get_case_report_ids(first_id) == [first_id, second_id, third_id]
+    assert app.get_matched_partner_ids(third_id) == [first_id, second_id]
+
+    dismissed = next(match for match in app.get_match_results() if match["candidate_report_id"] == third_id)
+    app.update_match_status(dismissed["id"], "Dismissed")
+    assert app.get_case_report_ids(first_id) == [first_id, second_id]
+    assert app.get_case_report_ids(third_id) == [third_id]
+
+    app.resolve_match_as_found(first_id)
+    statuses = {person["id"]: person["status"] for person in map(app.fetch_person_summary, (first_id, second_id, third_id))}
+    assert statuses == {first_id: "Found", second_id: "Found", third_id: "Missing"}
+
+    app.delete_report_and_matches(first_id)
+    conn = app.connect_db()
+    remaining = {row[0] for row in conn.execute("SELECT id FROM missing_persons")}
+    links = conn.execute("SELECT COUNT(*) FROM case_links WHERE report_id IN (?, ?)", (first_id, second_id)).fetchone()[0]
+    conn.close()
+    assert remaining == {third_id, unrelated_id}
+    assert links == 0
+
+
+def test_score_fusion_needs_more_than_a_matching_age(fresh_database):
+    features = {
+        "face": np.array([0.95, 0.0, 0.0]),
+        "name": np.array([0.2, 0.1, 0.9]),
+        "age": np.array([1.0, 1.0, 1.0]),
+    }
+    available = {
+        "face": np.array([True, False, False]),
+        "name": np.array([True, False, True]),
+        "age": np.array([True, True, True]),
+    }
+    scores, evidence = app.score_candidates(features, available, weights={"face": 0.6, "name": 0.2, "age": 0.2})
+    assert np.allclose(scores, [(0.57 + 0.04 + 0.2) / 1.0, 1.0, (0.18 + 0.2) / 0.4])
+    assert np.allclose(evidence, [1.0, 0.2, 0.4])
+
+    probe_id = _insert_sighting(name="Sighting Report", age="34", last_seen_location="Lake Road")
+    age_only_id = _insert_person(name="Zed", age="34", last_seen_location="Hill Fort", location_lat=None, location_lng=None)
+    named_id = _insert_person(name="Sighting Reports", age="40", last_seen_location="Lake Road")
+
+    matches = app.run_matching_pipeline(probe_id, None, "Sighting Report", "Lake Road", "34")
+    assert [match["id"] for match in matches] == [named_id]
+    stored = app.get_match_results()
+    assert stored[0]["match_type"] == "context"
+    assert set(stored[0]["details"]["signals"]) >= {"name", "location", "age", "geo", "time"}
+    assert age_only_id not in {match["candidate_report_id"] for match in stored}
+
+
+def test_photo_search_returns_top_k_and_caches_probe_encodings(monkeypatch, fresh_database):
+    encode_calls = []
+
+    def fake_encode_faces(image_bytes):
+        encode_calls.append(image_bytes)
+        return [{"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.0, 0.0, 0.0]), "quality": 0.9}]
+
+    monkeypatch.setattr(app, "encode_faces", fake_encode_faces)
+    monkeypatch.setattr(app, "_probe_cache", app.OrderedDict())
+    ids = []
+    for offset in (0.3, 0.1, 0.2, 0.9):
+        report_id = _insert_person(name=f"Case {offset}")
+        app.store_face_encodings(report_id, [
+            {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([offset, 0.0, 0.0]), "quality": 0.9}
+        ])
+        ids.append(report_id)
+
+    probe = _make_image_bytes(color=(1, 2, 3))
+    result = app.search_similar_faces(probe, k=2, tolerance=0.6)
+    assert [match["report_id"] for match in result["matches"]] == [ids[1], ids[2]]
+    assert result["faces_searched"] == 4
+
+    again = app.search_similar_faces(probe, k=5, tolerance=0.25)
+    assert [match["report_id"] for match in again["matches"]] == [ids[1], ids[2]]
+    assert len(encode_calls) == 1, "Repeat searches should reuse the cached probe encoding"
+
+
+def test_notification_cursor_and_retention(fresh_database):
+    app.create_notification("First", "one")
+    first_id = app.get_notifications()[0]["id"]
+    app.create_notification("Second", "two")
+    app.create_notification("Third", "three")
+
+    assert [note["title"] for note in app.get_notifications_since(first_id)] == ["Second", "Third"]
+    assert app.count_unread_notifications() == 3
+
+    app.mark_notification_read(first_id)
+    conn = app.connect_db()
+    conn.execute("UPDATE notifications SET created_at = datetime('now', '-40 days') WHERE id = ?", (first_id,))
+    conn.commit()
+    conn.close()
+
+    assert app.archive_read_notifications(retention_days=30) == 1
+    assert [note["title"] for note in app.get_notifications(include_read=True)] == ["Third", "Second"]
+    conn = app.connect_db()
+    archived = conn.execute("SELECT title FROM notifications_archive").fetchall()
+    conn.close()
+    assert archived == [("First",)]
+
+
+def test_archive_resolved_cases_moves_history_out_of_hot_db(monkeypatch, fresh_database):
+    monkeypatch.setattr(app, "encode_faces", lambda _image: [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.0, 0.0, 0.0]), "quality": 0.9}
+    ])
+    monkeypatch.setattr(app, "_probe_cache", app.OrderedDict())
+    old = (datetime.datetime.now() - datetime.timedelta(days=60)).isoformat()
+    found_id = _insert_person(name="Resolved", status="Found", date_reported=old)
+    sighting_id = _insert_sighting(name="Resolved sighting", date_reported=old)
+    recent_id = _insert_person(name="Recently found", status="Found", date_reported=old)
+    open_id = _insert_person(name="Still missing", date_reported=old)
+    app.store_face_encodings(found_id, [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.1, 0.0, 0.0]), "quality": 0.9}
+    ])
+    app.record_match_result(sighting_id, found_id, 90.0, "facial", {})
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET resolved_at = datetime('now', '-60 days') WHERE id = ?", (found_id,))
+    conn.commit()
+    conn.close()
+
+    assert app.archive_resolved_cases(batch_size=1) == 1
+
+    conn = app.connect_db()
+    hot_ids = {row[0] for row in conn.execute("SELECT id FROM missing_persons")}
+    hot_matches = conn.execute("SELECT COUNT(*) FROM match_results").fetchone()[0]
+    hot_faces = conn.execute("SELECT COUNT(*) FROM face_embeddings").fetchone()[0]
+    conn.close()
+    assert hot_ids == {sighting_id, recent_id, open_id}
+    assert (hot_matches, hot_faces) == (0, 0)
+
+    conn = app.connect_with_archive()
+    archived = conn.execute("SELECT id, name, image IS NOT NULL FROM archive.missing_persons").fetchall()
+    archived_matches = conn.execute("SELECT source_report_id, candidate_report_id FROM archive.match_results").fetchall()
+    conn.close()
+    assert archived == [(found_id, "Resolved", 1)]
+    assert archived_matches == [(sighting_id, found_id)]
+    assert app.get_person_matches(found_id) == []
+    person_matches = app.get_person_matches(found_id, include_archive=True)
+    assert [(match["source_report_id"], match["candidate_report_id"]) for match in person_matches] == [(sighting_id, found_id)]
+    assert app.get_stats()[1] >= 2, "Archived Found cases still count towards the dashboard total"
+
+    probe = _make_image_bytes(color=(1, 2, 3))
+    assert app.search_similar_faces(probe, statuses=("Found",))["matches"] == []
+    with_archive = app.search_similar_faces(probe, statuses=("Found",), include_archive=True)
+    assert [match["report_id"] for match in with_archive["matches"]] == [found_id]
+
+
+def test_heatmap_bins_open_cases_and_invalidates_on_location_changes(fresh_database, monkeypatch):
+    for index in range(30):
+        _insert_person(location_lat=10.0 + index * 0.5, location_lng=20.0, status="Missing")
+    far_id = _insert_person(location_lat=-33.9, location_lng=151.2, status="Missing")
+    _insert_person(location_lat=48.8, location_lng=2.3, status="Found")
+
+    cells, cell_degrees = app.heatmap_cells()
+    assert (len(cells), int(cells["cases"].sum())) == (31, 31)
+    assert cell_degrees == app.HEATMAP_MIN_CELL_DEGREES
+
+    coarse, coarse_degrees = app.heatmap_cells(max_points=5)
+    assert len(coarse) <= 5 and int(coarse["cases"].sum()) == 31
+    assert coarse_degrees > cell_degrees
+
+    queries = []
+    read_sql_query = app.pd.read_sql_query
+    monkeypatch.setattr(app.pd, "read_sql_query", lambda *args, **kwargs: queries.append(args) or read_sql_query(*args, **kwargs))
+    version = app.data_version("main")
+    assert app.heatmap_cells()[0].equals(cells)
+    assert queries == [], "Unchanged data is served from the cache"
+    app.set_status(far_id, "Found")
+    assert app.data_version("main") > version
+    assert int(app.heatmap_cells()[0]["cases"].sum()) == 30
+
+
+def test_page_reads_are_cached_until_any_database_changes(fresh_database):
+    report_id = _insert_person(status="Missing")
+    calls = []
+
+    def load_stats():
+        calls.append(1)
+        return app.get_stats()
+
+    assert app.cached_read(load_stats)[0] == 1
+    hits = app.read_cache_stats()["hits"]
+    assert app.cached_read(load_stats)[0] == 1
+    assert len(calls) == 1 and app.read_cache_stats()["hits"] == hits + 1
+
+    versions = [app.data_version(schema) for schema in ("main", "events", "matches")]
+    app.set_status(report_id, "Found")
+    app.create_notification("Case found", "Report resolved")
+    app.record_match_result(report_id, None, 90.0, "facial", {})
+    after = [app.data_version(schema) for schema in ("main", "events", "matches")]
+    assert all(new > old for old, new in zip(versions, after)), "Writes to the main, events and matches databases all count"
+    missing_count, found_count, alerts, pending_matches = app.cached_read(load_stats)
+    assert (missing_count, found_count, pending_matches) == (0, 1, 1) and alerts >= 1
+    assert len(calls) == 2
+
+
+def test_match_queue_page_is_one_cache_entry(fresh_database):
+    sighting_id = _insert_sighting(name="Sighting Report")
+    missing_ids = [_insert_person(name=f"Case {index}") for index in range(app.READ_CACHE_SIZE)]
+    for missing_id in missing_ids:
+        app.record_match_result(sighting_id, missing_id, 80.0, "facial", {})
+
+    entries = app.read_cache_stats()["entries"]
+    groups, summaries, _cluster_sizes = app.cached_read(app.load_match_queue, ("New", "Under Review"), 30)
+    assert app.read_cache_stats()["entries"] == entries + 1
+    shown = {report_id for group in groups for match in group for report_id in (match["source_report_id"], match["candidate_report_id"])}
+    assert len(groups) == 30 and set(summaries) == shown
+    assert summaries[sighting_id]["name"] == "Sighting Report"
+
+
+def test_tracking_codes_are_unique_and_collisions_get_a_fresh_code(fresh_database, monkeypatch):
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("DROP INDEX idx_missing_tracking_code")
+    conn.commit()
+    conn.close()
+    first_id = _insert_person(reporter_tracking_code="SAMECODE")
+    second_id = _insert_person(reporter_tracking_code="SAMECODE")
+
+    app.init_db()
+    assert app.lookup_tracking_status("SAMECODE")["id"] == first_id
+    assert app.fetch_person_summary(second_id)["tracking"] not in (None, "SAMECODE")
+    assert app.get_notifications()[0]["title"] == "Tracking ID reassigned"
+
+    codes = iter(["SAMECODE", "FRESH001"])
+    monkeypatch.setattr(app, "generate_tracking_code", lambda: next(codes))
+    record = {"name": "Retry Case", "reporter_tracking_code": "SAMECODE"}
+    report_id = app.insert_report(record)
+    assert record["reporter_tracking_code"] == "FRESH001"
+    status = app.lookup_tracking_status("FRESH001")
+    assert (status["id"], status["name"]) == (report_id, "Retry Case")
+    assert "image" not in status
+
+
+def test_archiving_counts_from_resolution_and_updates_sighting_clusters(fresh_database):
+    old = (datetime.datetime.now() - datetime.timedelta(days=400)).isoformat()
+    first_id = _insert_sighting(date_reported=old)
+    second_id = _insert_sighting(date_reported=old)
+    app.store_face_encodings(first_id, [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.2, 0.0, 0.0]), "quality": 0.9}
+    ])
+    cluster_id, _centroid = app.assign_sighting_cluster(first_id, np.array([0.2, 0.0, 0.0]))
+    assert app.assign_sighting_cluster(second_id, np.array([0.0, 0.0, 0.0]))[0] == cluster_id
+
+    app.set_status(first_id, "Found", notify=False)
+    assert app.archive_resolved_cases() == 0, "Filed long ago, but resolved just now"
+
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute("UPDATE missing_persons SET resolved_at = datetime('now', '-31 days') WHERE id = ?", (first_id,))
+    conn.commit()
+    conn.close()
+    assert app.archive_resolved_cases() == 1
+
+    conn = sqlite3.connect(app.DB_PATH)
+    member_count, centroid = conn.execute("SELECT member_count, centroid FROM sighting_clusters WHERE id = ?", (cluster_id,)).fetchone()
+    conn.close()
+    assert member_count == 1
+    np.testing.assert_allclose(np.frombuffer(centroid, dtype=np.float32), [0.0, 0.0, 0.0], atol=1e-6)
@@ -0,0 +1,134 @@
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+import app
+import backup_db
+
+
+@pytest.fixture(autouse=True)
+def fresh_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "backup_missing_persons.db"))
+    app._embedding_stores.clear()
+    app.init_db()
+    yield
+    app._embedding_stores.clear()
+
+
+def _insert_report(name):
+    report_id = app.insert_report({
+        "name": name,
+        "last_seen_location": "Central Station",
+        "date_reported": datetime.datetime.now().isoformat(),
+    })
+    app.store_face_encodings(report_id, [
+        {"face_index": 0, "box": [0, 4, 4, 0], "encoding": np.array([0.3, 0.1, 0.2]), "quality": 0.8}
+    ])
+    return report_id
+
+
+def _stored_report_ids():
+    ids = set()
+    for shard in app.list_embedding_shards():
+        meta, _matrix = app.get_embedding_store(shard).load()
+        ids.update(int(report_id) for report_id in meta["report_id"])
+    return ids
+
+
+def test_backup_copies_every_database_and_rotates(tmp_path):
+    _insert_report("Kept Case")
+    app.create_notification("Backup test", "hello")
+    root = str(tmp_path / "backups")
+
+    first = backup_db.create_backup(root, keep=2)
+    assert sorted(os.listdir(first)) == sorted([
+        backup_db.MANIFEST_NAME,
+        "backup_missing_persons.db",
+        "backup_missing_persons_events.db",
+        "backup_missing_persons_matches.db",
+        "backup_missing_persons_archive.db",
+        "backup_missing_persons.faces",
+    ])
+    assert set(backup_db.verify_backup(first).values()) == {"ok"}
+
+    os.makedirs(os.path.join(root, "19990101-000000.partial"))
+    for stamp in ("20000101-000000", "20000102-000000"):
+        os.rename(first, os.path.join(root, stamp))
+        first = backup_db.create_backup(root, keep=2)
+    assert [os.path.basename(path) for path in backup_db.list_backups(root)] == ["20000102-000000", os.path.basename(first)]
+    assert not any(name.endswith(".partial") for name in os.listdir(root))
+
+
+def test_restore_brings_back_data_and_reconciles_embeddings(tmp_path):
+    kept_id = _insert_report("Kept Case")
+    backup_dir = backup_db.create_backup(str(tmp_path / "backups"))
+
+    # Filed after the store was copied but present in the database copy
+    conn = sqlite3.connect(os.path.join(backup_dir, "backup_missing_persons.db"))
+    conn.execute("INSERT INTO missing_persons (id, name) VALUES (999, 'Late Case')")
+    conn.execute(
+        "INSERT INTO face_embeddings (report_id, face_index, box_top, box_right, box_bottom, box_left, encoding)"
+        " VALUES (999, 0, 0, 4, 4, 0, ?)", (np.array([0.5, 0.5, 0.5], dtype=np.float32).tobytes(),)
+    )
+    conn.commit()
+    conn.close()
+
+    app.delete_reports([kept_id])
+    app.create_notification("After backup", "gone after restore")
+    lost_id = _insert_report("Lost Case")
+    assert _stored_report_ids() == {lost_id}
+
+    backup_db.restore_backup(backup_dir)
+    conn = sqlite3.connect(app.DB_PATH)
+    names = {row[0] for row in conn.execute("SELECT name FROM missing_persons")}
+    conn.close()
+    assert names == {"Kept Case", "Late Case"}
+    assert _stored_report_ids() == {kept_id, 999}
+    assert "After backup" not in {note["title"] for note in app.get_notifications()}, "Split databases are restored too"
+
+
+def test_backup_is_one_snapshot_while_writers_keep_committing(tmp_path, monkeypatch):
+    kept_id = _insert_report("Kept Case")
+    copy_schema = backup_db.copy_schema
+    written = []
+
+    def copy_while_writing(source, schema, target_path):
+        if not written:
+            # A report and its match, committed between the copies without waiting for the backup
+            conn = app.connect_db()
+            conn.execute("PRAGMA busy_timeout = 0")
+            late_id = conn.execute("INSERT INTO missing_persons (name) VALUES ('Late Case')").lastrowid
+            conn.execute(
+                "INSERT INTO match_results (source_report_id, candidate_report_id, match_type) VALUES (?, ?, 'facial')",
+                (late_id, kept_id)
+            )
+            conn.commit()
+            conn.close()
+            written.append(late_id)
+        copy_schema(source, schema, target_path)
+
+    monkeypatch.setattr(backup_db, "copy_schema", copy_while_writing)
+    backup_dir = backup_db.create_backup(str(tmp_path / "backups"))
+
+    conn = sqlite3.connect(os.path.join(backup_dir, "backup_missing_persons.db"))
+    names = {row[0] for row in conn.execute("SELECT name FROM missing_persons")}
+    conn.close()
+    conn = sqlite3.connect(os.path.join(backup_dir, "backup_missing_persons_matches.db"))
+    matches = conn.execute("SELECT COUNT(*) FROM match_results").fetchone()[0]
+    conn.close()
+    assert written and names == {"Kept Case"} and matches == 0
+    assert app.fetch_person_summary(written[0])["name"] == "Late Case"
+
+
+def test_restore_refuses_damaged_backup(tmp_path):
+    _insert_report("Kept Case")
+    backup_dir = backup_db.create_backup(str(tmp_path / "backups"))
+    with open(os.path.join(backup_dir, "backup_missing_persons_matches.db"), "r+b") as handle:
+        handle.seek(0)
+        handle.write(b"garbage" * 20)
+
+    with pytest.raises((RuntimeError, sqlite3.DatabaseError)):
+        backup_db.restore_backup(backup_dir)
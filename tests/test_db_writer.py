@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from db_writer import DatabaseWriter
+
+
+def _create_table(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE reports (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+
+
+def test_concurrent_sessions_are_group_committed_without_lock_errors(tmp_path):
+    path = str(tmp_path / "writes.db")
+    _create_table(path)
+    writer = DatabaseWriter(path, max_batch=32)
+
+    def submit(index):
+        return writer.execute("INSERT INTO reports (name) VALUES (?)", (f"report-{index}",)).result(timeout=10)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        ids = list(pool.map(submit, range(400)))
+    writer.close()
+
+    assert sorted(ids) == list(range(1, 401))
+    assert writer.jobs == 400
+    assert writer.batches < 400, "Concurrent writes should share commits"
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 400
+    conn.close()
+
+
+def test_failing_job_is_rolled_back_without_losing_the_rest_of_its_batch(tmp_path):
+    path = str(tmp_path / "writes.db")
+    _create_table(path)
+    writer = DatabaseWriter(path)
+
+    def insert_pair(cursor, first, second):
+        cursor.execute("INSERT INTO reports (name) VALUES (?)", (first,))
+        cursor.execute("INSERT INTO reports (name) VALUES (?)", (second,))
+
+    futures = [
+        writer.execute("INSERT INTO reports (name) VALUES ('kept')"),
+        writer.submit(insert_pair, "partial", "kept"),
+        writer.execute("INSERT INTO reports (name) VALUES ('also kept')"),
+    ]
+    writer.close()
+
+    assert futures[0].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert futures[2].result()
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM reports")}
+    conn.close()
+    assert names == {"kept", "also kept"}
+
+
+def test_batches_lock_only_the_files_they_write(tmp_path):
+    path, other_path = str(tmp_path / "writes.db"), str(tmp_path / "other.db")
+    _create_table(path)
+    _create_table(other_path)
+    writer = DatabaseWriter(path, attached={"other": other_path})
+    in_job, release = threading.Event(), threading.Event()
+
+    def slow_insert(cursor):
+        cursor.execute("INSERT INTO main.reports (name) VALUES ('slow')")
+        in_job.set()
+        release.wait(timeout=10)
+
+    future = writer.submit(slow_insert)
+    assert in_job.wait(timeout=10)
+    try:
+        conn = sqlite3.connect(other_path, timeout=0)
+        conn.execute("INSERT INTO reports (name) VALUES ('not blocked')")
+        conn.commit()
+        conn.close()
+    finally:
+        release.set()
+    future.result(timeout=10)
+    writer.close()
+
+
+def test_batches_are_retried_when_another_process_commits_first(tmp_path):
+    path = str(tmp_path / "writes.db")
+    _create_table(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+    writer = DatabaseWriter(path)
+    attempts = []
+
+    def read_then_write(cursor):
+        count = cursor.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        attempts.append(count)
+        if len(attempts) == 1:
+            other = sqlite3.connect(path, timeout=0)
+            other.execute("INSERT INTO reports (name) VALUES ('other process')")
+            other.commit()
+            other.close()
+        cursor.execute("INSERT INTO reports (name) VALUES (?)", (f"after {count}",))
+        return count
+
+    assert writer.submit(read_then_write).result(timeout=10) == 1
+    writer.close()
+    assert attempts == [0, 1], "The stale snapshot is abandoned and the job runs again on a fresh one"
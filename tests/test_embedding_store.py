@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, HEADER_SIZE
+
+
+def _faces(rng, count):
+    return [
+        {"face_index": index, "box": [1, 2, 3, 4], "encoding": rng.normal(0, 0.1, 128)}
+        for index in range(count)
+    ]
+
+
+def test_int8_store_round_trips_within_quantization_error(tmp_path):
+    rng = np.random.default_rng(0)
+    store = EmbeddingStore(str(tmp_path / "faces.emb"))
+    faces = _faces(rng, 3)
+    store.append(7, faces)
+
+    meta, matrix = store.load()
+    assert meta["report_id"].tolist() == [7, 7, 7]
+    assert meta["box"][0].tolist() == [1, 2, 3, 4]
+    expected = np.vstack([face["encoding"] for face in faces])
+    assert np.abs(matrix - expected).max() < 0.005
+    assert (tmp_path / "faces.emb").stat().st_size == HEADER_SIZE + 3 * (16 + 128)
+
+
+def test_appends_are_visible_to_other_mappings_and_compaction_drops_deleted_rows(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / "faces.emb")
+    writer = EmbeddingStore(path, dtype="float16")
+    writer.append(1, _faces(rng, 2))
+    reader = EmbeddingStore(path)
+    assert len(reader.load()[0]) == 2
+
+    writer.append(2, _faces(rng, 2))
+    writer.append(3, _faces(rng, 1))
+    assert sorted(set(reader.load()[0]["report_id"].tolist())) == [1, 2, 3]
+
+    assert writer.delete_reports([2]) == 2
+    assert reader.load([1, 2])[0]["report_id"].tolist() == [1, 1]
+    assert writer.compact() == 2
+    meta, matrix = reader.load()
+    assert meta["report_id"].tolist() == [1, 1, 3]
+    assert matrix.dtype == np.float32
+
+
+def test_absorb_moves_rows_once_and_keeps_appends_that_race_it(tmp_path):
+    rng = np.random.default_rng(2)
+    cold = EmbeddingStore(str(tmp_path / "cold.emb"))
+    segment = EmbeddingStore(str(tmp_path / "2019-03.emb"))
+    segment.append(1, _faces(rng, 2))
+    segment.append(2, _faces(rng, 1))
+    cold.rebuild([(1, _faces(rng, 2)), (5, _faces(rng, 1))])
+
+    late_writer = EmbeddingStore(segment.path)
+    racer = threading.Thread(target=late_writer.append, args=(3, _faces(rng, 1)))
+    swap_in = cold._swap_in
+
+    def swap_while_appending(rows):
+        racer.start()
+        time.sleep(0.2)
+        assert racer.is_alive(), "Appends wait for the move to finish"
+        swap_in(rows)
+
+    cold._swap_in = swap_while_appending
+    assert cold.absorb(segment) == 3
+    racer.join()
+
+    assert sorted(cold.load()[0]["report_id"].tolist()) == [1, 1, 2, 5], "Rows already moved are not duplicated"
+    assert EmbeddingStore(segment.path).load()[0]["report_id"].tolist() == [3]
+    assert not os.path.exists(f"{cold.path}.compact")
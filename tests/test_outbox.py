@@ -0,0 +1,84 @@
+import asyncio
+import datetime
+
+import pytest
+
+import app
+import outbox
+
+
+@pytest.fixture(autouse=True)
+def fresh_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "outbox_missing_persons.db"))
+    app.init_db()
+
+
+def _insert_report(consent=1, phone="9876543210", email="family@example.com"):
+    return app.insert_report({
+        "name": "Asha Rao",
+        "last_seen_location": "Ward 5 Market",
+        "date_reported": datetime.datetime.now().isoformat(),
+        "reporter_phone": phone,
+        "reporter_email": email,
+        "reporter_consent": consent,
+        "reporter_tracking_code": "TRACK0001",
+    })
+
+
+def _outbox_rows():
+    conn = app.connect_split("events")
+    rows = conn.execute("SELECT channel, recipient, status, attempts, last_error FROM outbox ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+
+def test_queued_messages_are_delivered_in_batches_per_channel():
+    consenting = _insert_report()
+    _insert_report(consent=0, phone="9000000000")
+    app.queue_reporter_messages([consenting], *app.REPORTER_MESSAGES["report"])
+    app.queue_reporter_messages([consenting], *app.REPORTER_MESSAGES["match"])
+
+    sms, email = outbox.FakeTransport(), outbox.FakeTransport()
+    totals = asyncio.run(outbox.deliver_pending({"sms": sms, "email": email}, batch_size=1))
+
+    assert totals == {"sent": 4, "retrying": 0, "failed": 0}
+    assert [message["recipient"] for message in sms.sent] == ["9876543210", "9876543210"]
+    assert "Tracking ID: TRACK0001" in sms.sent[0]["body"]
+    assert email.sent[0]["subject"] == "Report received"
+    assert {row[2] for row in _outbox_rows()} == {"sent"}
+
+
+def test_failed_sends_back_off_and_eventually_alert_admins():
+    report_id = _insert_report(email=None)
+    app.queue_reporter_messages([report_id], *app.REPORTER_MESSAGES["match"])
+    failing = {"sms": outbox.FakeTransport(fail_with="gateway down")}
+
+    assert asyncio.run(outbox.deliver_pending(failing))["retrying"] == 1
+    assert _outbox_rows() == [("sms", "9876543210", "pending", 1, "gateway down")]
+    assert asyncio.run(outbox.deliver_pending(failing)) == {"sent": 0, "retrying": 0, "failed": 0}, \
+        "A retry waits for its backoff"
+
+    conn = app.connect_split("events")
+    conn.execute("UPDATE outbox SET attempts = ?, next_attempt_at = datetime('now', '-1 second')", (outbox.MAX_ATTEMPTS - 1,))
+    conn.commit()
+    conn.close()
+    assert asyncio.run(outbox.deliver_pending(failing))["failed"] == 1
+    assert _outbox_rows()[0][2] == "failed"
+    assert app.get_notifications()[0]["title"] == "Reporter message failed"
+
+
+def test_token_bucket_spaces_sends_to_the_configured_rate(monkeypatch):
+    clock = [0.0]
+
+    async def fake_sleep(seconds):
+        clock[0] += seconds
+
+    monkeypatch.setattr(outbox.asyncio, "sleep", fake_sleep)
+    bucket = outbox.TokenBucket(rate=10, capacity=2, clock=lambda: clock[0])
+
+    async def send_five():
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(send_five())
+    assert clock[0] == pytest.approx(0.3)
@@ -0,0 +1,12 @@
+from rate_limit import TokenBucket
+
+
+def test_try_acquire_turns_away_actions_beyond_the_burst_until_refilled():
+    clock = [0.0]
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=lambda: clock[0])
+    assert all(bucket.try_acquire() for _ in range(3))
+    clock[0] = 0.5
+    assert not bucket.try_acquire()
+    clock[0] = 1.0
+    assert bucket.try_acquire()
+    assert TokenBucket(rate=1.0, capacity=3, clock=lambda: clock[0]).try_acquire(), "Other sessions have their own bucket"
@@ -0,0 +1,99 @@
+import io
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import app
+import video_ingest
+
+
+@pytest.fixture(autouse=True)
+def fresh_database(tmp_path, monkeypatch):
+    """Point the app at a temporary DB for each test."""
+    db_file = tmp_path / "test_missing_persons.db"
+    monkeypatch.setattr(app, "DB_PATH", str(db_file))
+    app.init_db()
+    yield str(db_file)
+
+
+def _write_noise_video(path, frame_count=40, fps=20, size=96):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (size, size))
+    rng = np.random.default_rng(7)
+    for _ in range(frame_count):
+        writer.write(rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+    writer.release()
+
+
+def test_assign_detections_keeps_identity_across_frames():
+    tracks = []
+    first = video_ingest.assign_detections(tracks, [[10, 50, 50, 10], [10, 150, 50, 110]], timestamp=0.0)
+    second = video_ingest.assign_detections(tracks, [[12, 152, 52, 112], [12, 52, 52, 12]], timestamp=0.5)
+
+    assert len(tracks) == 2
+    assert second[0] is first[1]
+    assert second[1] is first[0]
+
+    later = video_ingest.assign_detections(tracks, [[12, 52, 52, 12]], timestamp=10.0)
+    assert later[0] is not first[0], "Tracks idle for too long should not be resumed"
+
+
+def test_ingest_footage_records_timestamped_hits(tmp_path, monkeypatch):
+    video_path = tmp_path / "station.avi"
+    _write_noise_video(video_path)
+
+    def fake_face_locations(image_array):
+        return [(10, 60, 60, 10)]
+
+    def fake_face_landmarks(image_array, face_locations=None, model="large"):
+        top, right, bottom, left = face_locations[0]
+        center_x = (left + right) // 2
+        return [{
+            "nose_tip": [(center_x, top + 30)],
+            "left_eye": [(center_x - 15, top + 15)],
+            "right_eye": [(center_x + 15, top + 15)],
+        }]
+
+    def fake_face_encodings(image_array, known_face_locations=None):
+        return [np.array([0.2, 0.4, 0.1])] * len(known_face_locations or [None])
+
+    monkeypatch.setattr(app.face_recognition, "face_locations", fake_face_locations)
+    monkeypatch.setattr(app.face_recognition, "face_encodings", fake_face_encodings)
+    monkeypatch.setattr(app.face_recognition, "face_landmarks", fake_face_landmarks)
+
+    buffer = io.BytesIO()
+    noise = np.random.default_rng(3).integers(0, 255, (96, 96, 3), dtype=np.uint8)
+    Image.fromarray(noise).save(buffer, format="PNG")
+    conn = sqlite3.connect(app.DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO missing_persons (name, image, status, date_reported) VALUES (?, ?, 'Missing', CURRENT_TIMESTAMP)",
+        ("Meena", buffer.getvalue()),
+    )
+    missing_id = cur.lastrowid
+    conn.commit()
+    conn.close()
+
+    summary = video_ingest.ingest_footage(str(video_path), location="Platform 4", workers=1)
+
+    assert summary["people_tracked"] == 1
+    assert [match["id"] for match in summary["matches"]] == [missing_id]
+
+    stored = app.get_match_results()
+    assert stored[0]["source_report_id"] == summary["report_id"]
+    assert stored[0]["candidate_report_id"] == missing_id
+    assert stored[0]["details"]["first_seen"] == "00:00:00.000"
+    assert stored[0]["details"]["video_file"] == "station.avi"
+
+    conn = sqlite3.connect(app.DB_PATH)
+    quality, report_quality = conn.execute(
+        "SELECT fe.quality, mp.face_quality FROM face_embeddings fe JOIN missing_persons mp ON mp.id = fe.report_id"
+        " WHERE fe.report_id = ?", (summary["report_id"],)
+    ).fetchone()
+    conn.close()
+    assert quality > 0 and report_quality == quality, "The best crop's quality score is stored with the face"
+    assert summary["report_id"] in {int(report_id) for report_id in app.get_embedding_store(
+        app.report_shards([summary["report_id"]])[summary["report_id"]]
+    ).load()[0]["report_id"]}